@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import CustomUser, StaffManager, StaffMember
+from .models import CustomUser, Location, StaffManager, StaffMember
 from django.contrib.auth.admin import UserAdmin
+from apps.attendance.occurrences import generate_shift_occurrences
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -22,8 +23,30 @@ class CustomUserAdmin(UserAdmin):
     ordering = ('email',)
     readonly_fields = ["uuid", "created_on"]
 
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ('name', 'timezone', 'attendance_window_minutes', 'late_after_minutes')
+    search_fields = ('name', 'timezone')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # the occurrences of the staff members are dated in the time zone of their site.
+        if change and 'timezone' in form.changed_data:
+            generate_shift_occurrences(staff_member_ids=list(obj.staff_members.values_list('id', flat=True)))
+
 @admin.register(StaffMember)
 class StaffMemberAdmin(admin.ModelAdmin):
-    list_display = ('user', 'weekly_off')
+    list_display = ('user', 'weekly_off', 'location')
     search_fields = ('user__username', 'user__first_name', 'user__last_name', 'user__email')
-    list_filter = ('user__role',)
\ No newline at end of file
+    list_filter = ('user__role', 'location')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'location' in form.changed_data:
+            generate_shift_occurrences(staff_member_ids=[obj.id])
+
+@admin.register(StaffManager)
+class StaffManagerAdmin(admin.ModelAdmin):
+    list_display = ('user', 'employee_id', 'location')
+    search_fields = ('user__email', 'employee_id')
+    list_filter = ('location',)
\ No newline at end of file
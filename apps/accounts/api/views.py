@@ -11,6 +11,7 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 # local imports
 from .serializers import UserSerializer, StaffMemberSerializer
 from exceptions.restapi import CustomAPIException
+from helper.http import etag_response
 from apps.accounts.services import *
 from apps.accounts.services import create_user, update_user
 
@@ -95,14 +96,39 @@ class GetStaffMembersDetailAPI(APIView):
     permission_classes = [IsAuthenticated]
 
 
+    class InputSerializer(serializers.Serializer):
+        after = serializers.CharField(required=False)
+        limit = serializers.IntegerField(min_value=1, max_value=500, default=100)
+        fields = serializers.CharField(required=False)
+
+        def validate_fields(self, fields):
+            fields = [field.strip() for field in fields.split(",") if field.strip()]
+            unknown = set(fields) - set(STAFF_MEMBER_PROJECTION_FIELDS)
+            if unknown:
+                raise serializers.ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+            # the employee ID is the pagination cursor, it is always returned.
+            return ["employee_id"] + [field for field in fields if field != "employee_id"]
+
     def get(self, request, *args,  **kwargs):
-        staff_members = get_all_staff_members(manager=request.user)
-        output_serializer = StaffMemberSerializer(staff_members, many=True, context={"request":request})
+        serializer = self.InputSerializer(data=request.query_params)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except Exception as e:
+            raise CustomAPIException(detail=str(e), error_code="MissingFieldError")
+
+        staff_members = get_staff_members_list(manager=request.user, **serializer.validated_data)
+        if serializer.validated_data.get("fields"):
+            data = staff_members
+        else:
+            data = StaffMemberSerializer(staff_members, many=True, context={"request":request}).data
+
+        limit = serializer.validated_data["limit"]
         response = {
-            "count": len(output_serializer.data),
-            "data": output_serializer.data
+            "count": len(data),
+            "next": data[-1]["employee_id"] if len(data) == limit else None,
+            "data": data
         }
-        return Response(response)
+        return etag_response(request, response)
     
 
 class UpdateStaffMemberDetailsAPI(APIView):
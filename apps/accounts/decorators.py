@@ -14,6 +14,11 @@ Functions:
 """
 
 from exceptions.restapi import CustomAPIException
+import logging
+
+
+logger = logging.getLogger(__name__)
+
 
 def manager_role_required(fx):
     """
@@ -30,7 +35,7 @@ def manager_role_required(fx):
     """
     def mfx(*args, **kwargs):
         user = kwargs.get("manager")
-        print(user.role)
+        logger.debug("Checking the manager role of user %s: %s", user.pk, user.role)
         if user.role != "manager":
             raise CustomAPIException(detail="PermissionError", error_code="PermissionError")
         
@@ -53,7 +58,7 @@ def staff_member_role_required(fx):
     """
     def mfx(*args, **kwargs):
         user = kwargs.get("staff_user")
-        print(user.role)
+        logger.debug("Checking the staff role of user %s: %s", user.pk, user.role)
         if user.role != "staff":
             raise CustomAPIException(detail="User role should be the 'staff member' to perform this action.", error_code="PermissionError")
         
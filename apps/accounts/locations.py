@@ -0,0 +1,181 @@
+"""
+locations.py
+
+This module resolves the site of staff members and managers: its time zone and
+attendance policy, and the location a manager is scoped to.
+
+The company has a handful of locations, so all of them are cached together process-wide,
+along with the location of every manager looked up so far. Both are dropped by
+`invalidate_locations` whenever a location or a manager changes (see `apps.core.signals`),
+and expire after `LOCATION_CACHE_TTL` seconds so that changes made by other processes are
+picked up. Time zones are `zoneinfo.ZoneInfo` objects, which zoneinfo keeps one instance
+of per key.
+
+Functions:
+
+- get_attendance_policy(location_id: Optional[int]) -> AttendancePolicy:
+    The time zone and attendance policy of a location.
+
+- aget_attendance_policy(location_id: Optional[int]) -> AttendancePolicy:
+    Async version of `get_attendance_policy`.
+
+- get_manager_location_id(manager: CustomUser) -> Optional[int]:
+    The location a manager is scoped to, None for managers of every location.
+
+- is_managed_by(manager: CustomUser, staff_member: StaffMember) -> bool:
+    Whether a staff member is in the scope of a manager.
+
+- invalidate_locations():
+    Drop the cached locations and manager locations.
+"""
+
+import threading
+import time
+from datetime import tzinfo
+from typing import Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.timezone import get_default_timezone
+
+from .models import CustomUser, Location, StaffManager, StaffMember
+
+
+# (timezone, attendance_window_minutes, late_after_minutes)
+AttendancePolicy = Tuple[tzinfo, int, int]
+
+# seconds after which the cached locations are reloaded from the database.
+LOCATION_CACHE_TTL = getattr(settings, "LOCATION_CACHE_TTL", 300)
+
+# attribute of the user object holding the location of the manager for the rest of the request.
+_USER_ATTRIBUTE = "_cached_manager_location_id"
+
+_MISSING = object()
+
+_lock = threading.Lock()
+_locations: Optional[Tuple[float, Dict[int, AttendancePolicy]]] = None
+_manager_locations: Dict[object, Tuple[float, Optional[int]]] = {}
+
+# bumped on every invalidation, so that locations loaded concurrently are not cached stale.
+_generation = 0
+
+
+def _default_policy() -> AttendancePolicy:
+    from apps.attendance.windows import ATTENDANCE_WINDOW_MINUTES
+
+    return (get_default_timezone(), ATTENDANCE_WINDOW_MINUTES, settings.ATTENDANCE_LATE_AFTER_MINUTES)
+
+
+def _cached_policies() -> Optional[Dict[int, AttendancePolicy]]:
+    cached = _locations
+    if cached is not None and time.monotonic() - cached[0] < LOCATION_CACHE_TTL:
+        return cached[1]
+    return None
+
+
+def _load_policies() -> Dict[int, AttendancePolicy]:
+    global _locations
+
+    generation, loaded_at = _generation, time.monotonic()
+    policies = {
+        location.id: (location.zone, location.attendance_window_minutes, location.late_after_minutes)
+        for location in Location.objects.all()
+    }
+
+    with _lock:
+        if generation == _generation:
+            _locations = (loaded_at, policies)
+    return policies
+
+
+def get_attendance_policy(location_id: Optional[int]) -> AttendancePolicy:
+    """
+    The time zone and attendance policy of a location.
+
+    Args:
+        location_id (Optional[int]): The ID of the location, None for the default policy.
+
+    Returns:
+        AttendancePolicy: The (timezone, attendance_window_minutes, late_after_minutes) tuple.
+    """
+    if location_id is None:
+        return _default_policy()
+
+    policies = _cached_policies()
+    if policies is None or location_id not in policies:
+        policies = _load_policies()
+    return policies.get(location_id) or _default_policy()
+
+
+async def aget_attendance_policy(location_id: Optional[int]) -> AttendancePolicy:
+    """
+    Async version of `get_attendance_policy`, cached locations are returned right away
+    and only missing ones are loaded off the event loop.
+
+    Args:
+        location_id (Optional[int]): The ID of the location, None for the default policy.
+
+    Returns:
+        AttendancePolicy: The (timezone, attendance_window_minutes, late_after_minutes) tuple.
+    """
+    policies = _cached_policies()
+    if location_id is None or (policies is not None and location_id in policies):
+        return get_attendance_policy(location_id)
+
+    return await sync_to_async(get_attendance_policy)(location_id)
+
+
+def get_manager_location_id(manager: CustomUser) -> Optional[int]:
+    """
+    The location a manager is scoped to.
+
+    Args:
+        manager (CustomUser): The user of the manager.
+
+    Returns:
+        Optional[int]: The ID of the location, None when the manager has no location and
+                       manages the staff members of every location.
+    """
+    location_id = getattr(manager, _USER_ATTRIBUTE, _MISSING)
+    if location_id is not _MISSING:
+        return location_id
+
+    cached = _manager_locations.get(manager.pk)
+    if cached is not None and time.monotonic() - cached[0] < LOCATION_CACHE_TTL:
+        location_id = cached[1]
+    else:
+        generation, loaded_at = _generation, time.monotonic()
+        location_id = StaffManager.objects.filter(user=manager).values_list("location_id", flat=True).first()
+        with _lock:
+            if generation == _generation:
+                _manager_locations[manager.pk] = (loaded_at, location_id)
+
+    setattr(manager, _USER_ATTRIBUTE, location_id)
+    return location_id
+
+
+def is_managed_by(manager: CustomUser, staff_member: StaffMember) -> bool:
+    """
+    Whether a staff member is in the scope of a manager.
+
+    Args:
+        manager (CustomUser): The user of the manager.
+        staff_member (StaffMember): The staff member.
+
+    Returns:
+        bool: True if the manager manages every location or the one of the staff member.
+    """
+    location_id = get_manager_location_id(manager)
+    return location_id is None or staff_member.location_id == location_id
+
+
+def invalidate_locations():
+    """
+    Drop the cached locations and manager locations so that they are reloaded on next use.
+    """
+    global _locations, _generation
+
+    with _lock:
+        _generation += 1
+        _locations = None
+        _manager_locations.clear()
@@ -1,10 +1,13 @@
+from django.conf import settings
 from django.db import models
 from datetime import datetime
+from zoneinfo import ZoneInfo
 from django.contrib.auth.models import AbstractUser
 from apps.accounts.managers import CustomUserManager
 import uuid
 from helper.id_generator import generate_employee_id
 from helper.constant import USER_ROLES
+from helper.validation import validate_timezone_name
 
 def upload_profile_images(instance, filename):
     return f'accounts/{instance.uuid}/{filename}'
@@ -32,14 +35,44 @@ class CustomUser(BaseModel, AbstractUser):
     def __str__(self):
         return f"{self.uuid} - name: {self.first_name}"
 
+
+class Location(models.Model):
+    """
+    A site of the company, with its time zone and attendance policy. Staff members and
+    managers without a location follow `settings.TIME_ZONE` and the default policy.
+    """
+    name = models.CharField(max_length=122, unique=True)
+    timezone = models.CharField(max_length=64, default=settings.TIME_ZONE, validators=[validate_timezone_name])
+    # attendance can be marked until this many minutes after the shift start.
+    attendance_window_minutes = models.PositiveIntegerField(default=60)
+    # a punch is reported late when it is this many minutes after the shift start.
+    late_after_minutes = models.PositiveIntegerField(default=settings.ATTENDANCE_LATE_AFTER_MINUTES)
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def zone(self) -> ZoneInfo:
+        # ZoneInfo keeps one instance per key, the zone file is only read once.
+        return ZoneInfo(self.timezone)
+
   
 class StaffMember(models.Model):
     employee_id = models.CharField(max_length=122, unique=True, default=generate_employee_id)
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
     weekly_off = models.JSONField(default=["saturday", "sunday"], null=True, blank=True)
+    location = models.ForeignKey(Location, related_name='staff_members', null=True, blank=True, on_delete=models.SET_NULL)
+
+    class Meta:
+        indexes = [
+            # keyset pages of the staff members of a location, e.g. the report of its manager.
+            models.Index(fields=["location", "employee_id"], name="staff_location_idx"),
+        ]
 
 
 class StaffManager(models.Model):
     employee_id = models.CharField(max_length=122, unique=True, default=generate_employee_id)
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
+    # managers without a location manage the staff members of every location.
+    location = models.ForeignKey(Location, related_name='managers', null=True, blank=True, on_delete=models.SET_NULL)
 
@@ -1,6 +1,22 @@
 from apps.accounts.models import CustomUser, StaffManager, StaffMember
 from exceptions.auth import UserNotFound
-from typing import Optional, Literal
+from typing import Optional, Literal, Dict, List
+from apps.core.routers import read_only
+
+
+# related objects rendered by `StaffMemberSerializer`, loaded with the staff member.
+STAFF_MEMBER_RELATED = ["user"]
+
+# fields a staff member list can be projected on, with their lookup path.
+STAFF_MEMBER_PROJECTION_FIELDS = {
+    "employee_id": "employee_id",
+    "weekly_off": "weekly_off",
+    "uuid": "user__uuid",
+    "first_name": "user__first_name",
+    "last_name": "user__last_name",
+    "email": "user__email",
+    "role": "user__role",
+}
 
 
 def get_user_by_email(*, email: str) -> CustomUser:
@@ -35,8 +51,60 @@ def get_staff_member_by_id(employee_id: str) -> Optional[StaffMember]:
         Optional[StaffMember]: The staff member if found, otherwise None.
     """
     try:
-        staff = StaffMember.objects.get(employee_id=employee_id)
+        staff = StaffMember.objects.select_related(*STAFF_MEMBER_RELATED).get(employee_id=employee_id)
         return staff
     except StaffMember.DoesNotExist:
         return None
+
+
+@read_only
+def get_staff_members(location_id: Optional[int] = None):
+    """
+    Retrieve all staff members, shaped for `StaffMemberSerializer`.
+
+    Args:
+        location_id (Optional[int]): Only the staff members of this location, all of them when None.
+
+    Returns:
+        QuerySet: A queryset of StaffMember objects with their user joined in.
+    """
+    staff_members = StaffMember.objects.select_related(*STAFF_MEMBER_RELATED)
+    if location_id is not None:
+        staff_members = staff_members.filter(location_id=location_id)
+    return staff_members
+
+
+@read_only
+def get_staff_members_page(*,
+                           after: Optional[str] = None,
+                           limit: int,
+                           fields: Optional[List[str]] = None,
+                           location_id: Optional[int] = None):
+    """
+    Retrieve one page of staff members ordered by employee ID (keyset pagination).
+
+    The page of a location is read from the (location, employee_id) index.
+
+    Args:
+        after (Optional[str]): Only staff members with a greater employee ID are returned.
+        limit (int): The maximum number of staff members to return.
+        fields (Optional[List[str]]): Project the page on these `STAFF_MEMBER_PROJECTION_FIELDS`
+                                      instead of loading whole staff members.
+        location_id (Optional[int]): Only the staff members of this location, all of them when None.
+
+    Returns:
+        List: StaffMember objects, or dicts of the requested fields when `fields` is given.
+    """
+    staff_members = get_staff_members(location_id).order_by("employee_id")
+    if after:
+        staff_members = staff_members.filter(employee_id__gt=after)
+
+    if not fields:
+        return list(staff_members[:limit])
+
+    rows = staff_members.values(*[STAFF_MEMBER_PROJECTION_FIELDS[field] for field in fields])[:limit]
+    return [
+        {field: row[STAFF_MEMBER_PROJECTION_FIELDS[field]] for field in fields}
+        for row in rows
+    ]
     
\ No newline at end of file
@@ -2,8 +2,14 @@
 from .models import *
 from exceptions.restapi import CustomAPIException
 from .queries import *
+from .locations import get_manager_location_id, is_managed_by
 from apps.accounts.decorators import manager_role_required
+from typing import List
+from django.db import transaction
+from apps.core.metrics import timed
+from apps.core.sqlite import retry_on_database_locked
 
+@timed
 def create_user(*, email: str, password: str, **validated_data) -> CustomUser:
     """
     Create a new user with the given email and password.
@@ -31,6 +37,7 @@ def create_user(*, email: str, password: str, **validated_data) -> CustomUser:
     return user
 
 
+@timed
 def update_user(*, user: CustomUser, **validated_data) -> CustomUser:
     """
     Update an existing user with the given validated data.
@@ -54,6 +61,8 @@ def update_user(*, user: CustomUser, **validated_data) -> CustomUser:
 
 
 @manager_role_required
+@timed
+@retry_on_database_locked
 def create_staff_member(*,
                         manager: CustomUser,
                         email: str,
@@ -77,19 +86,24 @@ def create_staff_member(*,
     Raises:
         CustomAPIException: If a user with the given email already exists.
     """
-    user = create_user(email=email, password=password, role=role, **validated_data)
-    staff_member = StaffMember(user=user)
-    staff_member.save()
+    # both rows are written together, so that a retried write does not find the user already created.
+    with transaction.atomic():
+        user = create_user(email=email, password=password, role=role, **validated_data)
+        # a manager of a location adds staff members to it.
+        staff_member = StaffMember(user=user, location_id=get_manager_location_id(manager))
+        staff_member.save()
 
     return staff_member
 
 @manager_role_required
+@timed
 def update_staff_member_details(*, 
                                 manager: CustomUser, 
                                 employee_id: str,
                                 **validated_data) -> CustomUser:
     staff_member = get_staff_member_by_id(employee_id=employee_id)
-    if not staff_member:
+    # staff members of other locations are not visible to the manager.
+    if not staff_member or not is_managed_by(manager, staff_member):
         raise CustomAPIException(error_code="WrongEmployeeId")
     
     for field, value in validated_data.items():
@@ -101,6 +115,25 @@ def update_staff_member_details(*,
 
 
 @manager_role_required
-def get_all_staff_members(manager: CustomUser):
-    staff_members = StaffMember.objects.all()
-    return staff_members
+@timed
+def get_staff_members_list(*,
+                           manager: CustomUser,
+                           after: str = None,
+                           limit: int = 100,
+                           fields: List[str] = None):
+    """
+    Retrieve one page of the staff members the manager manages, ordered by employee ID.
+
+    Args:
+        manager (CustomUser): The manager requesting the list.
+        after (str, optional): The employee ID the previous page ended with.
+        limit (int): The maximum number of staff members in the page.
+        fields (List[str], optional): Only return these fields of each staff member.
+
+    Returns:
+        List: StaffMember objects, or dicts of the requested fields when `fields` is given.
+    """
+    return get_staff_members_page(after=after,
+                                  limit=limit,
+                                  fields=fields,
+                                  location_id=get_manager_location_id(manager))
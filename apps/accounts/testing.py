@@ -0,0 +1,30 @@
+"""
+testing.py
+
+Fixtures shared by the test modules of the apps.
+
+Functions:
+
+- create_staff_members(start: int, stop: int) -> List[StaffMember]:
+    Create numbered staff members with their users, in two queries.
+"""
+
+from typing import List
+
+from .models import CustomUser, StaffMember
+
+
+def create_staff_members(start: int, stop: int) -> List[StaffMember]:
+    """
+    Create the staff members numbered from `start` to `stop` (excluded), with their users.
+    """
+    users = CustomUser.objects.bulk_create([
+        CustomUser(email=f"staff{number}@example.com", username=f"staff{number}",
+                   first_name="Staff", last_name=str(number), role="staff")
+        for number in range(start, stop)
+    ])
+    # explicit employee IDs, the random default may collide at these sizes.
+    return StaffMember.objects.bulk_create([
+        StaffMember(user=user, employee_id=f"emp_{number:06}")
+        for number, user in zip(range(start, stop), users)
+    ])
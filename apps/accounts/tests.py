@@ -0,0 +1,55 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import CustomUser
+from .testing import create_staff_members
+
+
+STAFF_LIST_URL = "/api/v1/accounts/staff/list/"
+
+# list sizes the query count must not depend on.
+QUERY_COUNT_SIZES = [1, 100, 1000]
+
+
+class StaffListQueryCountTests(TestCase):
+    """
+    The staff list is shaped by `STAFF_MEMBER_RELATED`, so its query count is the same
+    whatever the number of staff members.
+    """
+    def setUp(self):
+        self.manager = CustomUser.objects.create(email="manager@example.com", username="manager", role="manager")
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def assert_pages_query_count(self, size: int, params: dict):
+        # the location of the manager is cached by the first request.
+        self.client.get(STAFF_LIST_URL, params)
+
+        listed, after = 0, None
+        while True:
+            with self.assertNumQueries(1):
+                response = self.client.get(STAFF_LIST_URL, {**params, **({"after": after} if after else {})})
+
+            self.assertEqual(response.status_code, 200)
+            listed += response.json()["count"]
+            after = response.json()["next"]
+            if after is None:
+                break
+
+        self.assertEqual(listed, size)
+
+    def test_query_count_is_constant(self):
+        created = 0
+        for size in QUERY_COUNT_SIZES:
+            with self.subTest(size=size):
+                create_staff_members(created, size)
+                created = size
+                self.assert_pages_query_count(size, {"limit": 500})
+
+    def test_projected_query_count_is_constant(self):
+        created = 0
+        for size in QUERY_COUNT_SIZES:
+            with self.subTest(size=size):
+                create_staff_members(created, size)
+                created = size
+                self.assert_pages_query_count(size, {"limit": 500, "fields": "first_name,last_name"})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Shift, Attendance, ShiftInterchangeRequest
+from .models import Shift, ShiftOccurrence, Attendance, ShiftInterchangeRequest
 
 
 @admin.register(Shift)
@@ -9,6 +9,19 @@ class ShiftAdmin(admin.ModelAdmin):
     search_fields = ('staff_member__employee_id', 'day')
     ordering = ('day', 'shift_start')
 
+@admin.register(ShiftOccurrence)
+class ShiftOccurrenceAdmin(admin.ModelAdmin):
+    list_display = ('staff_member', 'date', 'starts_at', 'ends_at', 'generated')
+    list_filter = ('date', 'generated')
+    search_fields = ('staff_member__employee_id',)
+    ordering = ('date', 'starts_at')
+
+    def save_model(self, request, obj, form, change):
+        # an occurrence changed by hand is a planned change, the generator must not revert it.
+        if change and form.has_changed() and 'generated' not in form.changed_data:
+            obj.generated = False
+        super().save_model(request, obj, form, change)
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ('staff_member', 'date', 'timestamp', 'image')
@@ -14,7 +14,9 @@ class AttendanceSerializer(serializers.Serializer):
     staff_member_id = serializers.IntegerField()
     date = serializers.DateField()
     timestamp = serializers.DateTimeField(read_only=True)
-    image = serializers.ImageField()
+    # both stay empty until the image pipeline has processed the upload.
+    image = serializers.ImageField(read_only=True)
+    thumbnail = serializers.ImageField(read_only=True)
 
 
 class ShiftInterchangeRequestSerializer(serializers.Serializer):
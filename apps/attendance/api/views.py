@@ -6,13 +6,26 @@ from exceptions.restapi import CustomAPIException
 from rest_framework import status
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+import json
+import csv
+import io
+import logging
 
 # local imports 
 from helper.serializers import inline_serializer
+from helper.views import AsyncAPIView
+from helper.http import rendered_etag_response
 from helper.constant import WEEK_DAYS, SHIFT_INTERCHANGE_REQUEST_STATUSV2
+from apps.accounts.locations import get_manager_location_id
 from apps.attendance.services import *
 from .serializers import *
 
+
+logger = logging.getLogger(__name__)
+
 class StaffShiftScheduleAPI(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -32,12 +45,54 @@ class StaffShiftScheduleAPI(APIView):
         except Exception as e:
             raise CustomAPIException(detail=str(e), error_code="MissingFieldError")
         
-        print(serializer.data)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Assigning shift %s", serializer.data)
         shift = assign_staff_shift(manager=request.user, **serializer.data)
         output_serializer = ShiftSerializer(shift)
         return Response({"data": output_serializer.data})
 
 
+class StaffRosterUploadAPI(APIView):
+    """
+    Upserts many shifts at once. Takes either a JSON body {"shifts": [...]} or a CSV `file`
+    with the columns employee_id, day, shift_start, shift_end.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    class InputSerializer(serializers.Serializer):
+        shifts = inline_serializer(many=True, fields={
+            "employee_id": serializers.CharField(),
+            "day": serializers.ChoiceField(choices=WEEK_DAYS),
+            "shift_start": serializers.TimeField(format='%H:%M', input_formats=['%H:%M']),
+            "shift_end": serializers.TimeField(format='%H:%M', input_formats=['%H:%M']),
+        })
+
+        def validate_shifts(self, shifts):
+            if not 0 < len(shifts) <= settings.ROSTER_UPLOAD_MAX_SIZE:
+                raise serializers.ValidationError(f"shifts must contain 1 to {settings.ROSTER_UPLOAD_MAX_SIZE} items.")
+            return shifts
+
+    def post(self, request, *args,  **kwargs):
+        try:
+            data = request.data
+            if "file" in request.FILES:
+                data = {"shifts": list(csv.DictReader(io.TextIOWrapper(request.FILES["file"], encoding="utf-8-sig")))}
+
+            serializer = self.InputSerializer(data=data)
+            serializer.is_valid(raise_exception=True)
+        except Exception as e:
+            raise CustomAPIException(detail=str(e), error_code="MissingFieldError")
+
+        results = assign_staff_roster(manager=request.user, shifts=serializer.validated_data["shifts"])
+        response = {
+            "count": len(results),
+            "changed": sum(result["status"] in ("created", "updated") for result in results),
+            "data": results
+        }
+        return Response(response)
+
+
 class AssignStaffWeeklyOffAPI(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -65,38 +120,182 @@ class AssignStaffWeeklyOffAPI(APIView):
         return Response({"data": output_serializer.data})
 
 
-# staff user APIS.
-class StaffMemberAssignedShifts(APIView):
+class TeamRosterAPI(APIView):
+    """
+    The weekly roster of the whole team: for every staff member and weekday, the shift,
+    whether it is a weekly off and the pending shift interchange requests.
+    """
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    # (roster, rendered JSON) keyed by the location of the manager, each roster is
+    # rendered once for as long as it stays cached.
+    _rendered = {}
+
     def get(self, request, *args,  **kwargs):
-        shifts = get_staff_assigned_shifts(staff_user=request.user)
+        roster = get_team_roster(manager=request.user)
+
+        location_id = get_manager_location_id(request.user)
+        rendered_roster, content = TeamRosterAPI._rendered.get(location_id, (None, None))
+        if rendered_roster is not roster:
+            response = {
+                "count": len(roster),
+                "days": [day for day, _ in WEEK_DAYS],
+                "data": roster
+            }
+            content = JSONRenderer().render(response)
+            TeamRosterAPI._rendered[location_id] = (roster, content)
+
+        return rendered_etag_response(request, content)
+
+
+# staff user APIS, the most frequent ones are served on the event loop under ASGI.
+class StaffMemberAssignedShifts(AsyncAPIView):
+
+    async def get(self, request, *args,  **kwargs):
+        shifts = await aget_staff_assigned_shifts(staff_user=request.user)
         output_serializer = ShiftSerializer(shifts, many=True,  context={"request": request})
         response = {
             "count": len(output_serializer.data),
             "data": output_serializer.data
             }
-        return Response(response)
+        return self.response(response)
+
 
+class MarkStaffAttendanceAPI(AsyncAPIView):
+
+    class InputSerializer(serializers.Serializer):
+        image = serializers.ImageField()
 
-class MarkStaffAttendanceAPI(APIView):
+    async def post(self, request, *args,  **kwargs):
+        serializer = self.InputSerializer(data=request.FILES)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except Exception as e:
+            raise CustomAPIException(detail=str(e), error_code="MissingFieldError")
+
+        attendance = await amark_attendance( staff_user=request.user, **serializer.validated_data )
+        output_serializer = AttendanceSerializer(attendance, context={"request": request})
+        return self.response({"data": output_serializer.data})
+
+
+class MarkStaffAttendanceBatchAPI(APIView):
+    """
+    Marks attendance for a batch of punches, e.g. replayed by a gate kiosk after going offline.
+
+    Multipart body: `entries` is a JSON list of {"employee_id", "captured_at", "image"} where
+    `image` is the name of the file part holding the captured image of that punch.
+    """
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     class InputSerializer(serializers.Serializer):
+        entries = serializers.JSONField()
+
+        def validate_entries(self, entries):
+            if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+                raise serializers.ValidationError("entries must be a list of objects.")
+            if not 0 < len(entries) <= settings.ATTENDANCE_BATCH_MAX_SIZE:
+                raise serializers.ValidationError(f"entries must contain 1 to {settings.ATTENDANCE_BATCH_MAX_SIZE} items.")
+            return entries
+
+    class EntrySerializer(serializers.Serializer):
+        employee_id = serializers.CharField()
+        captured_at = serializers.DateTimeField()
         image = serializers.ImageField()
-        
+
     def post(self, request, *args,  **kwargs):
         serializer = self.InputSerializer(data=request.data)
         try:
             serializer.is_valid(raise_exception=True)
+            entries = [
+                {**entry, "image": request.FILES.get(entry.get("image"))}
+                for entry in serializer.validated_data["entries"]
+            ]
+            entry_serializer = self.EntrySerializer(data=entries, many=True)
+            entry_serializer.is_valid(raise_exception=True)
         except Exception as e:
             raise CustomAPIException(detail=str(e), error_code="MissingFieldError")
-        
-        attendance = mark_attendance( staff_user=request.user, **serializer.validated_data )
-        output_serializer = AttendanceSerializer(attendance, context={"request": request})
-        return Response({"data": output_serializer.data})
+
+        results = mark_attendance_batch( manager=request.user, entries=entry_serializer.validated_data )
+        response = {
+            "count": len(results),
+            "marked": sum(result["status"] == "marked" for result in results),
+            "data": results
+        }
+        return Response(response)
+
+
+class AttendanceReportAPI(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    class InputSerializer(serializers.Serializer):
+        start_date = serializers.DateField()
+        end_date = serializers.DateField()
+        after = serializers.CharField(required=False)
+        limit = serializers.IntegerField(min_value=1, max_value=500, default=100)
+        stream = serializers.BooleanField(default=False)
+
+        def validate(self, data):
+            if data["start_date"] > data["end_date"]:
+                raise serializers.ValidationError("start_date must not be after end_date.")
+            if (data["end_date"] - data["start_date"]).days >= 366:
+                raise serializers.ValidationError("The report can cover at most one year.")
+            return data
+
+    def get(self, request, *args,  **kwargs):
+        serializer = self.InputSerializer(data=request.query_params)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except Exception as e:
+            raise CustomAPIException(detail=str(e), error_code="MissingFieldError")
+
+        data = serializer.validated_data
+        if data["stream"]:
+            # newline delimited JSON of the whole staff, fetched page by page while streaming.
+            report = iter_attendance_report(manager=request.user, start_date=data["start_date"], end_date=data["end_date"])
+            return StreamingHttpResponse((json.dumps(row) + "\n" for row in report), content_type="application/x-ndjson")
+
+        report = get_attendance_report(manager=request.user,
+                                       start_date=data["start_date"],
+                                       end_date=data["end_date"],
+                                       after=data.get("after"),
+                                       limit=data["limit"])
+        response = {
+            "count": len(report),
+            "next": report[-1]["employee_id"] if len(report) == data["limit"] else None,
+            "data": report
+        }
+        return Response(response)
+
+
+class ExportAttendanceAPI(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    class InputSerializer(serializers.Serializer):
+        start_date = serializers.DateField()
+        end_date = serializers.DateField()
+        gzip = serializers.BooleanField(default=False)
+
+    def get(self, request, *args,  **kwargs):
+        serializer = self.InputSerializer(data=request.query_params)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except Exception as e:
+            raise CustomAPIException(detail=str(e), error_code="MissingFieldError")
+
+        data = serializer.validated_data
+        content = export_attendance_csv(manager=request.user,
+                                        start_date=data["start_date"],
+                                        end_date=data["end_date"],
+                                        compress=data["gzip"])
+
+        filename = f"attendance_{data['start_date']}_{data['end_date']}.csv" + (".gz" if data["gzip"] else "")
+        response = StreamingHttpResponse(content, content_type="application/gzip" if data["gzip"] else "text/csv")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
 
 class RequestForInterchangeShiftsAPI(APIView):
@@ -120,14 +319,12 @@ class RequestForInterchangeShiftsAPI(APIView):
         return Response({"data": output_serializer.data})
 
 
-class ShiftInterchangeRequestListAPI(APIView):
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+class ShiftInterchangeRequestListAPI(AsyncAPIView):
 
-    def get(self, request, **kwargs):
-        shift_interchange_request = get_shift_interchange_requests( staff_user=request.user )
+    async def get(self, request, **kwargs):
+        shift_interchange_request = await aget_shift_interchange_requests( staff_user=request.user )
         output_serializer = ShiftInterchangeRequestSerializer( shift_interchange_request, many=True, context={"request": request} )
-        return Response({"data": output_serializer.data})
+        return self.response({"data": output_serializer.data})
 
 class ShiftInterchangeRequestStatusUpdateAPI(APIView):
     authentication_classes = [JWTAuthentication]
@@ -0,0 +1,80 @@
+"""
+exports.py
+
+This module contains the attendance history export used by payroll. Rows are read from
+the database with a server side iterator and written as CSV incrementally, so exporting
+any range runs in constant memory.
+
+Functions:
+
+- iter_attendance_csv(*, start_date: date, end_date: date, compress: bool = False, chunk_size: int = 2000, location_id: Optional[int] = None):
+    Yield the attendance of a date range as CSV (optionally gzip compressed) byte chunks.
+"""
+
+import csv
+import zlib
+from datetime import date
+from typing import Optional
+
+from django.utils.timezone import localtime
+
+from apps.accounts.locations import get_attendance_policy
+from .queries import get_attendance_export_rows
+
+
+EXPORT_HEADER = ["employee_id", "first_name", "last_name", "date", "timestamp", "image"]
+
+
+class _Echo:
+    """
+    File-like object whose `write` returns the line instead of buffering it, for `csv.writer`.
+    """
+    def write(self, value):
+        return value
+
+
+def iter_attendance_csv(*,
+                        start_date: date,
+                        end_date: date,
+                        compress: bool = False,
+                        chunk_size: int = 2000,
+                        location_id: Optional[int] = None):
+    """
+    Yield the attendance of a date range as CSV, joined with the employee ID and name of the staff member.
+
+    Only one chunk of rows is held in memory at a time.
+
+    Args:
+        start_date (date): The first day to export.
+        end_date (date): The last day to export.
+        compress (bool): Yield a gzip stream instead of plain CSV.
+        chunk_size (int): The number of rows fetched from the database, and written, at once.
+        location_id (Optional[int]): Only the attendance of the staff members of this location,
+                                     of all of them when None.
+
+    Yields:
+        bytes: Consecutive pieces of the CSV (or gzip) file.
+    """
+    writer = csv.writer(_Echo())
+    # wbits=31 makes zlib write a gzip header and trailer.
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def encode(lines):
+        data = "".join(lines).encode()
+        return compressor.compress(data) if compressor else data
+
+    lines = [writer.writerow(EXPORT_HEADER)]
+    for employee_id, first_name, last_name, day, timestamp, image, staff_location_id in get_attendance_export_rows(
+        start_date=start_date, end_date=end_date, chunk_size=chunk_size, location_id=location_id
+    ):
+        # punches are written in the local time of the site of the staff member.
+        timezone = get_attendance_policy(staff_location_id)[0]
+        lines.append(writer.writerow([employee_id, first_name, last_name, day, localtime(timestamp, timezone).isoformat(), image]))
+
+        if len(lines) >= chunk_size:
+            yield encode(lines)
+            lines = []
+
+    yield encode(lines)
+    if compressor:
+        yield compressor.flush()
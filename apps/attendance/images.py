@@ -0,0 +1,255 @@
+"""
+images.py
+
+This module contains the attendance image pipeline. Marking attendance only writes the
+raw upload to a staging area and returns; the heavy work runs on a background pool of
+threads, without any external broker.
+
+For each staged upload a worker re-encodes the image as a JPEG bounded by
+`ATTENDANCE_IMAGE_MAX_SIZE` at `ATTENDANCE_IMAGE_QUALITY`, builds a thumbnail bounded by
+`ATTENDANCE_THUMBNAIL_SIZE`, and stores both under the SHA-256 of the re-encoded image,
+so identical uploads are stored once. The attendance row is then updated and the staged
+file removed. Uploads whose processing failed (or whose process died) stay staged and
+are picked up again by `process_pending_attendance_images`, which the
+`process_pending_attendance_images` management command runs (e.g. from cron).
+
+Functions:
+
+- stage_attendance_image(image) -> str:
+    Write the raw upload to the staging area.
+
+- astage_attendance_image(image) -> str:
+    Async version of `stage_attendance_image`.
+
+- discard_staged_image(staged_image: str) -> None:
+    Remove a staged upload that will not be processed.
+
+- schedule_attendance_image(attendance_id: int, staged_image: str) -> None:
+    Queue a staged upload for processing once the current transaction commits.
+
+- submit_attendance_image(attendance_id: int, staged_image: str) -> Future:
+    Queue a staged upload for processing right away.
+
+- process_attendance_image(attendance_id: int, staged_image: str) -> Optional[str]:
+    Process a staged upload, returns the content hash of the stored image.
+
+- process_pending_attendance_images(retry_after: int = ATTENDANCE_IMAGE_RETRY_AFTER) -> List[Future]:
+    Queue every attendance whose staged upload was left unprocessed.
+"""
+
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import sha256
+from typing import List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from apps.core.routers import unit_of_work
+
+from .models import Attendance
+
+
+logger = logging.getLogger(__name__)
+
+# seconds after which a staged upload is considered left unprocessed, younger ones may
+# still be queued in the pool of a running process.
+ATTENDANCE_IMAGE_RETRY_AFTER = getattr(settings, "ATTENDANCE_IMAGE_RETRY_AFTER", 300)
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ATTENDANCE_IMAGE_WORKERS,
+                    thread_name_prefix="attendance-images",
+                )
+    return _executor
+
+
+def stage_attendance_image(image) -> str:
+    """
+    Write the raw upload to the staging area, without decoding it.
+
+    Args:
+        image (UploadedFile): The uploaded attendance image.
+
+    Returns:
+        str: The name of the staged file, relative to `ATTENDANCE_IMAGE_STAGING_ROOT`.
+    """
+    os.makedirs(settings.ATTENDANCE_IMAGE_STAGING_ROOT, exist_ok=True)
+
+    staged_image = uuid.uuid4().hex
+    with open(os.path.join(settings.ATTENDANCE_IMAGE_STAGING_ROOT, staged_image), "wb") as staged_file:
+        for chunk in image.chunks():
+            staged_file.write(chunk)
+
+    return staged_image
+
+
+async def astage_attendance_image(image) -> str:
+    """
+    Async version of `stage_attendance_image`, the file is written on a thread of its own
+    so that neither the event loop nor the thread running the queries waits on the disk.
+
+    Args:
+        image (UploadedFile): The uploaded attendance image.
+
+    Returns:
+        str: The name of the staged file, relative to `ATTENDANCE_IMAGE_STAGING_ROOT`.
+    """
+    return await sync_to_async(stage_attendance_image, thread_sensitive=False)(image)
+
+
+def discard_staged_image(staged_image: str) -> None:
+    """
+    Remove a staged upload that will not be processed, e.g. when its attendance was not created.
+
+    Args:
+        staged_image (str): The name of the staged file.
+    """
+    try:
+        os.remove(os.path.join(settings.ATTENDANCE_IMAGE_STAGING_ROOT, staged_image))
+    except FileNotFoundError:
+        pass
+
+
+def schedule_attendance_image(attendance_id: int, staged_image: str) -> None:
+    """
+    Queue a staged upload for processing once the current transaction commits.
+
+    Args:
+        attendance_id (int): The ID of the attendance the image belongs to.
+        staged_image (str): The name of the staged file.
+    """
+    transaction.on_commit(lambda: submit_attendance_image(attendance_id, staged_image))
+
+
+def submit_attendance_image(attendance_id: int, staged_image: str) -> Future:
+    """
+    Queue a staged upload for processing right away.
+
+    Args:
+        attendance_id (int): The ID of the attendance the image belongs to.
+        staged_image (str): The name of the staged file.
+
+    Returns:
+        Future: Resolves to the content hash of the stored image, or None on failure.
+    """
+    return _get_executor().submit(_run_in_worker, attendance_id, staged_image)
+
+
+@unit_of_work
+def _run_in_worker(attendance_id: int, staged_image: str) -> Optional[str]:
+    try:
+        return process_attendance_image(attendance_id, staged_image)
+    except Exception:
+        # leave the upload staged, `process_pending_attendance_images` retries it.
+        logger.exception("Error while processing attendance image %s", staged_image,
+                         extra={"attendance_id": attendance_id})
+        return None
+    finally:
+        # worker threads have their own connections, do not leak them.
+        connections.close_all()
+
+
+def _encode(image: Image.Image, size: int) -> bytes:
+    resized = image.copy()
+    resized.thumbnail((size, size))
+
+    output = io.BytesIO()
+    resized.save(output, format="JPEG", quality=settings.ATTENDANCE_IMAGE_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def _store(name: str, content: bytes) -> str:
+    with _lock:
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def process_attendance_image(attendance_id: int, staged_image: str) -> Optional[str]:
+    """
+    Re-encode a staged upload, build its thumbnail and store both, deduplicated by content.
+
+    Args:
+        attendance_id (int): The ID of the attendance the image belongs to.
+        staged_image (str): The name of the staged file.
+
+    Returns:
+        Optional[str]: The SHA-256 of the stored image, or None if the attendance or the
+                       staged file is gone.
+    """
+    staged_path = os.path.join(settings.ATTENDANCE_IMAGE_STAGING_ROOT, staged_image)
+
+    if not Attendance.objects.filter(pk=attendance_id).exists():
+        discard_staged_image(staged_image)
+        return None
+
+    if not os.path.exists(staged_path):
+        # nothing left to retry, e.g. the staging area was cleaned up.
+        logger.warning("Staged attendance image %s is missing", staged_image, extra={"attendance_id": attendance_id})
+        Attendance.objects.filter(pk=attendance_id, staged_image=staged_image).update(staged_image="")
+        return None
+
+    with Image.open(staged_path) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image_content = _encode(image, settings.ATTENDANCE_IMAGE_MAX_SIZE)
+        thumbnail_content = _encode(image, settings.ATTENDANCE_THUMBNAIL_SIZE)
+
+    image_hash = sha256(image_content).hexdigest()
+    image_name = _store(f"attendance_images/{image_hash}.jpg", image_content)
+    thumbnail_name = _store(f"attendance_images/thumbnails/{image_hash}.jpg", thumbnail_content)
+
+    Attendance.objects.filter(pk=attendance_id).update(
+        image=image_name,
+        thumbnail=thumbnail_name,
+        image_hash=image_hash,
+        staged_image="",
+    )
+    os.remove(staged_path)
+
+    return image_hash
+
+
+def process_pending_attendance_images(retry_after: int = ATTENDANCE_IMAGE_RETRY_AFTER) -> List[Future]:
+    """
+    Queue every attendance whose staged upload was left unprocessed, e.g. because its
+    worker failed or its process died.
+
+    Args:
+        retry_after (int): Only uploads staged at least this many seconds ago are queued.
+
+    Returns:
+        List[Future]: One future per queued upload, see `submit_attendance_image`.
+    """
+    staged_before = time.time() - retry_after
+    pending = Attendance.objects.exclude(staged_image="").values_list("id", "staged_image")
+
+    futures = []
+    for attendance_id, staged_image in pending.iterator():
+        try:
+            staged_at = os.path.getmtime(os.path.join(settings.ATTENDANCE_IMAGE_STAGING_ROOT, staged_image))
+        except FileNotFoundError:
+            # queued anyway, processing clears the missing upload.
+            staged_at = 0
+        if staged_at <= staged_before:
+            futures.append(submit_attendance_image(attendance_id, staged_image))
+
+    return futures
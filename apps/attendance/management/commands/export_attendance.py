@@ -0,0 +1,49 @@
+import resource
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.attendance.exports import iter_attendance_csv
+
+
+class Command(BaseCommand):
+    help = "Export the attendance history of a date range as CSV, in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("start_date", help="First day to export (YYYY-MM-DD).")
+        parser.add_argument("end_date", help="Last day to export (YYYY-MM-DD).")
+        parser.add_argument("-o", "--output", help="File to write to, stdout when omitted.")
+        parser.add_argument("--gzip", action="store_true", help="Write a gzip compressed file.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows fetched and written at once.")
+        parser.add_argument("--location", type=int, help="Only export the staff members of this location ID.")
+
+    def handle(self, *args, **options):
+        start_date = parse_date(options["start_date"])
+        end_date = parse_date(options["end_date"])
+        if not start_date or not end_date:
+            raise CommandError("Dates must be formatted as YYYY-MM-DD.")
+
+        output = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+
+        started = time.perf_counter()
+        written = 0
+        try:
+            for chunk in iter_attendance_csv(start_date=start_date,
+                                             end_date=end_date,
+                                             compress=options["gzip"],
+                                             chunk_size=options["chunk_size"],
+                                             location_id=options["location"]):
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options["output"]:
+                output.close()
+
+        elapsed = time.perf_counter() - started
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stderr.write(
+            f"Exported {written / 1024 / 1024:.2f} MB in {elapsed:.2f}s "
+            f"({written / 1024 / 1024 / max(elapsed, 1e-9):.2f} MB/s), peak memory {peak_memory:.1f} MB."
+        )
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.attendance.occurrences import SHIFT_OCCURRENCE_BATCH_SIZE, SHIFT_OCCURRENCE_HORIZON_DAYS, generate_shift_occurrences
+
+
+class Command(BaseCommand):
+    help = "Generate the dated shift occurrences of the rolling horizon from the weekday shifts, meant to run daily."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start-date", help="First day to generate (YYYY-MM-DD), yesterday at the site of each staff member when omitted.")
+        parser.add_argument("--days", type=int, default=SHIFT_OCCURRENCE_HORIZON_DAYS, help="Number of days to generate.")
+        parser.add_argument("--batch-size", type=int, default=SHIFT_OCCURRENCE_BATCH_SIZE, help="Staff members processed at once.")
+
+    def handle(self, *args, **options):
+        start_date = None
+        if options["start_date"]:
+            start_date = parse_date(options["start_date"])
+            if not start_date:
+                raise CommandError("Dates must be formatted as YYYY-MM-DD.")
+
+        started = time.perf_counter()
+        counts = generate_shift_occurrences(start_date=start_date,
+                                            days=options["days"],
+                                            batch_size=options["batch_size"])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Created {counts['created']}, updated {counts['updated']} and deleted {counts['deleted']} "
+            f"shift occurrences in {elapsed:.2f}s."
+        )
@@ -0,0 +1,26 @@
+import time
+from concurrent.futures import wait
+
+from django.core.management.base import BaseCommand
+
+from apps.attendance.images import ATTENDANCE_IMAGE_RETRY_AFTER, process_pending_attendance_images
+
+
+class Command(BaseCommand):
+    help = "Process the staged attendance images left unprocessed, e.g. after a worker failure, meant to run periodically."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retry-after", type=int, default=ATTENDANCE_IMAGE_RETRY_AFTER,
+                            help="Only retry uploads staged at least this many seconds ago.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        futures = process_pending_attendance_images(retry_after=options["retry_after"])
+        wait(futures)
+
+        # a failed upload stays staged and is logged by the worker, the next run retries it.
+        processed = sum(1 for future in futures if future.result() is not None)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Processed {processed} of {len(futures)} pending attendance images in {elapsed:.2f}s."
+        )
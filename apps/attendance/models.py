@@ -1,5 +1,6 @@
 from apps.accounts.models import StaffManager, StaffMember, CustomUser
 from django.db import models
+from django.utils.timezone import now
 from helper.constant import USER_ROLES, WEEK_DAYS, SHIFT_INTERCHANGE_REQUEST_STATUS
 
 class Shift(models.Model):
@@ -9,17 +10,63 @@ class Shift(models.Model):
     shift_end = models.TimeField()
     
     class Meta:
-        unique_together = ["staff_member", "day"]
+        constraints = [
+            models.UniqueConstraint(fields=["staff_member", "day"], name="unique_shift_per_day"),
+        ]
+        indexes = [
+            # covers the shift start and end lookups of the report and the shift index.
+            models.Index(fields=["staff_member", "day", "shift_start", "shift_end"], name="shift_schedule_idx"),
+        ]
+
+
+class ShiftOccurrence(models.Model):
+    """
+    A shift on a given date, generated from the weekday `Shift` template of the staff
+    member by `occurrences.generate_shift_occurrences`, or planned for that date only.
+    """
+    staff_member = models.ForeignKey(StaffMember, on_delete=models.CASCADE)
+    # the template it was generated from, empty for a shift planned on this date only.
+    shift = models.ForeignKey(Shift, null=True, blank=True, on_delete=models.SET_NULL)
+    # the local date the shift starts on, an overnight shift ends on the next day.
+    date = models.DateField()
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    # generated occurrences follow their template, the others are left as planned.
+    generated = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["staff_member", "date"], name="unique_occurrence_per_day"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.staff_member} : {self.date}"
 
 
 class Attendance(models.Model):
     staff_member = models.ForeignKey(StaffMember, on_delete=models.CASCADE)
     date = models.DateField()
-    timestamp = models.DateTimeField(auto_now_add=True)
-    image = models.ImageField(upload_to='attendance_images/')
+    # the shift occurrence punched for, empty when punched against the weekday templates.
+    occurrence = models.ForeignKey(ShiftOccurrence, null=True, blank=True, on_delete=models.SET_NULL)
+    timestamp = models.DateTimeField(default=now)
+    # filled in by the image pipeline once the staged upload is processed.
+    image = models.ImageField(upload_to='attendance_images/', blank=True)
+    thumbnail = models.ImageField(upload_to='attendance_images/thumbnails/', blank=True)
+    image_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    staged_image = models.CharField(max_length=255, blank=True)
 
     class Meta:
-        unique_together = ["staff_member", "date"]
+        constraints = [
+            models.UniqueConstraint(fields=["staff_member", "date"], name="unique_attendance_per_day"),
+        ]
+        indexes = [
+            # covers the punch time read by the report, without visiting the table.
+            models.Index(fields=["staff_member", "date", "timestamp"], name="attendance_report_idx"),
+            # date range scans of the export, across all staff members.
+            models.Index(fields=["date"], name="attendance_date_idx"),
+            # attendances whose staged image still waits for the image pipeline.
+            models.Index(fields=["staged_image"], condition=~models.Q(staged_image=""), name="attendance_staged_idx"),
+        ]
 
 
 class ShiftInterchangeRequest(models.Model):
@@ -31,6 +78,11 @@ class ShiftInterchangeRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # only pending requests are ever looked up by target and status, keep the index small.
+            models.Index(fields=["target", "requester"], condition=models.Q(status="pending"), name="interchange_pending_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"requester : {self.requester}"
\ No newline at end of file
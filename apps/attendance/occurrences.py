@@ -0,0 +1,134 @@
+"""
+occurrences.py
+
+This module materializes the weekday `Shift` templates into dated `ShiftOccurrence` rows,
+one per staff member and day, for a rolling horizon, in the time zone of the location of
+each staff member. Punches are validated against the occurrences, so that overnight shifts
+(ending on the next day) and changes planned for a single date are supported, and each
+punch is tied to the occurrence it was marked for.
+
+The generator works in batches of staff members, with three queries per batch (the staff
+members, their templates and their occurrences in the horizon). It computes the difference
+in memory and writes it with one upserting bulk_create and one delete per batch, so that
+running it again only writes what changed. Occurrences that are not `generated` were
+planned by hand and are left untouched.
+
+It runs daily through the `generate_shift_occurrences` management command, and for the
+affected staff members whenever the services change a template or a weekly off (only for the
+weekdays that changed), or the admin changes the time zone of a location or the location of
+a staff member. Other changes made through the admin are picked up by the next run.
+
+Functions:
+
+- generate_shift_occurrences(*, start_date: date = None, days: int = SHIFT_OCCURRENCE_HORIZON_DAYS, staff_member_ids: Iterable[int] = None, weekdays: Iterable[str] = None, batch_size: int = SHIFT_OCCURRENCE_BATCH_SIZE) -> Dict[str, int]:
+    Create, update and delete the generated occurrences of a date range.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import localdate
+
+from apps.accounts.locations import get_attendance_policy
+from .models import ShiftOccurrence
+from .queries import get_occurrence_staff_rows, get_shift_occurrence_rows, get_shifts_by_staff_member_and_day
+from .windows import DAYS, get_shift_bounds
+
+
+# number of days, from yesterday on, kept materialized by the generator.
+SHIFT_OCCURRENCE_HORIZON_DAYS = getattr(settings, "SHIFT_OCCURRENCE_HORIZON_DAYS", 28)
+
+# number of staff members whose occurrences are generated at once.
+SHIFT_OCCURRENCE_BATCH_SIZE = getattr(settings, "SHIFT_OCCURRENCE_BATCH_SIZE", 500)
+
+
+def _occurrence_dates(start_date: date, days: int, weekdays: Optional[Set[str]]) -> List[date]:
+    dates = (start_date + timedelta(days=offset) for offset in range(days))
+    return [day for day in dates if weekdays is None or DAYS[day.weekday()] in weekdays]
+
+
+def generate_shift_occurrences(*,
+                               start_date: date = None,
+                               days: int = SHIFT_OCCURRENCE_HORIZON_DAYS,
+                               staff_member_ids: Iterable[int] = None,
+                               weekdays: Iterable[str] = None,
+                               batch_size: int = SHIFT_OCCURRENCE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Create, update and delete the generated occurrences of a date range so that they match
+    the weekday templates and weekly off days of the staff members.
+
+    Args:
+        start_date (date, optional): The first day of the range. Defaults to yesterday at the site
+                                     of each staff member, so that the overnight shift running
+                                     at midnight is covered, like the punches are validated.
+        days (int): The number of days of the range.
+        staff_member_ids (Iterable[int], optional): Only these staff members, all of them when None.
+        weekdays (Iterable[str], optional): Only the dates falling on these weekdays, e.g. the days
+                                            of the templates that changed, all of them when None.
+        batch_size (int): The number of staff members processed at once.
+
+    Returns:
+        Dict[str, int]: The number of `created`, `updated` and `deleted` occurrences.
+    """
+    weekdays = set(weekdays) if weekdays is not None else None
+    counts = {"created": 0, "updated": 0, "deleted": 0}
+    if days <= 0 or weekdays == set():
+        return counts
+
+    staff_rows = get_occurrence_staff_rows(staff_member_ids)
+    for offset in range(0, len(staff_rows), batch_size):
+        batch = staff_rows[offset:offset + batch_size]
+        batch_ids = [staff_member_id for staff_member_id, _, _ in batch]
+
+        # shift times and dates are local to the site of the staff member.
+        timezones = {staff_member_id: get_attendance_policy(location_id)[0] for staff_member_id, _, location_id in batch}
+        dates = {
+            staff_member_id: _occurrence_dates(start_date or localdate(timezone=timezone) - timedelta(days=1), days, weekdays)
+            for staff_member_id, timezone in timezones.items()
+        }
+        batch_dates = [day for member_dates in dates.values() for day in member_dates]
+        if not batch_dates:
+            continue
+
+        templates = get_shifts_by_staff_member_and_day(batch_ids)
+        existing = get_shift_occurrence_rows(staff_member_ids=batch_ids, start_date=min(batch_dates), end_date=max(batch_dates))
+
+        upserts, deleted = [], []
+        for staff_member_id, weekly_off, _ in batch:
+            timezone = timezones[staff_member_id]
+            for day in dates[staff_member_id]:
+                weekday = DAYS[day.weekday()]
+                current = existing.get((staff_member_id, day))
+                # (id, shift_id, starts_at, ends_at, generated)
+                if current is not None and not current[4]:
+                    continue
+
+                shift = templates.get((staff_member_id, weekday))
+                if shift is None or weekday in weekly_off:
+                    if current is not None:
+                        deleted.append(current[0])
+                    continue
+
+                starts_at, ends_at = get_shift_bounds(shift.shift_start, shift.shift_end, day, timezone)
+                if current is not None and current[1:4] == (shift.id, starts_at, ends_at):
+                    continue
+
+                counts["updated" if current is not None else "created"] += 1
+                upserts.append(ShiftOccurrence(staff_member_id=staff_member_id, shift=shift, date=day,
+                                               starts_at=starts_at, ends_at=ends_at))
+
+        # the upsert keeps the ID of updated occurrences, and so the attendance marked for them.
+        with transaction.atomic():
+            ShiftOccurrence.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=["staff_member", "date"],
+                update_fields=["shift", "starts_at", "ends_at"]
+            )
+            ShiftOccurrence.objects.filter(id__in=deleted).delete()
+
+        counts["deleted"] += len(deleted)
+
+    return counts
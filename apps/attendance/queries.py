@@ -16,17 +16,87 @@ Functions:
 - get_staff_member_by_user(user: CustomUser) -> Optional[StaffMember]:
     Retrieve the staff member associated with a given user.
     
+- aget_staff_member_by_user(user: CustomUser) -> Optional[StaffMember]:
+    Async version of `get_staff_member_by_user`.
+
 - get_staff_member_shifts(staff_member: StaffMember):
     Retrieve all shifts assigned to a staff member.
+
+- aget_staff_member_shifts(staff_member: StaffMember) -> List[Shift]:
+    Async version of `get_staff_member_shifts`.
     
-- is_member_already_marked_attendance(staff_member: StaffMember) -> bool:
-    Check if a staff member has already marked attendance for the current day.
+- get_staff_members_by_ids(employee_ids: Iterable[str], location_id: Optional[int] = None) -> Dict[str, StaffMember]:
+    Retrieve staff members for many employee IDs at once.
+
+- get_marked_attendance_keys(staff_members: Iterable[StaffMember], dates: Iterable[date]) -> Set[Tuple[int, date]]:
+    Retrieve which of the given staff members already marked attendance on the given dates.
+
+- get_staff_report_page(*, day_counts: Dict[str, int], after: Optional[str], limit: int, location_id: Optional[int] = None) -> List[Dict[str, any]]:
+    Retrieve one keyset page of staff members with their scheduled and weekly off day counts.
+
+- get_attendance_counts(*, staff_member_ids: Iterable[int], start_date: date, end_date: date, late_after_minutes: int, timezone: tzinfo = None) -> Dict[int, Dict[str, int]]:
+    Retrieve the present and late counts of staff members over a date range.
+
+- get_attendance_export_rows(*, start_date: date, end_date: date, chunk_size: int, location_id: Optional[int] = None):
+    Iterate over the attendance of a date range joined with the staff member details.
+
+- get_pending_shift_interchange_requests(*, target: StaffMember):
+    Retrieve the pending shift interchange requests received by a staff member.
+
+- aget_pending_shift_interchange_requests(*, target: StaffMember) -> List[ShiftInterchangeRequest]:
+    Async version of `get_pending_shift_interchange_requests`.
+
+- get_shifts_by_staff_member_and_day(staff_members: Iterable[StaffMember]) -> Dict[Tuple[int, str], Shift]:
+    Retrieve the shifts of many staff members at once.
+
+- get_shift_occurrences(*, staff_member_ids: Iterable[int], start_date: date, end_date: date) -> Dict[Tuple[int, date], ShiftOccurrence]:
+    Retrieve the dated shift occurrences of staff members over a date range.
+
+- aget_shift_occurrences(*, staff_member_ids: Iterable[int], start_date: date, end_date: date) -> Dict[Tuple[int, date], ShiftOccurrence]:
+    Async version of `get_shift_occurrences`.
+
+- get_shift_occurrence_rows(*, staff_member_ids: Iterable[int], start_date: date, end_date: date) -> Dict[Tuple[int, date], tuple]:
+    Retrieve the columns of the dated shift occurrences of staff members that the generator compares.
+
+- get_occurrence_staff_rows(staff_member_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, List[str], Optional[int]]]:
+    Retrieve the ID, weekly off days and location of the staff members to generate occurrences for.
+
+- get_team_roster_staff_rows():
+    Retrieve the details of every staff member shown on the team roster.
+
+- get_team_roster_shift_rows():
+    Retrieve every shift joined with the pending interchange requests sent for it.
 """
 
 
 from .models import *
-from typing import Optional, Literal
-from django.utils.timezone import now
+from apps.accounts.queries import STAFF_MEMBER_RELATED
+from apps.core.routers import read_only
+from typing import Optional, Literal, Dict, Iterable, List, Set, Tuple
+from datetime import date, timedelta, tzinfo
+from functools import reduce
+from operator import add
+from django.db.models import Case, CharField, Count, F, FilteredRelation, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, ExtractHour, ExtractMinute, ExtractWeekDay, TruncDate
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+# related objects rendered by `ShiftInterchangeRequestSerializer`, loaded with the request.
+SHIFT_INTERCHANGE_REQUEST_RELATED = ["requester__user", "target__user", "requester_shift", "target_shift"]
+
+# ExtractWeekDay numbers the days from 1 (sunday) to 7 (saturday).
+WEEKDAY_NUMBERS = {
+    "sunday": 1,
+    "monday": 2,
+    "tuesday": 3,
+    "wednesday": 4,
+    "thursday": 5,
+    "friday": 6,
+    "saturday": 7,
+}
 
 
 
@@ -41,7 +111,7 @@ def get_staff_member_by_id(employee_id: str) -> Optional[StaffMember]:
         Optional[StaffMember]: The staff member if found, otherwise None.
     """
     try:
-        staff = StaffMember.objects.get(employee_id=employee_id)
+        staff = StaffMember.objects.select_related(*STAFF_MEMBER_RELATED).get(employee_id=employee_id)
         return staff
     except StaffMember.DoesNotExist:
         return None
@@ -51,8 +121,8 @@ def get_staff_member_shift_by_id(staff_member: StaffMember, shift_id: int):
         shift = Shift.objects.get(staff_member=staff_member, id=shift_id)
         return shift
     
-    except Shift.DoesNotExist as e:
-        print("Erro", e)
+    except Shift.DoesNotExist:
+        logger.debug("Shift %s of staff member %s not found", shift_id, staff_member.pk)
         return None
     
 def is_any_pending_interchange_request_exist(target: StaffMember, 
@@ -114,13 +184,29 @@ def get_staff_member_by_user(user: CustomUser) -> Optional[StaffMember]:
     except StaffMember.DoesNotExist:
         return None
 
+async def aget_staff_member_by_user(user: CustomUser) -> Optional[StaffMember]:
+    """
+    Async version of `get_staff_member_by_user`.
+
+    Args:
+        user (CustomUser): The user whose staff member record is to be retrieved.
+
+    Returns:
+        Optional[StaffMember]: The associated staff member or None if not found.
+    """
+    try:
+        return await StaffMember.objects.aget(user=user)
+    except StaffMember.DoesNotExist:
+        return None
+
 def get_staff_member_by_email(email: str) -> Optional[StaffMember]:
   
     try:
-        return StaffMember.objects.get(user__email=email)
+        return StaffMember.objects.select_related(*STAFF_MEMBER_RELATED).get(user__email=email)
     except StaffMember.DoesNotExist:
         return None
 
+@read_only
 def get_staff_member_shifts(staff_member: StaffMember):
     """
     Retrieve all shifts assigned to a staff member.
@@ -133,17 +219,350 @@ def get_staff_member_shifts(staff_member: StaffMember):
     """
     return Shift.objects.filter(staff_member=staff_member)
 
-def is_member_already_marked_attendance(staff_member: StaffMember) -> bool:
+@read_only
+async def aget_staff_member_shifts(staff_member: StaffMember) -> List[Shift]:
     """
-    Check if a staff member has already marked attendance for the current day.
+    Async version of `get_staff_member_shifts`.
 
     Args:
-        staff_member (StaffMember): The staff member to check.
+        staff_member (StaffMember): The staff member whose shifts are to be retrieved.
 
     Returns:
-        bool: True if attendance has already been marked, False otherwise.
+        List[Shift]: The shifts of the staff member.
     """
-    return Attendance.objects.filter(staff_member=staff_member, date=now().date()).exists()
+    return [shift async for shift in Shift.objects.filter(staff_member=staff_member)]
+
+
+def get_staff_members_by_ids(employee_ids: Iterable[str], location_id: Optional[int] = None) -> Dict[str, StaffMember]:
+    """
+    Retrieve staff members for many employee IDs at once.
+
+    Args:
+        employee_ids (Iterable[str]): The employee IDs to retrieve.
+        location_id (Optional[int]): Only the staff members of this location, all of them when None.
+
+    Returns:
+        Dict[str, StaffMember]: The staff members keyed by employee ID.
+                                Unknown employee IDs are left out.
+    """
+    staff_members = StaffMember.objects.filter(employee_id__in=set(employee_ids))
+    if location_id is not None:
+        staff_members = staff_members.filter(location_id=location_id)
+    return {staff_member.employee_id: staff_member for staff_member in staff_members}
+
+
+def get_marked_attendance_keys(staff_members: Iterable[StaffMember], dates: Iterable[date]) -> Set[Tuple[int, date]]:
+    """
+    Retrieve which of the given staff members already marked attendance on the given dates.
+
+    Args:
+        staff_members (Iterable[StaffMember]): The staff members to check.
+        dates (Iterable[date]): The dates to check.
+
+    Returns:
+        Set[Tuple[int, date]]: The (staff_member_id, date) pairs that already have an attendance.
+    """
+    return set(
+        Attendance.objects.filter(staff_member__in=list(staff_members), date__in=set(dates))
+        .values_list("staff_member_id", "date")
+    )
+
+
+def get_shifts_by_staff_member_and_day(staff_members: Iterable[StaffMember]) -> Dict[Tuple[int, str], Shift]:
+    """
+    Retrieve the shifts of many staff members at once.
+
+    Args:
+        staff_members (Iterable[StaffMember]): The staff members whose shifts are to be retrieved.
+
+    Returns:
+        Dict[Tuple[int, str], Shift]: The shifts keyed by (staff_member_id, day).
+    """
+    shifts = Shift.objects.filter(staff_member__in=list(staff_members))
+    return {(shift.staff_member_id, shift.day): shift for shift in shifts}
+
+
+def get_shift_occurrences(*,
+                          staff_member_ids: Iterable[int],
+                          start_date: date,
+                          end_date: date) -> Dict[Tuple[int, date], ShiftOccurrence]:
+    """
+    Retrieve the dated shift occurrences of staff members over a date range, a lookup
+    on the (staff_member, date) unique index.
+
+    Args:
+        staff_member_ids (Iterable[int]): The IDs of the staff members.
+        start_date (date): The first day of the range.
+        end_date (date): The last day of the range.
+
+    Returns:
+        Dict[Tuple[int, date], ShiftOccurrence]: The occurrences keyed by (staff_member_id, date).
+    """
+    occurrences = ShiftOccurrence.objects.filter(staff_member_id__in=list(staff_member_ids),
+                                                 date__range=(start_date, end_date))
+    return {(occurrence.staff_member_id, occurrence.date): occurrence for occurrence in occurrences}
+
+
+async def aget_shift_occurrences(*,
+                                 staff_member_ids: Iterable[int],
+                                 start_date: date,
+                                 end_date: date) -> Dict[Tuple[int, date], ShiftOccurrence]:
+    """
+    Async version of `get_shift_occurrences`.
+
+    Args:
+        staff_member_ids (Iterable[int]): The IDs of the staff members.
+        start_date (date): The first day of the range.
+        end_date (date): The last day of the range.
+
+    Returns:
+        Dict[Tuple[int, date], ShiftOccurrence]: The occurrences keyed by (staff_member_id, date).
+    """
+    occurrences = ShiftOccurrence.objects.filter(staff_member_id__in=list(staff_member_ids),
+                                                 date__range=(start_date, end_date))
+    return {(occurrence.staff_member_id, occurrence.date): occurrence async for occurrence in occurrences}
+
+
+def get_shift_occurrence_rows(*,
+                              staff_member_ids: Iterable[int],
+                              start_date: date,
+                              end_date: date) -> Dict[Tuple[int, date], tuple]:
+    """
+    Retrieve the columns of the dated shift occurrences of staff members over a date range
+    that the generator compares, without building model instances.
+
+    Args:
+        staff_member_ids (Iterable[int]): The IDs of the staff members.
+        start_date (date): The first day of the range.
+        end_date (date): The last day of the range.
+
+    Returns:
+        Dict[Tuple[int, date], tuple]: (id, shift_id, starts_at, ends_at, generated) tuples
+                                       keyed by (staff_member_id, date).
+    """
+    occurrences = ShiftOccurrence.objects.filter(staff_member_id__in=list(staff_member_ids),
+                                                 date__range=(start_date, end_date))
+    return {
+        (staff_member_id, day): tuple(row)
+        for staff_member_id, day, *row in occurrences.values_list(
+            "staff_member_id", "date", "id", "shift_id", "starts_at", "ends_at", "generated",
+        )
+    }
+
+
+def get_occurrence_staff_rows(staff_member_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, List[str], Optional[int]]]:
+    """
+    Retrieve the ID, weekly off days and location of the staff members to generate shift occurrences for.
+
+    Args:
+        staff_member_ids (Optional[Iterable[int]]): Only these staff members, all of them when None.
+
+    Returns:
+        List[Tuple[int, List[str], Optional[int]]]: (staff_member_id, weekly_off, location_id) tuples, ordered by ID.
+    """
+    staff_members = StaffMember.objects.order_by("id")
+    if staff_member_ids is not None:
+        staff_members = staff_members.filter(id__in=list(staff_member_ids))
+    return [
+        (staff_member_id, weekly_off or [], location_id)
+        for staff_member_id, weekly_off, location_id in staff_members.values_list("id", "weekly_off", "location_id")
+    ]
+
+
+@read_only
+def get_staff_report_page(*,
+                          day_counts: Dict[str, int],
+                          after: Optional[str],
+                          limit: int,
+                          location_id: Optional[int] = None) -> List[Dict[str, any]]:
+    """
+    Retrieve one keyset page of staff members, ordered by employee ID, for the attendance report.
+
+    The number of scheduled shift days and weekly off days of each staff member in the
+    reported range are computed by the database from the weekday counts of the range.
+    The page of a location is read from the (location, employee_id) index.
+
+    Args:
+        day_counts (Dict[str, int]): How many times each weekday occurs in the reported range.
+        after (Optional[str]): Only staff members with a greater employee ID are returned.
+        limit (int): The maximum number of staff members to return.
+        location_id (Optional[int]): Only the staff members of this location, all of them when None.
+
+    Returns:
+        List[Dict[str, any]]: Rows with `id`, `employee_id`, `location_id`, `user__first_name`,
+                              `user__last_name`, `scheduled_days` and `weekly_off_days`.
+    """
+    scheduled_days = (
+        Shift.objects.filter(staff_member=OuterRef("pk"))
+        .annotate(days=Case(
+            *[When(day=day, then=Value(count)) for day, count in day_counts.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        .values("staff_member")
+        .annotate(total=Sum("days"))
+        .values("total")
+    )
+
+    # weekly_off is a JSON list of day names, matched on its text so that it works on every backend.
+    weekly_off_days = reduce(add, [
+        Case(When(weekly_off__icontains=f'"{day}"', then=Value(count)), default=Value(0), output_field=IntegerField())
+        for day, count in day_counts.items()
+    ])
+
+    staff_members = StaffMember.objects.order_by("employee_id")
+    if location_id is not None:
+        staff_members = staff_members.filter(location_id=location_id)
+    if after:
+        staff_members = staff_members.filter(employee_id__gt=after)
+
+    staff_members = staff_members.annotate(
+        scheduled_days=Coalesce(Subquery(scheduled_days, output_field=IntegerField()), 0),
+        weekly_off_days=weekly_off_days,
+    ).values("id", "employee_id", "location_id", "user__first_name", "user__last_name", "scheduled_days", "weekly_off_days")
+
+    return list(staff_members[:limit])
+
+
+@read_only
+def get_attendance_counts(*,
+                          staff_member_ids: Iterable[int],
+                          start_date: date,
+                          end_date: date,
+                          late_after_minutes: int,
+                          timezone: tzinfo = None) -> Dict[int, Dict[str, int]]:
+    """
+    Retrieve the present and late counts of staff members over a date range, aggregated by the database.
+
+    A punch is late when it is more than `late_after_minutes` after the start of the shift
+    occurrence it was marked for, or, for punches marked against the weekday templates, when
+    its local time is more than `late_after_minutes` after the start of the shift of the
+    weekday of its attendance date, the day the shift started on (so that a punch after
+    midnight on an overnight shift is compared with that shift). The staff members are
+    expected to share a site, see `timezone`.
+
+    Args:
+        staff_member_ids (Iterable[int]): The IDs of the staff members.
+        start_date (date): The first day of the range.
+        end_date (date): The last day of the range.
+        late_after_minutes (int): The grace period after the shift start.
+        timezone (tzinfo, optional): The time zone of the site the local times are taken in,
+                                     the current time zone when None.
+
+    Returns:
+        Dict[int, Dict[str, int]]: The `present` and `late` counts keyed by staff member ID.
+                                   Staff members without attendance are left out.
+    """
+    shift_start_minute = (
+        Shift.objects.filter(staff_member=OuterRef("staff_member"), day=OuterRef("day"))
+        .annotate(minute=ExtractHour("shift_start") * 60 + ExtractMinute("shift_start"))
+        .values("minute")[:1]
+    )
+
+    attendances = (
+        Attendance.objects.filter(staff_member_id__in=list(staff_member_ids), date__range=(start_date, end_date))
+        # the attendance date is the local day the shift started on, see `_validate_punch`.
+        .annotate(weekday=ExtractWeekDay("date"))
+        .annotate(day=Case(
+            *[When(weekday=number, then=Value(day)) for day, number in WEEKDAY_NUMBERS.items()],
+            output_field=CharField(),
+        ))
+        # timestamps are extracted in the time zone of the site, a punch on the day after
+        # the attendance date is after midnight of an overnight shift.
+        .annotate(punch_date=TruncDate("timestamp", tzinfo=timezone))
+        .annotate(
+            punch_minute=ExtractHour("timestamp", tzinfo=timezone) * 60 + ExtractMinute("timestamp", tzinfo=timezone)
+                         + Case(When(punch_date=F("date"), then=Value(0)), default=Value(24 * 60), output_field=IntegerField()),
+            shift_minute=Subquery(shift_start_minute, output_field=IntegerField()),
+        )
+        .values("staff_member_id")
+        .annotate(
+            present=Count("id"),
+            late=Count("id", filter=(
+                Q(occurrence__isnull=False, timestamp__gt=F("occurrence__starts_at") + timedelta(minutes=late_after_minutes))
+                | Q(occurrence__isnull=True, punch_minute__gt=F("shift_minute") + late_after_minutes)
+            )),
+        )
+        .order_by()
+    )
+
+    return {
+        row["staff_member_id"]: {"present": row["present"], "late": row["late"]}
+        for row in attendances
+    }
+
+
+@read_only
+def get_attendance_export_rows(*, start_date: date, end_date: date, chunk_size: int, location_id: Optional[int] = None):
+    """
+    Iterate over the attendance of a date range joined with the staff member details,
+    without caching the results, fetching `chunk_size` rows at a time.
+
+    The attendance of a location is looked up per staff member of the location, on the
+    (staff_member, date) index, rather than over the whole company's attendance of the range.
+
+    Args:
+        start_date (date): The first day of the range.
+        end_date (date): The last day of the range.
+        chunk_size (int): The number of rows fetched from the database at once.
+        location_id (Optional[int]): Only the attendance of the staff members of this location,
+                                     of all of them when None.
+
+    Returns:
+        Iterator[tuple]: (employee_id, first_name, last_name, date, timestamp, image, location_id)
+                         tuples, ordered by date and staff member.
+    """
+    attendances = Attendance.objects.filter(date__range=(start_date, end_date))
+    if location_id is not None:
+        attendances = attendances.filter(
+            staff_member_id__in=StaffMember.objects.filter(location_id=location_id).values("id")
+        )
+
+    rows = (
+        attendances
+        .order_by("date", "staff_member_id")
+        .values_list(
+            "staff_member__employee_id",
+            "staff_member__user__first_name",
+            "staff_member__user__last_name",
+            "date",
+            "timestamp",
+            "image",
+            "staff_member__location_id",
+        )
+    )
+    # the iterator runs after returning, pin the database chosen by `read_only` now.
+    return rows.using(rows.db).iterator(chunk_size=chunk_size)
+
+
+@read_only
+def get_pending_shift_interchange_requests(*, target: StaffMember):
+    """
+    Retrieve the pending shift interchange requests received by a staff member,
+    shaped for `ShiftInterchangeRequestSerializer` so that listing them is a single query.
+
+    Args:
+        target (StaffMember): The staff member the requests were sent to.
+
+    Returns:
+        QuerySet: A queryset of ShiftInterchangeRequest objects.
+    """
+    return ShiftInterchangeRequest.objects.filter(target=target, status="pending").select_related(*SHIFT_INTERCHANGE_REQUEST_RELATED)
+
+
+@read_only
+async def aget_pending_shift_interchange_requests(*, target: StaffMember) -> List[ShiftInterchangeRequest]:
+    """
+    Async version of `get_pending_shift_interchange_requests`.
+
+    Args:
+        target (StaffMember): The staff member the requests were sent to.
+
+    Returns:
+        List[ShiftInterchangeRequest]: The pending requests, with everything the serializer renders loaded.
+    """
+    requests = ShiftInterchangeRequest.objects.filter(target=target, status="pending")
+    return [request async for request in requests.select_related(*SHIFT_INTERCHANGE_REQUEST_RELATED)]
 
 
 def get_shift_interchange_request_by_id(*,
@@ -161,8 +580,40 @@ def get_shift_interchange_request_by_id(*,
     """
     try:
    
-        request = ShiftInterchangeRequest.objects.get(id=request_id, target=staff_member)
+        request = ShiftInterchangeRequest.objects.select_related(*SHIFT_INTERCHANGE_REQUEST_RELATED).get(id=request_id, target=staff_member)
 
         return request
     except ShiftInterchangeRequest.DoesNotExist:
         return None
+
+
+@read_only
+def get_team_roster_staff_rows():
+    """
+    Retrieve the details of every staff member shown on the team roster, ordered by employee ID.
+
+    Returns:
+        QuerySet: A queryset of dicts with the staff member and user columns.
+    """
+    return StaffMember.objects.order_by("employee_id").values(
+        "id", "employee_id", "location_id", "weekly_off", "user__first_name", "user__last_name", "user__email",
+    )
+
+
+@read_only
+def get_team_roster_shift_rows():
+    """
+    Retrieve every shift joined with the pending interchange requests its staff member sent for it.
+
+    Shifts have one row per pending request, or a single row with empty request columns
+    when there is none.
+
+    Returns:
+        QuerySet: A queryset of (staff_member_id, shift_id, day, shift_start, shift_end,
+                  request_id, target_id, target_shift_id) tuples.
+    """
+    pending = FilteredRelation("requester_shift", condition=Q(requester_shift__status="pending"))
+    return Shift.objects.annotate(pending=pending).values_list(
+        "staff_member_id", "id", "day", "shift_start", "shift_end",
+        "pending__id", "pending__target_id", "pending__target_shift_id",
+    )
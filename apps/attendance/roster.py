@@ -0,0 +1,149 @@
+"""
+roster.py
+
+This module builds the weekly roster of the whole team: for every staff member and every
+weekday, the shift, whether it is a weekly off and the pending shift interchange requests
+for that day.
+
+The roster is built from two queries (the staff members, and their shifts joined with the
+pending interchange requests), both as plain `values()` rows grouped in memory. A single
+copy is cached process-wide, along with the roster of each location cut from it for the
+managers scoped to a location. The copy is dropped by
+`invalidate_team_roster` whenever a shift, a staff member (or the name of its user) or an
+interchange request changes (see `apps.core.signals`, and the services for the bulk
+writes that send no signal), and expires after `ROSTER_CACHE_TTL` seconds so that changes
+made by other processes are picked up.
+
+Functions:
+
+- get_team_roster(location_id: Optional[int] = None) -> List[Dict[str, any]]:
+    Retrieve the weekly roster of every staff member, or of those of a location.
+
+- invalidate_team_roster():
+    Drop the cached roster so that it is rebuilt on next use.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from helper.constant import WEEK_DAYS
+from .queries import get_team_roster_shift_rows, get_team_roster_staff_rows
+
+
+# seconds after which the cached roster is rebuilt from the database.
+ROSTER_CACHE_TTL = getattr(settings, "ROSTER_CACHE_TTL", 60)
+
+DAYS = [day for day, _ in WEEK_DAYS]
+
+
+_lock = threading.Lock()
+# (loaded_at, roster, rosters keyed by location ID)
+_roster: Optional[Tuple[float, List[Dict[str, any]], Dict[Optional[int], List[Dict[str, any]]]]] = None
+
+# bumped on every invalidation, so that a roster built concurrently is not cached stale.
+_generation = 0
+
+
+def _format_time(value) -> str:
+    # the shift times are sent as HH:MM, like `ShiftSerializer` does.
+    return f"{value.hour:02}:{value.minute:02}"
+
+
+def _build_team_roster() -> Tuple[List[Dict[str, any]], Dict[Optional[int], List[Dict[str, any]]]]:
+    """
+    Build the roster with one query for the staff members, and one for their shifts
+    joined with the pending interchange requests sent for them, along with the roster
+    of each location.
+    """
+    roster = {}
+    by_location = {}
+    for row in get_team_roster_staff_rows():
+        weekly_off = row["weekly_off"] or []
+        roster[row["id"]] = {
+            "employee_id": row["employee_id"],
+            "first_name": row["user__first_name"],
+            "last_name": row["user__last_name"],
+            "email": row["user__email"],
+            "weekly_off": weekly_off,
+            "days": {
+                day: {"weekly_off": day in weekly_off, "shift": None, "pending_interchanges": []}
+                for day in DAYS
+            },
+        }
+        by_location.setdefault(row["location_id"], []).append(roster[row["id"]])
+
+    for staff_member_id, shift_id, day, shift_start, shift_end, request_id, target_id, target_shift_id in get_team_roster_shift_rows():
+        entry = roster.get(staff_member_id)
+        if entry is None:
+            continue
+
+        requester_day = entry["days"][day]
+        if requester_day["shift"] is None:
+            requester_day["shift"] = {
+                "id": shift_id,
+                "shift_start": _format_time(shift_start),
+                "shift_end": _format_time(shift_end),
+            }
+
+        target = roster.get(target_id)
+        if request_id is None or target is None:
+            continue
+
+        # both sides see the request on the day of the shifts it swaps.
+        interchange = {
+            "id": request_id,
+            "requester": entry["employee_id"],
+            "target": target["employee_id"],
+            "requester_shift_id": shift_id,
+            "target_shift_id": target_shift_id,
+        }
+        requester_day["pending_interchanges"].append(interchange)
+        target["days"][day]["pending_interchanges"].append(interchange)
+
+    return list(roster.values()), by_location
+
+
+def get_team_roster(location_id: Optional[int] = None) -> List[Dict[str, any]]:
+    """
+    Retrieve the weekly roster of every staff member, ordered by employee ID.
+
+    The roster is shared between callers and must not be modified.
+
+    Args:
+        location_id (Optional[int]): Only the staff members of this location, all of them when None.
+
+    Returns:
+        List[Dict[str, any]]: One entry per staff member with its details and, under
+                              `days`, the shift, weekly off and pending interchange
+                              requests of every weekday.
+    """
+    global _roster
+
+    cached = _roster
+    if cached is not None and time.monotonic() - cached[0] < ROSTER_CACHE_TTL:
+        roster, by_location = cached[1:]
+    else:
+        generation, loaded_at = _generation, time.monotonic()
+        roster, by_location = _build_team_roster()
+
+        with _lock:
+            if generation == _generation:
+                _roster = (loaded_at, roster, by_location)
+
+    if location_id is None:
+        return roster
+    return by_location.get(location_id, [])
+
+
+def invalidate_team_roster():
+    """
+    Drop the cached roster so that the next lookup rebuilds it from the database.
+    """
+    global _roster, _generation
+
+    with _lock:
+        _generation += 1
+        _roster = None
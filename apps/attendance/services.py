@@ -14,39 +14,142 @@ Functions:
 - assign_staff_shift(*, manager: CustomUser, employee_id: str, shift: ShiftSchema) -> Shift:
     Assign or update a shift for a staff member.
     
+- assign_staff_roster(*, manager: CustomUser, shifts: List[ShiftSchema]) -> List[Dict[str, any]]:
+    Assign or update many shifts at once, e.g. a weekly roster.
+
 - assign_staff_weekly_off(*, manager: CustomUser, employee_id: str, weekly_off: VALID_DAYS) -> StaffMember:
     Assign a weekly off day for a staff member.
     
 - get_staff_assigned_shifts(*, staff_user: CustomUser):
     Retrieve assigned shifts for a staff member.
+
+- aget_staff_assigned_shifts(*, staff_user: CustomUser) -> List[Shift]:
+    Async version of `get_staff_assigned_shifts`.
     
 - _mark_staff_attendance(staff_member: StaffMember, image) -> Attendance:
     Mark attendance for a staff member.
     
 - mark_attendance(*, staff_user: CustomUser, image, **kwargs) -> Attendance:
     Mark attendance for a staff member.
+
+- amark_attendance(*, staff_user: CustomUser, image, **kwargs) -> Attendance:
+    Async version of `mark_attendance`.
+
+- mark_attendance_batch(*, manager: CustomUser, entries: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    Mark attendance for many staff members at once.
+
+- get_attendance_report(*, manager: CustomUser, start_date: date, end_date: date, after: str = None, limit: int = 100) -> List[Dict[str, any]]:
+    Build one page of the per-staff attendance report over a date range.
+
+- iter_attendance_report(*, manager: CustomUser, start_date: date, end_date: date, page_size: int = 500):
+    Yield the attendance report of all staff members, one page at a time.
+
+- export_attendance_csv(*, manager: CustomUser, start_date: date, end_date: date, compress: bool = False):
+    Stream the attendance history of a date range as CSV.
+
+- get_team_roster(*, manager: CustomUser) -> List[Dict[str, any]]:
+    Retrieve the weekly roster of the whole team, or of the location of the manager.
 """
 
 
 # standard imports
-from django.db import transaction, IntegrityError
+from asgiref.sync import sync_to_async
+from django.db import transaction, DatabaseError, IntegrityError
 from apps.accounts.services import create_user
 from apps.accounts.decorators import manager_role_required, staff_member_role_required
 from django.utils.timezone import now
-import pytz
+from django.conf import settings
+from datetime import timedelta
+import logging
 
 # local imports
 from .models import StaffManager, StaffMember, CustomUser
-from .models import Shift, Attendance
+from .models import Shift, ShiftOccurrence, Attendance
 from helper.validation import validate_weekly_off_list
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+from helper.constant import WEEK_DAYS
 from schema.request import ShiftSchema, VALID_DAYS
 from exceptions.restapi import CustomAPIException
 from .queries import *
-from .validations import validate_attendance_request, validate_shift_interchange_request
+from .validations import validate_attendance_request, validate_attendance_occurrence, validate_shift_interchange_request
+from .staff_cache import get_staff_member, aget_staff_member
+from .roster import get_team_roster as _get_team_roster, invalidate_team_roster
+from .shift_index import get_shift_schedules, aget_shift_schedule, invalidate_shift_schedule
+from .occurrences import generate_shift_occurrences
+from .images import stage_attendance_image, astage_attendance_image, schedule_attendance_image, discard_staged_image
+from .exports import iter_attendance_csv
+from apps.accounts.locations import AttendancePolicy, get_attendance_policy, aget_attendance_policy, get_manager_location_id, is_managed_by
+from apps.core.metrics import timed
+from apps.core.sqlite import retry_on_database_locked
+
+
+logger = logging.getLogger(__name__)
 
 
 # internal use methods
+def _exception_to_error(exception: CustomAPIException) -> Dict[str, any]:
+    """
+    Build the error payload of a rejected batch entry, the same way `custom_exception_handler` does.
+    """
+    error = exception.error or {}
+    if exception.detail:
+        error["detail"] = exception.detail
+    return error
+
+
+def _punch_dates(current_datetime) -> Tuple[date, date]:
+    """
+    The local dates whose shift occurrences may be running at a punch: an overnight shift
+    of yesterday is still running after midnight.
+    """
+    current_date = current_datetime.date()
+    return current_date - timedelta(days=1), current_date
+
+
+def _validate_punch(staff_member: StaffMember,
+                    current_utc_time,
+                    occurrences: Dict[Tuple[int, date], ShiftOccurrence],
+                    policy: AttendancePolicy,
+                    schedule=None) -> Tuple[Optional[ShiftOccurrence], date]:
+    """
+    Validate a punch against the shift occurrences of the staff member on the day of the
+    punch and the day before, or against its weekday templates when none was generated
+    for these days (e.g. before the generator first ran).
+
+    Args:
+        staff_member (StaffMember): The staff member marking attendance.
+        current_utc_time (datetime): The time of the punch.
+        occurrences (Dict[Tuple[int, date], ShiftOccurrence]): Occurrences keyed by (staff_member_id, date),
+                                                               see `_punch_dates`.
+        policy (AttendancePolicy): The time zone and attendance policy of the site of the staff member.
+        schedule (Dict[str, ShiftWindow], optional): The weekly schedule of the staff member.
+
+    Returns:
+        Tuple[Optional[ShiftOccurrence], date]: The occurrence punched for, None with the templates,
+                                                and the date the attendance is marked on.
+    """
+    timezone, window_minutes, _ = policy
+    current_datetime = current_utc_time.astimezone(timezone)
+    candidates = [occurrences[key] for key in ((staff_member.id, day) for day in _punch_dates(current_datetime)) if key in occurrences]
+
+    if candidates:
+        occurrence = validate_attendance_occurrence(staff_member=staff_member,
+                                                    occurrences=candidates,
+                                                    current_datetime=current_datetime,
+                                                    timezone=timezone,
+                                                    window_minutes=window_minutes)
+        # the day the shift started on, also for a punch after midnight.
+        return occurrence, occurrence.date
+
+    interval = validate_attendance_request(staff_member=staff_member,
+                                           current_datetime=current_datetime,
+                                           schedule=schedule,
+                                           timezone=timezone,
+                                           window_minutes=window_minutes)
+    # the local day the shift started on, like the occurrences.
+    return None, interval[3]
+
+
 def _create_or_update_staff_member_shift(*, 
                                staff_member: StaffMember,  
                                shift: Dict[str, any]) -> Shift:
@@ -69,6 +172,8 @@ def _create_or_update_staff_member_shift(*,
             staff_member=staff_member,
             **shift
         )
+        invalidate_shift_schedule(staff_member.id)
+        generate_shift_occurrences(staff_member_ids=[staff_member.id], weekdays=[new_shift.day])
         return new_shift
 
     # Update existing shift with new details
@@ -76,10 +181,13 @@ def _create_or_update_staff_member_shift(*,
         setattr(member_shift, key, value)
     
     member_shift.save()
+    invalidate_shift_schedule(staff_member.id)
+    generate_shift_occurrences(staff_member_ids=[staff_member.id], weekdays=[member_shift.day])
     return member_shift
 
 
 @manager_role_required
+@timed
 def assign_staff_shift(*, 
                        manager: CustomUser,
                        employee_id: str,
@@ -96,7 +204,8 @@ def assign_staff_shift(*,
         Shift: The created or updated shift.
     """
     staff_member = get_staff_member_by_id(employee_id=employee_id)
-    if not staff_member:
+    # staff members of other locations are not visible to the manager.
+    if not staff_member or not is_managed_by(manager, staff_member):
         raise CustomAPIException(error_code="WrongEmployeeId")
     
     if shift["day"] in staff_member.weekly_off:
@@ -106,6 +215,103 @@ def assign_staff_shift(*,
     return created_shift
 
 @manager_role_required
+@timed
+def assign_staff_roster(*,
+                        manager: CustomUser,
+                        shifts: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    """
+    Assign or update many shifts at once, e.g. the weekly roster of the whole staff.
+
+    Staff members and their current shifts are loaded with one query each, every entry is
+    checked in memory, and the accepted entries are upserted with a single bulk_create
+    inside one transaction.
+
+    Args:
+        manager (CustomUser): The manager uploading the roster.
+        shifts (List[Dict[str, any]]): The entries, each with `employee_id`, `day`, `shift_start` and `shift_end`.
+
+    Returns:
+        List[Dict[str, any]]: One diff per entry, in order, with its `status` ("created", "updated",
+                              "unchanged" or "rejected"), the `previous` times of updated shifts
+                              and the `error` of rejected entries.
+    """
+    staff_members = get_staff_members_by_ids((entry["employee_id"] for entry in shifts), get_manager_location_id(manager))
+    current_shifts = get_shifts_by_staff_member_and_day(staff_members.values())
+
+    results = []
+    upserts = {}
+    seen = set()
+    for index, entry in enumerate(shifts):
+        result = {
+            "index": index,
+            "employee_id": entry["employee_id"],
+            "day": entry["day"],
+            "shift_start": entry["shift_start"].strftime('%H:%M'),
+            "shift_end": entry["shift_end"].strftime('%H:%M'),
+            "status": "rejected",
+        }
+        results.append(result)
+
+        staff_member = staff_members.get(entry["employee_id"])
+        try:
+            if not staff_member:
+                raise CustomAPIException(error_code="WrongEmployeeId")
+
+            if entry["day"] in (staff_member.weekly_off or []):
+                raise CustomAPIException(error_code="CannotAssignWeekOffShift")
+
+            if (staff_member.id, entry["day"]) in seen:
+                raise CustomAPIException(
+                    detail="The roster contains this employee and day more than once.",
+                    error_code="DuplicateRosterEntry"
+                )
+
+        except CustomAPIException as e:
+            result["error"] = _exception_to_error(e)
+            continue
+
+        seen.add((staff_member.id, entry["day"]))
+        current_shift = current_shifts.get((staff_member.id, entry["day"]))
+        if not current_shift:
+            result["status"] = "created"
+        elif (current_shift.shift_start, current_shift.shift_end) == (entry["shift_start"], entry["shift_end"]):
+            result["status"] = "unchanged"
+            continue
+        else:
+            result["status"] = "updated"
+            result["previous"] = {
+                "shift_start": current_shift.shift_start.strftime('%H:%M'),
+                "shift_end": current_shift.shift_end.strftime('%H:%M'),
+            }
+
+        upserts[(staff_member.id, entry["day"])] = Shift(
+            staff_member=staff_member,
+            day=entry["day"],
+            shift_start=entry["shift_start"],
+            shift_end=entry["shift_end"]
+        )
+
+    with transaction.atomic():
+        Shift.objects.bulk_create(
+            list(upserts.values()),
+            update_conflicts=True,
+            unique_fields=["staff_member", "day"],
+            update_fields=["shift_start", "shift_end"]
+        )
+
+    changed_staff_member_ids = {staff_member_id for staff_member_id, _ in upserts}
+    invalidate_shift_schedule(*changed_staff_member_ids)
+    if changed_staff_member_ids:
+        # only the weekdays of the roster changed, not the rest of the horizon.
+        generate_shift_occurrences(staff_member_ids=changed_staff_member_ids,
+                                   weekdays={day for _, day in upserts})
+    # bulk_create sends no post_save signal, the cached roster is dropped here.
+    invalidate_team_roster()
+    return results
+
+
+@manager_role_required
+@timed
 def assign_staff_weekly_off(*, 
                             manager: CustomUser,
                             employee_id: str, 
@@ -122,14 +328,19 @@ def assign_staff_weekly_off(*,
         StaffMember: The updated staff member.
     """
     staff_member = get_staff_member_by_id(employee_id=employee_id)
-    if not staff_member:
+    if not staff_member or not is_managed_by(manager, staff_member):
         raise CustomAPIException(error_code="WrongEmployeeId")
     
+    # the days that stop or start being off are the ones whose occurrences change.
+    changed_days = set(staff_member.weekly_off or []) ^ set(weekly_off or [])
     staff_member.weekly_off = weekly_off
     staff_member.save()
+    invalidate_shift_schedule(staff_member.id)
+    generate_shift_occurrences(staff_member_ids=[staff_member.id], weekdays=changed_days)
     return staff_member
 
 @staff_member_role_required
+@timed
 def get_staff_assigned_shifts(*, 
                              staff_user: CustomUser):
     """
@@ -141,12 +352,32 @@ def get_staff_assigned_shifts(*,
     Returns:
         List[Shift]: The list of assigned shifts.
     """
-    staff_member = get_staff_member_by_user(user=staff_user)
+    staff_member = get_staff_member(staff_user)
     if not staff_member:
         raise CustomAPIException(error_code="UserMustBeStaffMember")
     
     return get_staff_member_shifts(staff_member=staff_member)
 
+@staff_member_role_required
+@timed
+async def aget_staff_assigned_shifts(*,
+                                     staff_user: CustomUser) -> List[Shift]:
+    """
+    Async version of `get_staff_assigned_shifts`.
+
+    Args:
+        staff_user (CustomUser): The staff member making the request.
+
+    Returns:
+        List[Shift]: The list of assigned shifts.
+    """
+    staff_member = await aget_staff_member(staff_user)
+    if not staff_member:
+        raise CustomAPIException(error_code="UserMustBeStaffMember")
+
+    return await aget_staff_member_shifts(staff_member=staff_member)
+
+@retry_on_database_locked
 def _mark_staff_attendance(staff_member: StaffMember, image) -> Attendance:
     """
     Mark attendance for a staff member.
@@ -157,38 +388,65 @@ def _mark_staff_attendance(staff_member: StaffMember, image) -> Attendance:
 
     Returns:
         Attendance: The created attendance record.
+
+    Raises:
+        CustomAPIException: If the staff member already marked attendance today, including
+                            by a concurrent request.
     """
     # Get current time in UTC
     current_utc_time = now()
 
-    # Convert UTC time to IST
-    ist = pytz.timezone('Asia/Kolkata')
-    current_datetime = current_utc_time.astimezone(ist)
-
-    current_day = current_datetime.strftime('%A').lower()
- 
-    validate_attendance_request(staff_member=staff_member, 
-                                current_day=current_day, 
-                                current_datetime=current_datetime )
+    policy = get_attendance_policy(staff_member.location_id)
+    yesterday, today = _punch_dates(current_utc_time.astimezone(policy[0]))
+    occurrences = get_shift_occurrences(staff_member_ids=[staff_member.id], start_date=yesterday, end_date=today)
+    occurrence, attendance_date = _validate_punch(staff_member, current_utc_time, occurrences, policy)
     
+    # only the raw upload is written here, the image pipeline processes it in the background.
+    staged_image = stage_attendance_image(image)
+    return _create_attendance(staff_member, attendance_date, occurrence, current_utc_time, staged_image)
+
+
+def _create_attendance(staff_member: StaffMember,
+                       attendance_date,
+                       occurrence: Optional[ShiftOccurrence],
+                       timestamp,
+                       staged_image: str) -> Attendance:
+    """
+    Insert the attendance of a punch and queue its staged upload for processing.
 
-    if is_member_already_marked_attendance(staff_member=staff_member):
+    The staged upload is discarded when the attendance is not created.
+
+    Raises:
+        CustomAPIException: If the staff member already marked attendance on this date.
+    """
+    try:
+        # the unique constraint on (staff_member, date) rejects a second punch, even a concurrent
+        # one, the savepoint keeps an outer transaction usable when it does.
+        with transaction.atomic():
+            attendance = Attendance.objects.create(
+                    staff_member=staff_member,
+                    date=attendance_date,
+                    occurrence=occurrence,
+                    timestamp=timestamp,
+                    staged_image=staged_image
+                )
+    except IntegrityError:
+        discard_staged_image(staged_image)
         raise CustomAPIException(
             detail="User Already Marked thier attendance.",
             error_code="AttendanceAlreadyMarked"
         )
-    
-    attendance = Attendance.objects.create(
-            staff_member=staff_member,
-            date=now().date(),
-            timestamp=now(),
-            image=image
-        )
+    except DatabaseError:
+        # e.g. the database is locked, the upload is staged again if the write is retried.
+        discard_staged_image(staged_image)
+        raise
+    schedule_attendance_image(attendance.id, attendance.staged_image)
 
     return attendance
 
 
 @staff_member_role_required
+@timed
 def mark_attendance(*, 
                     staff_user: CustomUser,
                     image,
@@ -203,13 +461,334 @@ def mark_attendance(*,
     Returns:
         Attendance: The created attendance record.
     """
-    staff_member = get_staff_member_by_user(user=staff_user)
+    staff_member = get_staff_member(staff_user)
     if not staff_member:
         raise CustomAPIException(error_code="UserMustBeStaffMember")
     
     return _mark_staff_attendance(staff_member=staff_member, image=image)
 
 
+@retry_on_database_locked
+async def _amark_staff_attendance(staff_member: StaffMember, image) -> Attendance:
+    """
+    Async version of `_mark_staff_attendance`.
+
+    Args:
+        staff_member (StaffMember): The staff member marking attendance.
+        image: The image used for attendance marking.
+
+    Returns:
+        Attendance: The created attendance record.
+
+    Raises:
+        CustomAPIException: If the staff member already marked attendance today, including
+                            by a concurrent request.
+    """
+    current_utc_time = now()
+
+    policy = await aget_attendance_policy(staff_member.location_id)
+    yesterday, today = _punch_dates(current_utc_time.astimezone(policy[0]))
+    occurrences = await aget_shift_occurrences(staff_member_ids=[staff_member.id], start_date=yesterday, end_date=today)
+    # the weekday templates are only needed when no occurrence was generated.
+    schedule = None if occurrences else await aget_shift_schedule(staff_member.id)
+    occurrence, attendance_date = _validate_punch(staff_member, current_utc_time, occurrences, policy, schedule=schedule)
+
+    staged_image = await astage_attendance_image(image)
+    # the same insert as the sync path, a repeated punch is rejected by the unique constraint.
+    return await sync_to_async(_create_attendance)(staff_member, attendance_date, occurrence, current_utc_time, staged_image)
+
+
+@staff_member_role_required
+@timed
+async def amark_attendance(*,
+                           staff_user: CustomUser,
+                           image,
+                           **kwargs) -> Attendance:
+    """
+    Async version of `mark_attendance`.
+
+    Args:
+        staff_user (CustomUser): The staff member making the request.
+        image: The image used for attendance marking.
+
+    Returns:
+        Attendance: The created attendance record.
+    """
+    staff_member = await aget_staff_member(staff_user)
+    if not staff_member:
+        raise CustomAPIException(error_code="UserMustBeStaffMember")
+
+    return await _amark_staff_attendance(staff_member=staff_member, image=image)
+
+
+@manager_role_required
+@timed
+def mark_attendance_batch(*,
+                          manager: CustomUser,
+                          entries: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    """
+    Mark attendance for many staff members at once, e.g. punches replayed by a gate kiosk.
+
+    Staff members, their shift schedules and the already marked attendance of the whole
+    batch are loaded up front, every entry is validated in memory, and the accepted entries are
+    inserted with a single bulk_create inside one transaction. Entries captured after now plus
+    `ATTENDANCE_BATCH_MAX_CLOCK_SKEW_SECONDS`, or more than `ATTENDANCE_BATCH_REPLAY_HORIZON_HOURS`
+    ago, are rejected.
+
+    Args:
+        manager (CustomUser): The manager (kiosk account) submitting the batch.
+        entries (List[Dict[str, any]]): The punches, each with `employee_id`, `captured_at` and `image`.
+
+    Returns:
+        List[Dict[str, any]]: One result per entry, in order, with its `status` ("marked" or
+                              "rejected") and the `error` of rejected entries.
+
+    Raises:
+        CustomAPIException: If some entry was marked concurrently while the batch was inserted.
+    """
+    current_utc_time = now()
+    earliest = current_utc_time - timedelta(hours=settings.ATTENDANCE_BATCH_REPLAY_HORIZON_HOURS)
+    latest = current_utc_time + timedelta(seconds=settings.ATTENDANCE_BATCH_MAX_CLOCK_SKEW_SECONDS)
+
+    staff_members = get_staff_members_by_ids((entry["employee_id"] for entry in entries), get_manager_location_id(manager))
+    staff_member_ids = [staff_member.id for staff_member in staff_members.values()]
+    schedules = get_shift_schedules(staff_member_ids)
+    policies = {staff_member.id: get_attendance_policy(staff_member.location_id) for staff_member in staff_members.values()}
+    # a punch is marked on the local date its shift started on, in the time zone of the site.
+    punch_dates = set()
+    for entry in entries:
+        staff_member = staff_members.get(entry["employee_id"])
+        if staff_member and earliest <= entry["captured_at"] <= latest:
+            punch_dates.update(_punch_dates(entry["captured_at"].astimezone(policies[staff_member.id][0])))
+    occurrences = {}
+    if punch_dates:
+        occurrences = get_shift_occurrences(staff_member_ids=staff_member_ids,
+                                            start_date=min(punch_dates),
+                                            end_date=max(punch_dates))
+    marked_keys = get_marked_attendance_keys(staff_members=staff_members.values(), dates=punch_dates)
+
+    results = []
+    attendances = []
+    try:
+        for index, entry in enumerate(entries):
+            result = {"index": index, "employee_id": entry["employee_id"], "status": "rejected"}
+            results.append(result)
+
+            staff_member = staff_members.get(entry["employee_id"])
+            try:
+                if not staff_member:
+                    raise CustomAPIException(error_code="WrongEmployeeId")
+
+                if not earliest <= entry["captured_at"] <= latest:
+                    raise CustomAPIException(
+                        detail="The punch was captured in the future or too long ago to be replayed.",
+                        error_code="CapturedAtOutOfRange"
+                    )
+
+                occurrence, attendance_date = _validate_punch(staff_member,
+                                                              entry["captured_at"],
+                                                              occurrences,
+                                                              policies[staff_member.id],
+                                                              schedule=schedules[staff_member.id])
+
+                if (staff_member.id, attendance_date) in marked_keys:
+                    raise CustomAPIException(
+                        detail="User Already Marked thier attendance.",
+                        error_code="AttendanceAlreadyMarked"
+                    )
+
+            except CustomAPIException as e:
+                result["error"] = _exception_to_error(e)
+                continue
+
+            marked_keys.add((staff_member.id, attendance_date))
+            attendances.append(Attendance(
+                staff_member=staff_member,
+                date=attendance_date,
+                occurrence=occurrence,
+                timestamp=entry["captured_at"],
+                staged_image=stage_attendance_image(entry["image"])
+            ))
+            result["status"] = "marked"
+
+        with transaction.atomic():
+            Attendance.objects.bulk_create(attendances)
+            for attendance in attendances:
+                schedule_attendance_image(attendance.id, attendance.staged_image)
+    except IntegrityError:
+        for attendance in attendances:
+            discard_staged_image(attendance.staged_image)
+        raise CustomAPIException(
+            detail="Attendance of some entries was marked while the batch was processed, please retry the batch.",
+            error_code="AttendanceAlreadyMarked"
+        )
+    except Exception:
+        # nothing of the batch was inserted, none of its uploads will be processed.
+        for attendance in attendances:
+            discard_staged_image(attendance.staged_image)
+        raise
+
+    return results
+
+
+def _count_weekdays(start_date: date, end_date: date) -> Dict[str, int]:
+    """
+    Count how many times each weekday occurs between two dates, both included.
+    """
+    days = (end_date - start_date).days + 1
+    day_counts = {day: days // 7 for day, _ in WEEK_DAYS}
+    for offset in range(days % 7):
+        day_counts[(start_date + timedelta(days=offset)).strftime('%A').lower()] += 1
+
+    return day_counts
+
+
+@manager_role_required
+@timed
+def get_attendance_report(*,
+                          manager: CustomUser,
+                          start_date: date,
+                          end_date: date,
+                          after: str = None,
+                          limit: int = 100) -> List[Dict[str, any]]:
+    """
+    Build one page of the per-staff attendance report over a date range.
+
+    Staff members are paginated by employee ID (keyset), and their counts are aggregated
+    by the database with two queries per page, whatever the length of the range, plus one
+    per additional location in the page. A manager of a location only gets its staff members,
+    and late punches are counted with the time zone and policy of each site.
+
+    Args:
+        manager (CustomUser): The manager requesting the report.
+        start_date (date): The first day of the report.
+        end_date (date): The last day of the report, days after today are not counted.
+        after (str, optional): The employee ID the previous page ended with.
+        limit (int): The maximum number of staff members in the page.
+
+    Returns:
+        List[Dict[str, any]]: One row per staff member with its `present`, `absent`,
+                              `weekly_off` and `late` counts.
+    """
+    location_id = get_manager_location_id(manager)
+
+    # future days are neither present nor absent.
+    end_date = min(end_date, now().astimezone(get_attendance_policy(location_id)[0]).date())
+    if start_date > end_date:
+        return []
+
+    staff_members = get_staff_report_page(day_counts=_count_weekdays(start_date, end_date),
+                                          after=after,
+                                          limit=limit,
+                                          location_id=location_id)
+
+    staff_member_ids_by_location = {}
+    for staff_member in staff_members:
+        staff_member_ids_by_location.setdefault(staff_member["location_id"], []).append(staff_member["id"])
+
+    attendance_counts = {}
+    for staff_location_id, staff_member_ids in staff_member_ids_by_location.items():
+        timezone, _, late_after_minutes = get_attendance_policy(staff_location_id)
+        attendance_counts.update(get_attendance_counts(staff_member_ids=staff_member_ids,
+                                                       start_date=start_date,
+                                                       end_date=end_date,
+                                                       late_after_minutes=late_after_minutes,
+                                                       timezone=timezone))
+
+    report = []
+    for staff_member in staff_members:
+        counts = attendance_counts.get(staff_member["id"], {"present": 0, "late": 0})
+        report.append({
+            "employee_id": staff_member["employee_id"],
+            "first_name": staff_member["user__first_name"],
+            "last_name": staff_member["user__last_name"],
+            "present": counts["present"],
+            "absent": max(staff_member["scheduled_days"] - counts["present"], 0),
+            "weekly_off": staff_member["weekly_off_days"],
+            "late": counts["late"],
+        })
+
+    return report
+
+
+@manager_role_required
+@timed
+def iter_attendance_report(*,
+                           manager: CustomUser,
+                           start_date: date,
+                           end_date: date,
+                           page_size: int = 500):
+    """
+    Yield the attendance report of all staff members, one keyset page at a time,
+    so that only a single page is held in memory.
+
+    Args:
+        manager (CustomUser): The manager requesting the report.
+        start_date (date): The first day of the report.
+        end_date (date): The last day of the report.
+        page_size (int): The number of staff members fetched per page.
+
+    Yields:
+        Dict[str, any]: The report row of each staff member, ordered by employee ID.
+    """
+    after = None
+    while True:
+        report = get_attendance_report(manager=manager,
+                                       start_date=start_date,
+                                       end_date=end_date,
+                                       after=after,
+                                       limit=page_size)
+        yield from report
+
+        if len(report) < page_size:
+            return
+        after = report[-1]["employee_id"]
+
+
+@manager_role_required
+@timed
+def get_team_roster(*,
+                    manager: CustomUser) -> List[Dict[str, any]]:
+    """
+    Retrieve the weekly roster of the whole team, or of the location of the manager,
+    see `roster.get_team_roster`.
+
+    Args:
+        manager (CustomUser): The manager requesting the roster.
+
+    Returns:
+        List[Dict[str, any]]: One entry per staff member with the shift, weekly off and
+                              pending interchange requests of every weekday.
+    """
+    return _get_team_roster(get_manager_location_id(manager))
+
+
+@manager_role_required
+@timed
+def export_attendance_csv(*,
+                          manager: CustomUser,
+                          start_date: date,
+                          end_date: date,
+                          compress: bool = False):
+    """
+    Stream the attendance history of a date range as CSV, for payroll. A manager of a
+    location only exports the attendance of its staff members.
+
+    Args:
+        manager (CustomUser): The manager requesting the export.
+        start_date (date): The first day to export.
+        end_date (date): The last day to export.
+        compress (bool): Stream a gzip file instead of plain CSV.
+
+    Returns:
+        Iterator[bytes]: The pieces of the file, produced while they are consumed.
+    """
+    return iter_attendance_csv(start_date=start_date,
+                               end_date=end_date,
+                               compress=compress,
+                               location_id=get_manager_location_id(manager))
+
+
 def _create_shift_interchange_request(*, 
                                       requester: StaffMember,
                                       target: StaffMember,
@@ -232,6 +811,7 @@ def _create_shift_interchange_request(*,
 
 
 @staff_member_role_required
+@timed
 def request_shift_interchange(*,
                               staff_user: CustomUser,
                               target_email: str,
@@ -253,7 +833,7 @@ def request_shift_interchange(*,
     """
 
     targeted_staff_member = get_staff_member_by_email(email=target_email)
-    requester_staff_member = get_staff_member_by_email(email=staff_user.email)
+    requester_staff_member = get_staff_member(staff_user)
 
     # Validate the shift interchange request
     requester_shift, target_shift = validate_shift_interchange_request(
@@ -270,10 +850,40 @@ def request_shift_interchange(*,
     
 
 @staff_member_role_required
+@timed
 def get_shift_interchange_requests(*,
                                   staff_user: CustomUser ):
-    staff_member = get_staff_member_by_email(email=staff_user.email)
-    return ShiftInterchangeRequest.objects.filter(target=staff_member, status="pending")
+    staff_member = get_staff_member(staff_user)
+    return get_pending_shift_interchange_requests(target=staff_member)
+
+
+@staff_member_role_required
+@timed
+async def aget_shift_interchange_requests(*,
+                                          staff_user: CustomUser ) -> List[ShiftInterchangeRequest]:
+    """
+    Async version of `get_shift_interchange_requests`.
+
+    Args:
+        staff_user (CustomUser): The staff member making the request.
+
+    Returns:
+        List[ShiftInterchangeRequest]: The pending requests sent to the staff member.
+    """
+    staff_member = await aget_staff_member(staff_user)
+    if not staff_member:
+        return []
+
+    return await aget_pending_shift_interchange_requests(target=staff_member)
+
+
+@retry_on_database_locked
+def _save_interchanged_shifts(requester_shift: Shift, target_shift: Shift, interchange_request: ShiftInterchangeRequest):
+    # the swap happens before, so that retrying the save does not swap the shifts back.
+    with transaction.atomic():
+        requester_shift.save()
+        target_shift.save()
+        interchange_request.save()
 
 
 def __interchange_shift(interchange_request):
@@ -295,17 +905,17 @@ def __interchange_shift(interchange_request):
 
     # Save the updated shifts and interchange request
     try:
-        with transaction.atomic():
-            requester_shift.save()
-            target_shift.save()
-            interchange_request.save()
+        _save_interchanged_shifts(requester_shift, target_shift, interchange_request)
+        # logged once the save is committed, not on every retry of it.
+        logger.info("Shifts successfully interchanged", extra={"interchange_request_id": interchange_request.pk})
 
-            print("Shifts successfully interchanged.")
+        invalidate_shift_schedule(requester_shift.staff_member_id, target_shift.staff_member_id)
+        generate_shift_occurrences(staff_member_ids=[requester_shift.staff_member_id, target_shift.staff_member_id],
+                                   weekdays=[requester_shift.day, target_shift.day])
         return interchange_request
     
     except IntegrityError as e:
-        print("Error during shift interchange:", str(e))
-        # Handle exception (e.g., rollback, log error)
+        logger.exception("Error during shift interchange", extra={"interchange_request_id": interchange_request.pk})
         raise CustomAPIException(detail=f"Error :- {e}")
 
 
@@ -319,12 +929,13 @@ def _approve_or_reject_shift_interchange_request(interchange_request: ShiftInter
     return __interchange_shift(interchange_request=interchange_request)
 
 @staff_member_role_required
+@timed
 def update_shift_interchange_request_status(*, 
                                      staff_user: CustomUser,
                                      request_id: int,
                                      status: str,
                                      **kwargs ):
-    staff_member = get_staff_member_by_email(email=staff_user.email)
+    staff_member = get_staff_member(staff_user)
     interchange_request = get_shift_interchange_request_by_id(staff_member=staff_member, 
                                                               request_id=request_id )
     
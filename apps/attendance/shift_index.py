@@ -0,0 +1,162 @@
+"""
+shift_index.py
+
+This module keeps a compact, in-process index of the weekly shift schedule so that
+validating an attendance punch against the weekday shifts needs no query.
+
+For every staff member the index maps each weekday to a `ShiftWindow` tuple of
+(start_minute, end_minute), both expressed in minutes since local midnight. An `end_minute` that is not after `start_minute` ends on the next day.
+Punches are checked by the attendance window engine (`windows.py`), which converts
+the windows into aware intervals.
+
+Schedules are loaded lazily, one query for all the staff members that are missing,
+and are dropped by `invalidate_shift_schedule` whenever a shift or weekly off of the
+staff member changes through the services. Entries also expire after `SHIFT_INDEX_TTL`
+seconds so that changes made by other processes (or through the admin) are picked up.
+
+Functions:
+
+- build_shift_window(shift_start: time, shift_end: time) -> ShiftWindow:
+    Build the index entry of a single shift.
+
+- get_shift_schedules(staff_member_ids: Iterable[int]) -> Dict[int, Dict[str, ShiftWindow]]:
+    Retrieve the weekly schedule of many staff members, loading the missing ones at once.
+
+- get_shift_schedule(staff_member_id: int) -> Dict[str, ShiftWindow]:
+    Retrieve the weekly schedule of a single staff member.
+
+- aget_shift_schedule(staff_member_id: int) -> Dict[str, ShiftWindow]:
+    Async version of `get_shift_schedule`.
+
+- invalidate_shift_schedule(*staff_member_ids: int):
+    Drop the cached schedule of the given staff members.
+"""
+
+import threading
+import time as clock
+from datetime import time
+from typing import Dict, Iterable, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import Shift
+
+
+# (start_minute, end_minute) in minutes since local midnight.
+ShiftWindow = Tuple[int, int]
+
+# seconds after which a cached schedule is reloaded from the database.
+SHIFT_INDEX_TTL = getattr(settings, "SHIFT_INDEX_TTL", 60)
+
+
+_lock = threading.Lock()
+_schedules: Dict[int, Tuple[float, Dict[str, ShiftWindow]]] = {}
+
+# bumped on every invalidation, so that a schedule loaded concurrently is not cached stale.
+_generation = 0
+
+
+def build_shift_window(shift_start: time, shift_end: time) -> ShiftWindow:
+    """
+    Build the index entry of a single shift.
+
+    Args:
+        shift_start (time): The local start time of the shift.
+        shift_end (time): The local end time of the shift.
+
+    Returns:
+        ShiftWindow: The (start_minute, end_minute) tuple.
+    """
+    return (shift_start.hour * 60 + shift_start.minute, shift_end.hour * 60 + shift_end.minute)
+
+
+def get_shift_schedules(staff_member_ids: Iterable[int]) -> Dict[int, Dict[str, ShiftWindow]]:
+    """
+    Retrieve the weekly schedule of many staff members.
+
+    Schedules that are not cached (or expired) are loaded with a single query.
+
+    Args:
+        staff_member_ids (Iterable[int]): The IDs of the staff members.
+
+    Returns:
+        Dict[int, Dict[str, ShiftWindow]]: The schedules keyed by staff member ID, each
+                                           mapping a weekday to its shift window.
+    """
+    staff_member_ids = set(staff_member_ids)
+    current = clock.monotonic()
+
+    schedules = {}
+    missing = set()
+    for staff_member_id in staff_member_ids:
+        cached = _schedules.get(staff_member_id)
+        if cached is not None and current - cached[0] < SHIFT_INDEX_TTL:
+            schedules[staff_member_id] = cached[1]
+        else:
+            missing.add(staff_member_id)
+
+    if not missing:
+        return schedules
+
+    generation = _generation
+    loaded = {staff_member_id: {} for staff_member_id in missing}
+    rows = Shift.objects.filter(staff_member_id__in=missing).values_list(
+        "staff_member_id", "day", "shift_start", "shift_end"
+    )
+    for staff_member_id, day, shift_start, shift_end in rows:
+        loaded[staff_member_id][day] = build_shift_window(shift_start, shift_end)
+
+    with _lock:
+        if generation == _generation:
+            for staff_member_id, schedule in loaded.items():
+                _schedules[staff_member_id] = (current, schedule)
+
+    schedules.update(loaded)
+    return schedules
+
+
+def get_shift_schedule(staff_member_id: int) -> Dict[str, ShiftWindow]:
+    """
+    Retrieve the weekly schedule of a single staff member.
+
+    Args:
+        staff_member_id (int): The ID of the staff member.
+
+    Returns:
+        Dict[str, ShiftWindow]: The shift windows keyed by weekday.
+    """
+    return get_shift_schedules([staff_member_id])[staff_member_id]
+
+
+async def aget_shift_schedule(staff_member_id: int) -> Dict[str, ShiftWindow]:
+    """
+    Async version of `get_shift_schedule`, a cached schedule is returned right away and
+    only a missing one is loaded off the event loop.
+
+    Args:
+        staff_member_id (int): The ID of the staff member.
+
+    Returns:
+        Dict[str, ShiftWindow]: The shift windows keyed by weekday.
+    """
+    cached = _schedules.get(staff_member_id)
+    if cached is not None and clock.monotonic() - cached[0] < SHIFT_INDEX_TTL:
+        return cached[1]
+
+    return await sync_to_async(get_shift_schedule)(staff_member_id)
+
+
+def invalidate_shift_schedule(*staff_member_ids: int):
+    """
+    Drop the cached schedule of the given staff members so that it is reloaded on next use.
+
+    Args:
+        *staff_member_ids (int): The IDs of the staff members whose shifts changed.
+    """
+    global _generation
+
+    with _lock:
+        _generation += 1
+        for staff_member_id in staff_member_ids:
+            _schedules.pop(staff_member_id, None)
@@ -0,0 +1,129 @@
+"""
+staff_cache.py
+
+This module resolves the staff member of an authenticated user without a query on
+every staff API call.
+
+The staff member is remembered on the user object for the rest of the request (the JWT
+authentication loads a fresh user per request), and process-wide by user ID for
+`STAFF_MEMBER_CACHE_TTL` seconds. A cached staff member is handed out as a copy attached
+to the user of the request, so changes made to the user are always seen and callers can
+not alter the cached instance. Entries are dropped by `invalidate_staff_member` whenever
+a `StaffMember` is saved or deleted (see `apps.core.signals`).
+
+Functions:
+
+- get_staff_member(user: CustomUser) -> Optional[StaffMember]:
+    Retrieve the staff member of a user, or None if the user is not a staff member.
+
+- aget_staff_member(user: CustomUser) -> Optional[StaffMember]:
+    Async version of `get_staff_member`.
+
+- invalidate_staff_member(*user_ids):
+    Drop the cached staff member of the given users.
+"""
+
+import copy
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .models import CustomUser, StaffMember
+from .queries import get_staff_member_by_user, aget_staff_member_by_user
+
+
+# seconds after which a cached staff member is reloaded from the database.
+STAFF_MEMBER_CACHE_TTL = getattr(settings, "STAFF_MEMBER_CACHE_TTL", 60)
+
+# attribute of the user object holding its staff member for the rest of the request.
+_USER_ATTRIBUTE = "_cached_staff_member"
+
+_MISSING = object()
+
+_lock = threading.Lock()
+_staff_members: Dict[object, Tuple[float, Optional[StaffMember]]] = {}
+
+# bumped on every invalidation, so that a staff member loaded concurrently is not cached stale.
+_generation = 0
+
+
+def _get_cached(user: CustomUser):
+    cached = getattr(user, _USER_ATTRIBUTE, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
+    cached = _staff_members.get(user.pk)
+    if cached is not None and time.monotonic() - cached[0] < STAFF_MEMBER_CACHE_TTL:
+        return _attach(user, cached[1])
+    return _MISSING
+
+
+def _attach(user: CustomUser, staff_member: Optional[StaffMember]) -> Optional[StaffMember]:
+    if staff_member is not None:
+        staff_member = copy.copy(staff_member)
+        staff_member.user = user
+
+    setattr(user, _USER_ATTRIBUTE, staff_member)
+    return staff_member
+
+
+def _store(user: CustomUser, staff_member: Optional[StaffMember], generation: int, loaded_at: float) -> Optional[StaffMember]:
+    with _lock:
+        if generation == _generation:
+            _staff_members[user.pk] = (loaded_at, copy.copy(staff_member))
+    return _attach(user, staff_member)
+
+
+def get_staff_member(user: CustomUser) -> Optional[StaffMember]:
+    """
+    Retrieve the staff member of a user, querying the database only when it is not cached.
+
+    Args:
+        user (CustomUser): The authenticated user.
+
+    Returns:
+        Optional[StaffMember]: The staff member of the user, with `user` set, or None if the
+                               user is not a staff member.
+    """
+    staff_member = _get_cached(user)
+    if staff_member is not _MISSING:
+        return staff_member
+
+    generation, loaded_at = _generation, time.monotonic()
+    return _store(user, get_staff_member_by_user(user=user), generation, loaded_at)
+
+
+async def aget_staff_member(user: CustomUser) -> Optional[StaffMember]:
+    """
+    Async version of `get_staff_member`.
+
+    Args:
+        user (CustomUser): The authenticated user.
+
+    Returns:
+        Optional[StaffMember]: The staff member of the user, with `user` set, or None if the
+                               user is not a staff member.
+    """
+    staff_member = _get_cached(user)
+    if staff_member is not _MISSING:
+        return staff_member
+
+    generation, loaded_at = _generation, time.monotonic()
+    return _store(user, await aget_staff_member_by_user(user=user), generation, loaded_at)
+
+
+def invalidate_staff_member(*user_ids):
+    """
+    Drop the cached staff member of the given users so that it is reloaded on next use.
+
+    Args:
+        *user_ids: The primary keys of the users whose staff member changed.
+    """
+    global _generation
+
+    with _lock:
+        _generation += 1
+        for user_id in user_ids:
+            _staff_members.pop(user_id, None)
@@ -0,0 +1,393 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils.timezone import localtime, now
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.models import Location
+from apps.accounts.testing import create_staff_members
+from apps.core.models import CustomErrors
+from exceptions.restapi import CustomAPIException
+
+from .models import Attendance, Shift, ShiftInterchangeRequest, ShiftOccurrence
+from .occurrences import generate_shift_occurrences
+from .queries import get_attendance_counts
+from .services import _validate_punch, amark_attendance, mark_attendance
+from .shift_index import build_shift_window
+from .staff_cache import get_staff_member
+from .windows import AttendanceWindows, build_shift_interval, get_shift_bounds, intervals_from_schedule
+
+
+INTERCHANGE_LIST_URL = "/api/v1/master/staff/shift/interchange/request/list/"
+
+# list sizes the query count must not depend on.
+QUERY_COUNT_SIZES = [1, 100, 1000]
+
+
+def create_monday_shifts(staff_members, shift_start: time = time(9), shift_end: time = time(17)):
+    return Shift.objects.bulk_create([
+        Shift(staff_member=staff_member, day="monday", shift_start=shift_start, shift_end=shift_end)
+        for staff_member in staff_members
+    ])
+
+
+class ShiftInterchangeRequestListQueryCountTests(TestCase):
+    """
+    The pending requests are listed with `SHIFT_INTERCHANGE_REQUEST_RELATED`, so the query
+    count of the list is the same whatever the number of requests.
+    """
+    def setUp(self):
+        self.target = create_staff_members(0, 1)[0]
+        self.target_shift = create_monday_shifts([self.target], time(18), time(23))[0]
+        self.client = APIClient()
+        # the view authenticates the token itself, `force_authenticate` does not reach it.
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.target.user)}")
+
+    def create_requests(self, start: int, stop: int):
+        requesters = create_staff_members(start, stop)
+        ShiftInterchangeRequest.objects.bulk_create([
+            ShiftInterchangeRequest(requester=requester, target=self.target,
+                                    requester_shift=requester_shift, target_shift=self.target_shift)
+            for requester, requester_shift in zip(requesters, create_monday_shifts(requesters))
+        ])
+
+    def test_query_count_is_constant(self):
+        created = 1
+        for size in QUERY_COUNT_SIZES:
+            with self.subTest(size=size):
+                self.create_requests(created, size + 1)
+                created = size + 1
+
+                # the staff member and the error catalog are cached by the first request,
+                # what is left is the user of the token and the requests.
+                self.client.get(INTERCHANGE_LIST_URL)
+                with self.assertNumQueries(2):
+                    response = self.client.get(INTERCHANGE_LIST_URL)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["data"]), size)
+
+
+class ConcurrentPunchTests(TransactionTestCase):
+    """
+    Parallel punches of a staff member race on the unique constraint of the attendance,
+    only one may win and the uploads of the others must not be left in the staging area.
+    """
+    PUNCHES = 8
+
+    def setUp(self):
+        staging_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, staging_root)
+        settings_override = override_settings(ATTENDANCE_IMAGE_STAGING_ROOT=staging_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.staging_root = staging_root
+
+        # the winning upload stays staged, it is not handed to the image workers.
+        scheduler = mock.patch("apps.attendance.services.schedule_attendance_image")
+        scheduler.start()
+        self.addCleanup(scheduler.stop)
+
+        CustomErrors.objects.create(code="AttendanceAlreadyMarked", status_code=400,
+                                    detail="User Already Marked thier attendance.")
+
+        self.staff_member = create_staff_members(0, 1)[0]
+        self.staff_member.weekly_off = []
+        self.staff_member.save()
+
+        starts_at = now() - timedelta(minutes=10)
+        ShiftOccurrence.objects.create(staff_member=self.staff_member, date=localtime(starts_at).date(),
+                                       starts_at=starts_at, ends_at=starts_at + timedelta(hours=8), generated=False)
+
+    def punch(self, barrier: threading.Barrier):
+        image = SimpleUploadedFile("punch.jpg", b"raw upload", content_type="image/jpeg")
+        barrier.wait()
+        try:
+            return mark_attendance(staff_user=self.staff_member.user, image=image)
+        except CustomAPIException as e:
+            return e
+        finally:
+            # each thread has its own connection, do not leak them.
+            connections.close_all()
+
+    def test_only_one_of_concurrent_punches_is_marked(self):
+        # the staff member is cached up front, the punches race on the attendance only.
+        get_staff_member(self.staff_member.user)
+
+        barrier = threading.Barrier(self.PUNCHES)
+        with ThreadPoolExecutor(max_workers=self.PUNCHES) as executor:
+            results = list(executor.map(self.punch, [barrier] * self.PUNCHES))
+
+        attendances = [result for result in results if isinstance(result, Attendance)]
+        errors = [result for result in results if isinstance(result, CustomAPIException)]
+
+        self.assertEqual(len(attendances), 1)
+        self.assertEqual(len(errors), self.PUNCHES - 1)
+        self.assertEqual({error.error["code"] for error in errors}, {"AttendanceAlreadyMarked"})
+
+        self.assertEqual(Attendance.objects.count(), 1)
+        self.assertEqual(os.listdir(self.staging_root), [attendances[0].staged_image])
+
+    def test_repeated_async_punch_is_rejected_by_the_insert(self):
+        def image():
+            return SimpleUploadedFile("punch.jpg", b"raw upload", content_type="image/jpeg")
+
+        attendance = async_to_sync(amark_attendance)(staff_user=self.staff_member.user, image=image())
+        with self.assertRaises(CustomAPIException) as raised:
+            async_to_sync(amark_attendance)(staff_user=self.staff_member.user, image=image())
+
+        self.assertEqual(raised.exception.error["code"], "AttendanceAlreadyMarked")
+        self.assertEqual(Attendance.objects.count(), 1)
+        self.assertEqual(os.listdir(self.staging_root), [attendance.staged_image])
+
+
+class PunchDateTests(TestCase):
+    """
+    A punch against the weekday templates is marked on the local date its shift started on,
+    like a punch against an occurrence, whatever the UTC date of the punch.
+    """
+    def setUp(self):
+        self.staff_member = create_staff_members(0, 1)[0]
+        self.staff_member.weekly_off = []
+
+    def validate_punch(self, timezone: str, current_utc_time: datetime, schedule):
+        policy = (ZoneInfo(timezone), 60, 15)
+        return _validate_punch(self.staff_member, current_utc_time, {}, policy, schedule=schedule)
+
+    def test_local_date_is_behind_the_utc_date(self):
+        # sunday 18:10 in Los Angeles, already monday in UTC.
+        punch = datetime(2026, 10, 19, 1, 10, tzinfo=dt_timezone.utc)
+        schedule = {"sunday": build_shift_window(time(18), time(23))}
+
+        self.assertEqual(self.validate_punch("America/Los_Angeles", punch, schedule), (None, date(2026, 10, 18)))
+
+    def test_local_date_is_ahead_of_the_utc_date(self):
+        # monday 06:10 in Tokyo, still sunday in UTC.
+        punch = datetime(2026, 10, 18, 21, 10, tzinfo=dt_timezone.utc)
+        schedule = {"monday": build_shift_window(time(6), time(14))}
+
+        self.assertEqual(self.validate_punch("Asia/Tokyo", punch, schedule), (None, date(2026, 10, 19)))
+
+    def test_overnight_shift_is_marked_on_its_start_date(self):
+        # monday 00:10 in Kolkata, during the shift started on sunday 23:30.
+        punch = datetime(2026, 10, 18, 18, 40, tzinfo=dt_timezone.utc)
+        schedule = {"sunday": build_shift_window(time(23, 30), time(7))}
+
+        self.assertEqual(self.validate_punch("Asia/Kolkata", punch, schedule), (None, date(2026, 10, 18)))
+
+
+
+class AttendanceCountsTests(TestCase):
+    """
+    Punches marked against the weekday templates are late or on time against the shift of
+    their attendance date, also after midnight of an overnight shift.
+    """
+    def setUp(self):
+        self.staff_member = create_staff_members(0, 1)[0]
+        Shift.objects.create(staff_member=self.staff_member, day="sunday", shift_start=time(23, 30), shift_end=time(7))
+        Shift.objects.create(staff_member=self.staff_member, day="monday", shift_start=time(9), shift_end=time(17))
+
+    def mark(self, day: date, punch: datetime):
+        Attendance.objects.create(staff_member=self.staff_member, date=day, timestamp=punch)
+
+    def test_punch_after_midnight_is_compared_with_the_overnight_shift(self):
+        kolkata = ZoneInfo("Asia/Kolkata")
+        # sunday 23:40, on time.
+        self.mark(date(2026, 10, 4), datetime(2026, 10, 4, 23, 40, tzinfo=kolkata))
+        # monday 00:10, 40 minutes after the sunday shift started.
+        self.mark(date(2026, 10, 11), datetime(2026, 10, 12, 0, 10, tzinfo=kolkata))
+        # monday 09:10, on time for the monday shift.
+        self.mark(date(2026, 10, 12), datetime(2026, 10, 12, 9, 10, tzinfo=kolkata))
+
+        counts = get_attendance_counts(staff_member_ids=[self.staff_member.id],
+                                       start_date=date(2026, 10, 1),
+                                       end_date=date(2026, 10, 31),
+                                       late_after_minutes=15,
+                                       timezone=kolkata)
+
+        self.assertEqual(counts, {self.staff_member.id: {"present": 3, "late": 1}})
+
+
+class ShiftOccurrenceGenerationTests(TestCase):
+    """
+    The generator only touches the requested weekdays, and starts from yesterday at the site
+    of each staff member when no start date is given.
+    """
+    def setUp(self):
+        self.staff_member = create_staff_members(0, 1)[0]
+        for day in ("sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday"):
+            Shift.objects.create(staff_member=self.staff_member, day=day, shift_start=time(9), shift_end=time(17))
+
+    def test_only_the_given_weekdays_are_regenerated(self):
+        generate_shift_occurrences(start_date=date(2026, 10, 5), days=14)
+        # changed behind the back of the generator, no signal is sent by update().
+        Shift.objects.filter(day__in=["monday", "tuesday"]).update(shift_start=time(10))
+
+        counts = generate_shift_occurrences(start_date=date(2026, 10, 5), days=14, weekdays=["monday"])
+
+        self.assertEqual(counts, {"created": 0, "updated": 2, "deleted": 0})
+        starts = {
+            occurrence.date: localtime(occurrence.starts_at, ZoneInfo("Asia/Kolkata")).time()
+            for occurrence in ShiftOccurrence.objects.filter(date__in=[date(2026, 10, 6), date(2026, 10, 12)])
+        }
+        # monday the 12th is regenerated, tuesday the 6th keeps its old start.
+        self.assertEqual(starts, {date(2026, 10, 6): time(9), date(2026, 10, 12): time(10)})
+
+    def test_default_start_date_follows_the_site(self):
+        location = Location.objects.create(name="Kiritimati", timezone="Pacific/Kiritimati")
+        other_staff_member = create_staff_members(1, 2)[0]
+        other_staff_member.location = location
+        other_staff_member.weekly_off = []
+        other_staff_member.save()
+        self.staff_member.weekly_off = []
+        self.staff_member.save()
+        Shift.objects.create(staff_member=other_staff_member, day="sunday", shift_start=time(9), shift_end=time(17))
+        Shift.objects.create(staff_member=other_staff_member, day="saturday", shift_start=time(9), shift_end=time(17))
+        ShiftOccurrence.objects.all().delete()
+
+        # sunday 16:30 in Kolkata, already monday 01:00 in Kiritimati.
+        with mock.patch("django.utils.timezone.now", return_value=datetime(2026, 10, 18, 11, tzinfo=dt_timezone.utc)):
+            generate_shift_occurrences(days=1)
+
+        dates = dict(ShiftOccurrence.objects.values_list("staff_member_id", "date"))
+        self.assertEqual(dates, {self.staff_member.id: date(2026, 10, 17), other_staff_member.id: date(2026, 10, 18)})
+
+
+UTC = dt_timezone.utc
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def shift(day: date, shift_start: time, shift_end: time, timezone=NEW_YORK, window_minutes: int = 60):
+    return build_shift_interval(*get_shift_bounds(shift_start, shift_end, day, timezone), day, window_minutes=window_minutes)
+
+
+def at(day: date, hour: int, minute: int = 0, timezone=NEW_YORK, fold: int = 0) -> datetime:
+    return datetime.combine(day, time(hour, minute, fold=fold), tzinfo=timezone)
+
+
+class AttendanceWindowsTests(SimpleTestCase):
+    """
+    `AttendanceWindows.match` finds the shift whose attendance window a punch is in, and
+    `running` the shift a punch is inside of, the one that started last for both.
+    """
+    monday = date(2026, 10, 19)
+
+    def assertMatches(self, windows: AttendanceWindows, punch: datetime, match, running):
+        self.assertEqual(windows.match(punch), match, f"match at {punch}")
+        self.assertEqual(windows.running(punch), running, f"running at {punch}")
+
+    def test_overnight_shift(self):
+        night = shift(self.monday, time(22), time(6))
+        windows = AttendanceWindows([night], NEW_YORK)
+
+        self.assertMatches(windows, at(self.monday, 21, 59), None, None)
+        self.assertMatches(windows, at(self.monday, 22, 30), night, night)
+        self.assertMatches(windows, at(self.monday + timedelta(days=1), 0, 30), None, night)
+        self.assertMatches(windows, at(self.monday + timedelta(days=1), 6), None, night)
+        self.assertMatches(windows, at(self.monday + timedelta(days=1), 6, 1), None, None)
+
+    def test_back_to_back_shifts(self):
+        morning = shift(self.monday, time(8), time(12))
+        afternoon = shift(self.monday, time(12), time(16))
+        windows = AttendanceWindows([afternoon, morning], NEW_YORK)
+
+        self.assertMatches(windows, at(self.monday, 8, 30), morning, morning)
+        self.assertMatches(windows, at(self.monday, 11, 59), None, morning)
+        # the shift change belongs to the shift that starts.
+        self.assertMatches(windows, at(self.monday, 12), afternoon, afternoon)
+        self.assertMatches(windows, at(self.monday, 13, 30), None, afternoon)
+
+    def test_overlapping_shifts(self):
+        day = shift(self.monday, time(8), time(16))
+        cover = shift(self.monday, time(8, 30), time(12))
+        windows = AttendanceWindows([day, cover], NEW_YORK)
+
+        self.assertMatches(windows, at(self.monday, 8, 15), day, day)
+        # both windows are open, the punch is for the shift that started last.
+        self.assertMatches(windows, at(self.monday, 8, 45), cover, cover)
+        # the window of the day shift closed, not the one of the cover.
+        self.assertMatches(windows, at(self.monday, 9, 15), cover, cover)
+        self.assertMatches(windows, at(self.monday, 9, 45), None, cover)
+        self.assertMatches(windows, at(self.monday, 13), None, day)
+
+    def test_shift_across_spring_forward(self):
+        # the clocks of New York jump from 02:00 to 03:00 on 2026-03-08.
+        saturday = date(2026, 3, 7)
+        night = shift(saturday, time(22), time(6))
+        windows = AttendanceWindows([night], NEW_YORK)
+
+        self.assertEqual(night[1] - night[0], timedelta(hours=7))
+        self.assertMatches(windows, datetime(2026, 3, 8, 3, 59, tzinfo=UTC), night, night)
+        self.assertMatches(windows, datetime(2026, 3, 8, 9, 59, tzinfo=UTC), None, night)
+        self.assertMatches(windows, datetime(2026, 3, 8, 10, 1, tzinfo=UTC), None, None)
+
+    def test_attendance_window_across_fall_back(self):
+        # the clocks of New York go back from 02:00 to 01:00 on 2026-11-01.
+        sunday = date(2026, 11, 1)
+        early = shift(sunday, time(1), time(9))
+        windows = AttendanceWindows([early], NEW_YORK)
+
+        self.assertEqual(early[1] - early[0], timedelta(hours=9))
+        # the window lasts an hour of elapsed time, not of wall clock time.
+        self.assertMatches(windows, at(sunday, 1, 59), early, early)
+        self.assertMatches(windows, at(sunday, 1, 0, fold=1), None, early)
+        self.assertMatches(windows, at(sunday, 1, 30, fold=1), None, early)
+
+    def test_day_boundary_depends_on_the_site(self):
+        schedule = {"monday": build_shift_window(time(0, 30), time(8))}
+        # monday 00:40 in Tokyo, still sunday 08:40 in Los Angeles.
+        punch = datetime(2026, 10, 18, 15, 40, tzinfo=UTC)
+
+        for timezone, matched_date in ((ZoneInfo("Asia/Tokyo"), self.monday), (ZoneInfo("America/Los_Angeles"), None)):
+            with self.subTest(timezone=timezone):
+                intervals = intervals_from_schedule(schedule, [self.monday - timedelta(days=1), self.monday], timezone=timezone)
+                windows = AttendanceWindows(intervals, timezone)
+
+                match = windows.match(punch)
+                self.assertEqual(match and match[3], matched_date)
+                self.assertEqual(windows.local_date(punch), punch.astimezone(timezone).date())
+                self.assertEqual(windows.has_shift_on(windows.local_date(punch)), matched_date is not None)
+
+    def test_lookups_agree_with_a_linear_scan(self):
+        zones = [ZoneInfo("America/New_York"), ZoneInfo("Asia/Kolkata"), ZoneInfo("Australia/Lord_Howe"), UTC]
+        rng = random.Random(20261018)
+
+        for _ in range(20):
+            timezone = rng.choice(zones)
+            # around the autumn transitions of both hemispheres.
+            first_day = date(2026, 9, 20)
+            intervals = [
+                shift(first_day + timedelta(days=rng.randrange(50)),
+                      time(rng.randrange(24), rng.choice([0, 15, 30, 45])),
+                      time(rng.randrange(24), rng.choice([0, 15, 30, 45])),
+                      timezone,
+                      window_minutes=rng.choice([15, 60, 120]))
+                for _ in range(rng.randrange(1, 60))
+            ]
+            windows = AttendanceWindows(intervals, timezone)
+
+            for _ in range(200):
+                punch = datetime(2026, 9, 19, tzinfo=UTC) + timedelta(minutes=rng.randrange(53 * 24 * 60))
+                punch = punch.astimezone(rng.choice(zones))
+
+                running = [interval for interval in intervals if interval[0] <= punch <= interval[1]]
+                matching = [interval for interval in running if punch < interval[2]]
+                for found, expected in ((windows.match(punch), matching), (windows.running(punch), running)):
+                    if not expected:
+                        self.assertIsNone(found, f"at {punch}")
+                    else:
+                        # equal starts may come in any order, the start is what must agree.
+                        self.assertIn(found, expected, f"at {punch}")
+                        self.assertEqual(found[0], max(interval[0] for interval in expected), f"at {punch}")
@@ -6,75 +6,158 @@ These functions are used to ensure that requests meet certain criteria before th
 
 Functions:
 
-- validate_attendance_request(staff_member: StaffMember, current_day: str, current_time: time):
+- validate_attendance_window(staff_member: StaffMember, windows: AttendanceWindows, current_datetime: datetime) -> ShiftInterval:
+    Validates whether a staff member can mark attendance, against its shift intervals.
+
+- validate_attendance_request(staff_member: StaffMember, current_datetime: datetime, schedule: Dict[str, ShiftWindow] = None, timezone: tzinfo = None, window_minutes: int = ATTENDANCE_WINDOW_MINUTES) -> ShiftInterval:
     Validates whether a staff member can mark attendance based on their shift and weekly off.
+
+- validate_attendance_occurrence(staff_member: StaffMember, occurrences: Iterable[ShiftOccurrence], current_datetime: datetime, timezone: tzinfo = None, window_minutes: int = ATTENDANCE_WINDOW_MINUTES) -> ShiftOccurrence:
+    Validates whether a staff member can mark attendance for one of its dated shift occurrences.
 """
-import pytz
+from datetime import datetime, timedelta, tzinfo
+from typing import Iterable
+from django.utils.timezone import get_default_timezone
 from exceptions.restapi import CustomAPIException
-from .models import StaffMember
-from django.utils.timezone import now, make_aware
-from datetime import datetime, timedelta
-from django.conf import settings  # Import settings
+from .models import StaffMember, ShiftOccurrence
 from .queries import *
+from .shift_index import get_shift_schedule
+from .windows import ATTENDANCE_WINDOW_MINUTES, DAYS, AttendanceWindows, ShiftInterval, intervals_from_occurrences, intervals_from_schedule
+import logging
+
 
-def validate_attendance_request(staff_member: StaffMember, current_day: str, current_datetime):
+logger = logging.getLogger(__name__)
+
+
+def validate_attendance_window(staff_member: StaffMember,
+                               windows: AttendanceWindows,
+                               current_datetime: datetime) -> ShiftInterval:
     """
-    Validates whether a staff member can mark attendance.
+    Validates whether a staff member can mark attendance, against its shift intervals
+    around the punch (see `windows.AttendanceWindows`).
 
     Args:
         staff_member (StaffMember): The staff member attempting to mark attendance.
-        current_day (str): The current day of the week.
-        current_time (time): The current time.
+        windows (AttendanceWindows): The shift intervals of the staff member.
+        current_datetime (datetime): The aware date and time of the punch.
+
+    Returns:
+        ShiftInterval: The interval of the shift the attendance is marked for.
 
     Raises:
-        CustomAPIException: If today is a weekly off day, no shift is found for today, 
+        CustomAPIException: If today is a weekly off day, no shift is found for today,
                             or the current time is outside of shift hours.
     """
-    # Check if today is a weekly off day
-    if current_day in staff_member.weekly_off:
-        raise CustomAPIException(
-            detail=f"Today is {current_day} and this is your weekly off, so you cannot mark attendance.", 
-            error_code="WeeklyOffToday"
-        )
+    interval = windows.match(current_datetime)
+    if interval:
+        return interval
+
+    logger.debug("Punch at %s matches none of %s shift intervals", current_datetime, len(windows))
 
-    shift = get_staff_member_shift(staff_member=staff_member, day=current_day)
-    if not shift:
+    # Check if the current time is inside a shift whose attendance window is already closed
+    running = windows.running(current_datetime)
+    if running:
+        window_minutes = (running[2] - running[0]) // timedelta(minutes=1)
         raise CustomAPIException(
-            detail="No shift found for today.",
-            error_code="NoShiftForToday"
+            detail=f"Attendance can only be marked within {window_minutes} minutes of your shift start time.",
+            error_code="OutOfAttendanceWindow"
         )
 
     # Check if current time is within the shift hours
-    print("start_time", shift.shift_start)
-    print("current_time", current_datetime.time())
-    print("end_time", shift.shift_end)
-
-    if not (shift.shift_start <= current_datetime.time() <= shift.shift_end):
+    current_date = windows.local_date(current_datetime)
+    if windows.has_shift_on(current_date):
         raise CustomAPIException(
             detail="You can only mark attendance within shift hours.",
             error_code="OutOfShiftHours"
         )
 
-    # Combine the shift start time with today's date
-    shift_start_datetime = datetime.combine(now().date(), shift.shift_start)
-    shift_end_datetime = datetime.combine(now().date(), shift.shift_end)
-    
-
-    # Make the shift datetimes timezone-aware
-    tz = pytz.timezone(settings.TIME_ZONE)
-    shift_start_datetime = make_aware(shift_start_datetime, timezone=tz)
-    shift_end_datetime = make_aware(shift_end_datetime, timezone=tz)
-  
-    # Calculate the time range for marking attendance
-    one_hour_after_shift_start = shift_start_datetime + timedelta(hours=1)
-    print("one hour", (one_hour_after_shift_start > current_datetime <= shift_end_datetime))
-    # Check if the current time is within 1 hour of the shift end time
-    if not (one_hour_after_shift_start > current_datetime <= shift_end_datetime):
+    # Check if today is a weekly off day
+    current_day = DAYS[current_date.weekday()]
+    if current_day in staff_member.weekly_off:
         raise CustomAPIException(
-            detail="Attendance can only be marked within 1 hour of your shift end time.",
-            error_code="OutOfAttendanceWindow"
+            detail=f"Today is {current_day} and this is your weekly off, so you cannot mark attendance.",
+            error_code="WeeklyOffToday"
         )
-    
+
+    raise CustomAPIException(
+        detail="No shift found for today.",
+        error_code="NoShiftForToday"
+    )
+
+
+def validate_attendance_request(staff_member: StaffMember,
+                                current_datetime: datetime,
+                                schedule=None,
+                                timezone: tzinfo = None,
+                                window_minutes: int = ATTENDANCE_WINDOW_MINUTES) -> ShiftInterval:
+    """
+    Validates whether a staff member can mark attendance, against its weekday shifts.
+
+    No query happens here once the schedule of the staff member is cached by the shift
+    index. The shifts of the day of the punch and of the day before are converted to
+    intervals, so that an overnight shift is still running after midnight.
+
+    Args:
+        staff_member (StaffMember): The staff member attempting to mark attendance.
+        current_datetime (datetime): The aware date and time of the punch.
+        schedule (Dict[str, ShiftWindow], optional): The weekly schedule of the staff member.
+                                                     Taken from the shift index when not given.
+        timezone (tzinfo, optional): The time zone of the site, the default time zone when None.
+        window_minutes (int): The length of the attendance window of the site.
+
+    Returns:
+        ShiftInterval: The interval of the shift the attendance is marked for.
+
+    Raises:
+        CustomAPIException: If today is a weekly off day, no shift is found for today,
+                            or the current time is outside of shift hours.
+    """
+    if schedule is None:
+        schedule = get_shift_schedule(staff_member.id)
+
+    timezone = timezone or get_default_timezone()
+    current_date = current_datetime.astimezone(timezone).date()
+    windows = AttendanceWindows(
+        intervals_from_schedule(schedule,
+                                [current_date - timedelta(days=1), current_date],
+                                weekly_off=staff_member.weekly_off or [],
+                                timezone=timezone,
+                                window_minutes=window_minutes),
+        timezone,
+    )
+    return validate_attendance_window(staff_member, windows, current_datetime)
+
+
+def validate_attendance_occurrence(staff_member: StaffMember,
+                                   occurrences: Iterable[ShiftOccurrence],
+                                   current_datetime: datetime,
+                                   timezone: tzinfo = None,
+                                   window_minutes: int = ATTENDANCE_WINDOW_MINUTES) -> ShiftOccurrence:
+    """
+    Validates whether a staff member can mark attendance for one of its dated shift occurrences.
+
+    An overnight shift runs past midnight and consecutive shifts may overlap, so the punch is
+    checked against the occurrences of the day of the punch and of the day before. When the
+    attendance window of several of them is open, the punch is for the one that started last.
+
+    Args:
+        staff_member (StaffMember): The staff member attempting to mark attendance.
+        occurrences (Iterable[ShiftOccurrence]): The occurrences of the staff member on the
+                                                 (local) day of the punch and the day before.
+        current_datetime (datetime): The aware date and time of the punch.
+        timezone (tzinfo, optional): The time zone of the site, the default time zone when None.
+        window_minutes (int): The length of the attendance window of the site.
+
+    Returns:
+        ShiftOccurrence: The occurrence the attendance is marked for.
+
+    Raises:
+        CustomAPIException: If today is a weekly off day, no shift is found for today,
+                            or the current time is outside of shift hours.
+    """
+    windows = AttendanceWindows(intervals_from_occurrences(occurrences, window_minutes), timezone)
+    return validate_attendance_window(staff_member, windows, current_datetime)[4]
+
 
 def validate_shift_interchange_request(*, 
                                        requester_staff_member: StaffMember, 
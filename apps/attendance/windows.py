@@ -0,0 +1,240 @@
+"""
+windows.py
+
+The attendance window engine: decides whether a punch is valid, and for which shift.
+
+The shifts of a staff member are converted once into aware `ShiftInterval` tuples of
+(starts_at, ends_at, window_ends_at, date, occurrence) and kept sorted by start in an
+`AttendanceWindows`. The local dates and times of a shift are resolved in the time zone of
+the staff member's site (the default time zone when none is given), and a shift that
+crosses midnight is a single interval ending on the next day. Intervals and punches are
+compared in UTC, so that lengths are elapsed time also across a DST transition, whatever the
+time zone a punch is expressed in.
+
+A punch is valid for a shift when it is inside the shift and before the end of its
+attendance window (`ATTENDANCE_WINDOW_MINUTES` after the start, unless the location of the
+staff member sets another length). A lookup bisects the sorted starts, O(log n), then only
+looks back over the shifts that started recently enough for the punch to still be inside
+them, so that overlapping shifts are supported.
+
+Functions:
+
+- get_shift_bounds(shift_start: time, shift_end: time, day: date, timezone: tzinfo = None) -> Tuple[datetime, datetime]:
+    The aware start and end of a shift on a given local date.
+
+- build_shift_interval(starts_at: datetime, ends_at: datetime, day: date, occurrence: ShiftOccurrence = None, window_minutes: int = ATTENDANCE_WINDOW_MINUTES) -> ShiftInterval:
+    Build the interval of a single shift.
+
+- intervals_from_occurrences(occurrences: Iterable[ShiftOccurrence], window_minutes: int = ATTENDANCE_WINDOW_MINUTES) -> List[ShiftInterval]:
+    Convert dated shift occurrences into intervals.
+
+- intervals_from_schedule(schedule: Dict[str, ShiftWindow], dates: Iterable[date], weekly_off: Iterable[str] = (), timezone: tzinfo = None, window_minutes: int = ATTENDANCE_WINDOW_MINUTES) -> List[ShiftInterval]:
+    Convert a weekly schedule of the shift index into the intervals of the given dates.
+
+Classes:
+
+- AttendanceWindows(intervals: Iterable[ShiftInterval], timezone: tzinfo = None):
+    The sorted shift intervals of a staff member, answering punch lookups.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone, tzinfo
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from django.utils.timezone import get_default_timezone
+
+from helper.constant import WEEK_DAYS
+from .shift_index import ShiftWindow
+
+if TYPE_CHECKING:
+    from .models import ShiftOccurrence
+
+
+# (starts_at, ends_at, window_ends_at, date, occurrence), the occurrence is None for a weekday template.
+ShiftInterval = Tuple[datetime, datetime, datetime, date, Optional["ShiftOccurrence"]]
+
+# date.weekday() numbers the days from 0 (monday), in the order of WEEK_DAYS.
+DAYS = [day for day, _ in WEEK_DAYS]
+
+# attendance can be marked until this many minutes after the shift start, by default.
+ATTENDANCE_WINDOW_MINUTES = 60
+
+
+def get_shift_bounds(shift_start: time, shift_end: time, day: date, timezone: tzinfo = None) -> Tuple[datetime, datetime]:
+    """
+    The aware start and end of a shift on a given local date.
+
+    A shift that does not end after it starts is an overnight shift, it ends on the next day.
+
+    Args:
+        shift_start (time): The local start time of the shift.
+        shift_end (time): The local end time of the shift.
+        day (date): The local date the shift starts on.
+        timezone (tzinfo, optional): The time zone of the site, the default time zone when None.
+
+    Returns:
+        Tuple[datetime, datetime]: The aware start and end of the shift.
+    """
+    timezone = timezone or get_default_timezone()
+    end_day = day if shift_end > shift_start else day + timedelta(days=1)
+    return datetime.combine(day, shift_start, tzinfo=timezone), datetime.combine(end_day, shift_end, tzinfo=timezone)
+
+
+def build_shift_interval(starts_at: datetime,
+                         ends_at: datetime,
+                         day: date,
+                         occurrence: "ShiftOccurrence" = None,
+                         window_minutes: int = ATTENDANCE_WINDOW_MINUTES) -> ShiftInterval:
+    """
+    Build the interval of a single shift.
+
+    Args:
+        starts_at (datetime): The aware start of the shift.
+        ends_at (datetime): The aware end of the shift.
+        day (date): The local date the shift starts on.
+        occurrence (ShiftOccurrence, optional): The occurrence the interval was built from.
+        window_minutes (int): The length of the attendance window after the start.
+
+    Returns:
+        ShiftInterval: The (starts_at, ends_at, window_ends_at, date, occurrence) tuple, in UTC.
+    """
+    # arithmetic on datetimes of the same zone is on wall clock time, not across a DST change.
+    starts_at = starts_at.astimezone(dt_timezone.utc)
+    return (starts_at, ends_at.astimezone(dt_timezone.utc), starts_at + timedelta(minutes=window_minutes), day, occurrence)
+
+
+def intervals_from_occurrences(occurrences: Iterable["ShiftOccurrence"],
+                               window_minutes: int = ATTENDANCE_WINDOW_MINUTES) -> List[ShiftInterval]:
+    """
+    Convert dated shift occurrences into intervals.
+
+    Args:
+        occurrences (Iterable[ShiftOccurrence]): The occurrences of a staff member.
+        window_minutes (int): The length of the attendance window after the start.
+
+    Returns:
+        List[ShiftInterval]: One interval per occurrence.
+    """
+    return [
+        build_shift_interval(occurrence.starts_at, occurrence.ends_at, occurrence.date, occurrence, window_minutes)
+        for occurrence in occurrences
+    ]
+
+
+def intervals_from_schedule(schedule: Dict[str, ShiftWindow],
+                            dates: Iterable[date],
+                            weekly_off: Iterable[str] = (),
+                            timezone: tzinfo = None,
+                            window_minutes: int = ATTENDANCE_WINDOW_MINUTES) -> List[ShiftInterval]:
+    """
+    Convert a weekly schedule of the shift index into the intervals of the given dates.
+
+    Args:
+        schedule (Dict[str, ShiftWindow]): The shift windows of a staff member keyed by weekday.
+        dates (Iterable[date]): The local dates to build intervals for.
+        weekly_off (Iterable[str]): The weekly off days, which get no interval.
+        timezone (tzinfo, optional): The time zone of the site, the default time zone when None.
+        window_minutes (int): The length of the attendance window after the start.
+
+    Returns:
+        List[ShiftInterval]: One interval per date with a shift.
+    """
+    weekly_off = set(weekly_off)
+    intervals = []
+    for day in dates:
+        weekday = DAYS[day.weekday()]
+        shift_window = schedule.get(weekday)
+        if not shift_window or weekday in weekly_off:
+            continue
+
+        start_minute, end_minute = shift_window
+        starts_at, ends_at = get_shift_bounds(time(*divmod(start_minute, 60)), time(*divmod(end_minute, 60)), day, timezone)
+        intervals.append(build_shift_interval(starts_at, ends_at, day, window_minutes=window_minutes))
+
+    return intervals
+
+
+class AttendanceWindows:
+    """
+    The shift intervals of a staff member, sorted by start for O(log n) punch lookups.
+
+    Args:
+        intervals (Iterable[ShiftInterval]): The intervals, in any order.
+        timezone (tzinfo, optional): The time zone of the site, the default time zone when None.
+    """
+    def __init__(self, intervals: Iterable[ShiftInterval], timezone: tzinfo = None):
+        self.intervals = sorted(intervals, key=itemgetter(0))
+        self.timezone = timezone or get_default_timezone()
+        self._starts = [interval[0] for interval in self.intervals]
+        # bound how far back a lookup has to go to find the shifts a punch is inside of.
+        self._longest = max((interval[1] - interval[0] for interval in self.intervals), default=timedelta(0))
+        self._window = max((interval[2] - interval[0] for interval in self.intervals), default=timedelta(0))
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    def match(self, punch: datetime) -> Optional[ShiftInterval]:
+        """
+        The interval a punch is valid for, the one that started last when several are.
+
+        Args:
+            punch (datetime): The aware time of the punch.
+
+        Returns:
+            Optional[ShiftInterval]: The interval, or None when the punch is valid for none.
+        """
+        punch = punch.astimezone(dt_timezone.utc)
+        # only shifts that started less than the longest attendance window before the
+        # punch can still have their window open.
+        earliest = punch - self._window
+        for index in range(bisect_right(self._starts, punch) - 1, -1, -1):
+            starts_at, ends_at, window_ends_at = self.intervals[index][:3]
+            if starts_at <= earliest:
+                return None
+            if punch <= ends_at and punch < window_ends_at:
+                return self.intervals[index]
+
+        return None
+
+    def running(self, punch: datetime) -> Optional[ShiftInterval]:
+        """
+        The interval a punch is inside of, the one that started last when several are.
+
+        Args:
+            punch (datetime): The aware time of the punch.
+
+        Returns:
+            Optional[ShiftInterval]: The interval, or None when the punch is outside of every shift.
+        """
+        punch = punch.astimezone(dt_timezone.utc)
+        earliest = punch - self._longest
+        for index in range(bisect_right(self._starts, punch) - 1, -1, -1):
+            starts_at, ends_at = self.intervals[index][:2]
+            if starts_at < earliest:
+                return None
+            if punch <= ends_at:
+                return self.intervals[index]
+
+        return None
+
+    def has_shift_on(self, day: date) -> bool:
+        """
+        Whether a shift starts on a local date of the site.
+
+        Args:
+            day (date): The local date.
+
+        Returns:
+            bool: True if some interval starts on that date.
+        """
+        day_start = datetime.combine(day, time(0), tzinfo=self.timezone)
+        next_day_start = datetime.combine(day + timedelta(days=1), time(0), tzinfo=self.timezone)
+        index = bisect_left(self._starts, day_start)
+        return index < len(self._starts) and self._starts[index] < next_day_start
+
+    def local_date(self, punch: datetime) -> date:
+        """
+        The local date of a punch at the site.
+        """
+        return punch.astimezone(self.timezone).date()
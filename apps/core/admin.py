@@ -5,4 +5,10 @@ from .models import *
 @admin.register(CustomErrors)
 class CustomErrorAdmin(admin.ModelAdmin):
     list_display = ('code', 'detail')
-    
\ No newline at end of file
+
+
+@admin.register(UnregisteredDeviceToken)
+class UnregisteredDeviceTokenAdmin(admin.ModelAdmin):
+    list_display = ('token', 'reason', 'created_on')
+    list_filter = ('reason',)
+    search_fields = ('token',)
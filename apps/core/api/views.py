@@ -0,0 +1,16 @@
+from django.http import HttpResponse
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+# local imports
+from apps.core.services import get_metrics
+
+
+class MetricsAPI(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        content = get_metrics(manager=request.user)
+        return HttpResponse(content, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,163 @@
+"""
+error_catalog.py
+
+This module keeps a process-wide, in-memory copy of the `CustomErrors` table so that
+raising a `CustomAPIException` never has to touch the database.
+
+The whole table is loaded with a single query the first time an error is looked up,
+keyed by `code` and stored in its serialized (dict) form. The catalog is dropped
+whenever a `CustomErrors` row is saved or deleted (admin, shell) and after
+`scripts.errors.create_errors`, and is reloaded after `ERROR_CATALOG_TTL` seconds so
+that changes made by other processes are eventually picked up.
+
+Hits on each error code are counted in memory and written back to `CustomErrors.count`
+in batches by `flush_error_counts`, which runs after a request has finished.
+
+Functions:
+
+- get_error(code: str) -> Optional[dict]:
+    Return the serialized error for the given code, or None if it does not exist.
+
+- aload_error_catalog():
+    Load the catalog ahead of time from async code, where `get_error` cannot query the database.
+
+- invalidate_error_catalog():
+    Drop the cached catalog so that it is reloaded on next use.
+
+- flush_error_counts(force: bool = False):
+    Persist the pending per-code hit counts.
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+
+from .models import CustomErrors
+
+
+# seconds after which the catalog is reloaded from the database.
+ERROR_CATALOG_TTL = getattr(settings, "ERROR_CATALOG_TTL", 300)
+
+# pending hits (summed over all codes) that trigger a write back of the counts.
+ERROR_COUNT_FLUSH_THRESHOLD = getattr(settings, "ERROR_COUNT_FLUSH_THRESHOLD", 100)
+
+# seconds after which pending hits are written back regardless of the threshold.
+ERROR_COUNT_FLUSH_INTERVAL = getattr(settings, "ERROR_COUNT_FLUSH_INTERVAL", 60)
+
+
+_lock = threading.Lock()
+_catalog: Optional[Dict[str, dict]] = None
+_loaded_at = 0.0
+
+_pending_counts = Counter()
+_last_flush = time.monotonic()
+
+
+def _load_error_catalog() -> Dict[str, dict]:
+    """
+    Load every `CustomErrors` row with a single query.
+
+    Returns:
+        Dict[str, dict]: The serialized errors keyed by their code.
+    """
+    return {error["code"]: error for error in CustomErrors.objects.values()}
+
+
+def _get_catalog() -> Dict[str, dict]:
+    global _catalog, _loaded_at
+
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - _loaded_at < ERROR_CATALOG_TTL:
+        return catalog
+
+    with _lock:
+        if _catalog is None or time.monotonic() - _loaded_at >= ERROR_CATALOG_TTL:
+            _catalog = _load_error_catalog()
+            _loaded_at = time.monotonic()
+        return _catalog
+
+
+def get_error(code: str) -> Optional[dict]:
+    """
+    Retrieve the serialized error for the given code and record a hit on it.
+
+    Args:
+        code (str): The error code to look up.
+
+    Returns:
+        Optional[dict]: A copy of the serialized error, safe for the caller to mutate,
+                        or None if no error with this code exists.
+    """
+    if not code:
+        return None
+
+    error = _get_catalog().get(code)
+    if error is None:
+        return None
+
+    with _lock:
+        _pending_counts[code] += 1
+        pending = _pending_counts[code]
+
+    error = dict(error)
+    error["count"] += pending
+    return error
+
+
+async def aload_error_catalog():
+    """
+    Load the catalog (when missing or expired) from async code, so that a `CustomAPIException`
+    raised on the event loop finds its error without querying the database.
+    """
+    if _catalog is None or time.monotonic() - _loaded_at >= ERROR_CATALOG_TTL:
+        await sync_to_async(_get_catalog)()
+
+
+def invalidate_error_catalog():
+    """
+    Drop the cached catalog so that the next lookup reloads it from the database.
+    """
+    global _catalog
+
+    with _lock:
+        _catalog = None
+
+
+def flush_error_counts(force: bool = False):
+    """
+    Write the pending per-code hit counts back to `CustomErrors.count`.
+
+    Nothing is written until `ERROR_COUNT_FLUSH_THRESHOLD` hits are pending or
+    `ERROR_COUNT_FLUSH_INTERVAL` seconds have passed since the last flush, unless
+    `force` is set.
+
+    Args:
+        force (bool): Flush whatever is pending right away.
+    """
+    global _last_flush
+
+    with _lock:
+        if not _pending_counts:
+            return
+
+        due = time.monotonic() - _last_flush >= ERROR_COUNT_FLUSH_INTERVAL
+        if not (force or due or sum(_pending_counts.values()) >= ERROR_COUNT_FLUSH_THRESHOLD):
+            return
+
+        pending = dict(_pending_counts)
+        _pending_counts.clear()
+        _last_flush = time.monotonic()
+
+        # move the hits into the cached rows so the served counts stay current.
+        if _catalog is not None:
+            for code, hits in pending.items():
+                if code in _catalog:
+                    _catalog[code] = {**_catalog[code], "count": _catalog[code]["count"] + hits}
+
+    for code, hits in pending.items():
+        CustomErrors.objects.filter(code=code).update(count=F("count") + hits)
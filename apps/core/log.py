@@ -0,0 +1,80 @@
+"""
+log.py
+
+Logging building blocks referenced from `LOGGING` in the settings.
+
+Modules log through their own `logging.getLogger(__name__)`. Records are handed to
+`QueueStreamHandler`, which only puts them on an in-memory queue; a background thread
+formats them with `JSONFormatter` (one JSON object per line) and writes them out, so the
+request thread never blocks on stdout/stderr. Debug records are dropped by level before
+any of this happens.
+
+Classes:
+
+- JSONFormatter:
+    Formats a record as a single line JSON object, including its `extra` fields.
+
+- QueueStreamHandler:
+    Queues records for a background thread writing them to a stream.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+# attributes every LogRecord has, anything else was passed with `extra`.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats a record as a single line JSON object, including its `extra` fields.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, default=str)
+
+
+class QueueStreamHandler(QueueHandler):
+    """
+    Queues records for a background thread, which formats them and writes them to a stream.
+
+    The formatter configured on this handler is used by the background thread.
+    """
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        # flush the queued records when the process exits.
+        atexit.register(self.listener.stop)
+
+    def setFormatter(self, formatter: logging.Formatter) -> None:
+        self.target.setFormatter(formatter)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # only what cannot cross threads is resolved here, formatting happens in the listener.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
@@ -0,0 +1,197 @@
+"""
+metrics.py
+
+This module keeps the in-memory histograms filled by the opt-in profiling, and renders them
+in the Prometheus text format.
+
+When `PROFILING_ENABLED` is set, `ProfilingMiddleware` records the wall time, the number of
+queries and the database time of every request, and the `timed` decorator records the time
+spent in each service function, all labelled by the URL pattern of the request.
+
+Functions:
+
+- observe(histogram: Histogram, labels: Tuple[str, ...], value: float) -> None:
+    Record a value in a histogram.
+
+- timed(func):
+    Decorator recording the time spent in a service function.
+
+- get_current_route() -> str:
+    The URL pattern of the request being processed.
+
+- set_current_route(route: str) -> Token:
+    Set the URL pattern of the request being processed.
+
+- reset_current_route(token: Token) -> None:
+    Restore the URL pattern replaced by `set_current_route`.
+
+- render_metrics() -> str:
+    Render every histogram in the Prometheus text format.
+"""
+
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar, Token
+from functools import wraps
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+
+
+PROFILING_ENABLED = getattr(settings, "PROFILING_ENABLED", False)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# the URL pattern of the request being processed, "" outside of requests.
+_current_route: ContextVar[str] = ContextVar("current_route", default="")
+
+
+class Histogram:
+    """
+    A labelled histogram, with cumulative buckets like Prometheus expects.
+    """
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [count per bucket (the last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in sorted(self._series.items())]
+
+        for labels, counts, total in series:
+            label_pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)]
+
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                bucket_labels = ",".join([*label_pairs, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+
+            series_labels = ",".join(label_pairs)
+            lines.append(f"{self.name}_sum{{{series_labels}}} {total}")
+            lines.append(f"{self.name}_count{{{series_labels}}} {cumulative}")
+
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Wall time of the requests.",
+    ("method", "route", "status"), DURATION_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Number of database queries of the requests.",
+    ("method", "route"), QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Time the requests spent in database queries.",
+    ("method", "route"), DURATION_BUCKETS,
+)
+SERVICE_DURATION = Histogram(
+    "service_duration_seconds", "Time spent in the service functions.",
+    ("route", "service"), DURATION_BUCKETS,
+)
+
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_QUERIES, REQUEST_DB_DURATION, SERVICE_DURATION]
+
+
+def observe(histogram: Histogram, labels: Tuple[str, ...], value: float) -> None:
+    """
+    Record a value in a histogram.
+
+    Args:
+        histogram (Histogram): One of the `HISTOGRAMS`.
+        labels (Tuple[str, ...]): The values of the labels of the histogram, in order.
+        value (float): The observed value.
+    """
+    histogram.observe(labels, value)
+
+
+def get_current_route() -> str:
+    """
+    The URL pattern of the request being processed, "" outside of requests.
+    """
+    return _current_route.get()
+
+
+def set_current_route(route: str) -> Token:
+    """
+    Set the URL pattern of the request being processed.
+
+    Returns:
+        Token: Restores the previous route when passed to `reset_current_route`.
+    """
+    return _current_route.set(route)
+
+
+def reset_current_route(token: Token) -> None:
+    """
+    Restore the URL pattern replaced by `set_current_route`.
+    """
+    _current_route.reset(token)
+
+
+def timed(func):
+    """
+    Record the time spent in a service function, labelled by the URL pattern of the request.
+
+    Applied under the role decorators, so that the name of the service function is kept.
+    Coroutine functions are timed until their coroutine completes.
+    """
+    name = f"{func.__module__}.{func.__name__}"
+
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if not PROFILING_ENABLED:
+                return await func(*args, **kwargs)
+
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                observe(SERVICE_DURATION, (get_current_route(), name), time.perf_counter() - started)
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not PROFILING_ENABLED:
+            return func(*args, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe(SERVICE_DURATION, (get_current_route(), name), time.perf_counter() - started)
+    return wrapper
+
+
+def render_metrics() -> str:
+    """
+    Render every histogram in the Prometheus text format.
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
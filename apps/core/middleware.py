@@ -0,0 +1,60 @@
+import time
+from contextlib import ExitStack
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import (
+    PROFILING_ENABLED,
+    REQUEST_DB_DURATION,
+    REQUEST_DURATION,
+    REQUEST_QUERIES,
+    observe,
+    reset_current_route,
+    set_current_route,
+)
+
+
+class ProfilingMiddleware:
+    """
+    Records the wall time, the number of queries and the database time of every request,
+    per URL pattern, when `PROFILING_ENABLED` is set. See `apps.core.metrics`.
+    """
+    def __init__(self, get_response):
+        if not PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = {"queries": 0, "db_time": 0.0}
+
+        def record_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats["queries"] += 1
+                stats["db_time"] += time.perf_counter() - started
+
+        token = set_current_route("unmatched")
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(record_query))
+                response = self.get_response(request)
+        finally:
+            reset_current_route(token)
+
+        elapsed = time.perf_counter() - started
+        route = getattr(request.resolver_match, "route", None) or "unmatched"
+
+        observe(REQUEST_DURATION, (request.method, route, str(response.status_code)), elapsed)
+        observe(REQUEST_QUERIES, (request.method, route), stats["queries"])
+        observe(REQUEST_DB_DURATION, (request.method, route), stats["db_time"])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # the URL is resolved by now, label the service timings of the view with its pattern.
+        set_current_route(request.resolver_match.route)
+        return None
@@ -13,4 +13,15 @@ class CustomErrors(models.Model):
     
     def increase_count(self):
         self.count += 1
-        self.save()
\ No newline at end of file
+        self.save()
+
+class UnregisteredDeviceToken(models.Model):
+    """
+    Device tokens FCM reported as unregistered or invalid, skipped by future sends.
+    """
+    token = models.CharField(max_length=255, unique=True)
+    reason = models.CharField(max_length=64)
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.token[:16]}... - {self.reason}"
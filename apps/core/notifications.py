@@ -0,0 +1,197 @@
+"""
+notifications.py
+
+This module dispatches push notifications to many devices without blocking the caller.
+
+Token lists are split into chunks of at most `FCM_MULTICAST_LIMIT` tokens (the FCM
+multicast cap), and the chunks are sent concurrently from a bounded thread pool. Tokens
+that fail with a transient error are retried with exponential backoff, while tokens FCM
+reports as unregistered or invalid are stored as `UnregisteredDeviceToken` and left out
+of every later send.
+
+The actual sending goes through a transport, `FirebaseTransport` by default, which can
+be swapped with `set_transport` for a local stand-in (tests, development).
+
+Functions:
+
+- send_notification(*, title: str, body: str, data: Dict[str, str], tokens: List[str]) -> List[Future]:
+    Queue a notification for many devices and return right away.
+
+- set_transport(transport) -> None:
+    Replace the transport used to send the chunks.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+from .models import UnregisteredDeviceToken
+from .routers import unit_of_work
+
+
+logger = logging.getLogger(__name__)
+
+# FCM refuses multicast messages with more tokens than this.
+FCM_MULTICAST_LIMIT = 500
+
+NOTIFICATION_WORKERS = getattr(settings, "NOTIFICATION_WORKERS", 4)
+NOTIFICATION_MAX_RETRIES = getattr(settings, "NOTIFICATION_MAX_RETRIES", 3)
+NOTIFICATION_RETRY_BACKOFF = getattr(settings, "NOTIFICATION_RETRY_BACKOFF", 0.5)
+
+# outcomes a transport reports for each token, None meaning delivered.
+TRANSIENT = "transient"
+UNREGISTERED = "unregistered"
+INVALID = "invalid"
+FAILED = "failed"
+
+
+class FirebaseTransport:
+    """
+    Sends a chunk of tokens as one FCM multicast message through the Firebase Admin SDK.
+    """
+    def send(self, *, title: str, body: str, data: Dict[str, str], tokens: List[str]) -> List[Optional[str]]:
+        from firebase_admin import exceptions, messaging
+        from authentication.client import get_firebase_client
+
+        alert = messaging.ApsAlert(title=title, body=body)
+        aps = messaging.Aps(custom_data=data, alert=alert)
+        message = messaging.MulticastMessage(
+            data=data,
+            apns=messaging.APNSConfig(payload=messaging.APNSPayload(aps)),
+            tokens=tokens,
+        )
+
+        response = get_firebase_client().send_each_for_multicast(message)
+
+        # the order of responses corresponds to the order of the tokens.
+        outcomes = []
+        for result in response.responses:
+            error = result.exception
+            if result.success:
+                outcomes.append(None)
+            elif isinstance(error, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+                outcomes.append(UNREGISTERED)
+            elif isinstance(error, exceptions.InvalidArgumentError):
+                outcomes.append(INVALID)
+            elif isinstance(error, (messaging.QuotaExceededError, exceptions.UnavailableError, exceptions.InternalError)):
+                outcomes.append(TRANSIENT)
+            else:
+                outcomes.append(FAILED)
+        return outcomes
+
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_transport = FirebaseTransport()
+
+
+def set_transport(transport) -> None:
+    """
+    Replace the transport used to send the chunks, e.g. with a local stand-in.
+
+    Args:
+        transport: An object with a `send(*, title, body, data, tokens)` method returning
+                   one outcome per token (None, TRANSIENT, UNREGISTERED, INVALID or FAILED).
+    """
+    global _transport
+    _transport = transport
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=NOTIFICATION_WORKERS, thread_name_prefix="notifications")
+    return _executor
+
+
+@unit_of_work
+def _send_chunk(title: str, body: str, data: Dict[str, str], tokens: List[str]) -> Dict[str, List[str]]:
+    """
+    Send one chunk, retrying the tokens that failed transiently, and store the dead tokens.
+
+    Returns:
+        Dict[str, List[str]]: The `sent`, `pruned` and `failed` tokens of the chunk.
+    """
+    result = {"sent": [], "pruned": [], "failed": []}
+    dead_tokens = []
+
+    try:
+        pending = tokens
+        for attempt in range(NOTIFICATION_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(NOTIFICATION_RETRY_BACKOFF * 2 ** (attempt - 1) * (1 + random.random()))
+
+            try:
+                outcomes = _transport.send(title=title, body=body, data=data, tokens=pending)
+            except Exception as e:
+                # the whole request failed (network, auth), retry every token of the chunk.
+                logger.warning("Error while sending notifications: %s", e, extra={"attempt": attempt})
+                outcomes = [TRANSIENT] * len(pending)
+
+            retry = []
+            for token, outcome in zip(pending, outcomes):
+                if outcome is None:
+                    result["sent"].append(token)
+                elif outcome == TRANSIENT:
+                    retry.append(token)
+                elif outcome in (UNREGISTERED, INVALID):
+                    dead_tokens.append(UnregisteredDeviceToken(token=token, reason=outcome))
+                    result["pruned"].append(token)
+                else:
+                    result["failed"].append(token)
+
+            pending = retry
+            if not pending:
+                break
+
+        result["failed"].extend(pending)
+
+        if dead_tokens:
+            UnregisteredDeviceToken.objects.bulk_create(dead_tokens, ignore_conflicts=True)
+
+        return result
+    finally:
+        # worker threads have their own connections, do not leak them.
+        connections.close_all()
+
+
+def send_notification(*,
+                      title: str,
+                      body: str,
+                      data: Dict[str, str],
+                      tokens: List[str]) -> List[Future]:
+    """
+    Queue a notification for many devices and return right away.
+
+    Known unregistered tokens are dropped, and the rest is sent in chunks of at most
+    `FCM_MULTICAST_LIMIT` tokens, concurrently, by the notification thread pool.
+
+    Args:
+        title (str): The title of the notification.
+        body (str): The body of the notification.
+        data (Dict[str, str]): The data payload delivered to the app.
+        tokens (List[str]): The device tokens to notify.
+
+    Returns:
+        List[Future]: One future per chunk, resolving to its `sent`, `pruned` and `failed` tokens.
+    """
+    tokens = list(dict.fromkeys(tokens))
+    unregistered = set(
+        UnregisteredDeviceToken.objects.filter(token__in=tokens).values_list("token", flat=True)
+    )
+    tokens = [token for token in tokens if token not in unregistered]
+
+    executor = _get_executor()
+    return [
+        executor.submit(_send_chunk, title, body, data, tokens[start:start + FCM_MULTICAST_LIMIT])
+        for start in range(0, len(tokens), FCM_MULTICAST_LIMIT)
+    ]
@@ -0,0 +1,132 @@
+"""
+routers.py
+
+This module routes the reads of read-only query functions to a replica database.
+
+Query functions decorated with `read_only` are evaluated against the `REPLICA_DATABASE_ALIAS`
+database, when one is configured. Everything else, including every write, goes to the
+primary (`default`) database. Once a request has written anything, or while a transaction
+is open on the primary, its reads stay on the primary as well, so a request always reads
+its own writes regardless of the replication lag.
+
+The writes are tracked per context, and forgotten when a request starts. Work done outside
+of a request by a long-lived thread (e.g. the image and notification workers) is wrapped in
+`unit_of_work`, so that one task writing does not pin every later task of the thread to the
+primary. A management command is a single unit of work: once it wrote, it reads from the
+primary until it exits.
+
+Functions:
+
+- read_only(func):
+    Decorator routing the queries of a query function to the replica.
+
+- reset_stickiness() -> None:
+    Forget the writes of the previous request, called when a request starts.
+
+- unit_of_work(func):
+    Decorator running a task outside of a request with its own write stickiness.
+"""
+
+import inspect
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import QuerySet
+
+
+REPLICA_DATABASE_ALIAS = getattr(settings, "REPLICA_DATABASE_ALIAS", "replica")
+
+_read_only: ContextVar[bool] = ContextVar("read_only", default=False)
+_written: ContextVar[bool] = ContextVar("written", default=False)
+
+
+def _read_alias() -> str:
+    if (
+        REPLICA_DATABASE_ALIAS not in settings.DATABASES
+        or _written.get()
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    ):
+        return DEFAULT_DB_ALIAS
+    return REPLICA_DATABASE_ALIAS
+
+
+def read_only(func):
+    """
+    Route the queries of a query function to the replica, unless the request already wrote.
+
+    Querysets returned by the function are pinned to the chosen database, so they are read
+    from it even when evaluated later on, e.g. by a serializer. Coroutine functions stay on
+    the replica until their coroutine completes, so they must not return a lazy QuerySet.
+    """
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token = _read_only.set(_read_alias() != DEFAULT_DB_ALIAS)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _read_only.reset(token)
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        alias = _read_alias()
+
+        token = _read_only.set(alias != DEFAULT_DB_ALIAS)
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+
+        if isinstance(result, QuerySet) and result._db is None:
+            result = result.using(alias)
+        return result
+    return wrapper
+
+
+def reset_stickiness() -> None:
+    """
+    Forget the writes of the previous request, called when a request starts.
+    """
+    _written.set(False)
+
+
+def unit_of_work(func):
+    """
+    Run a task outside of a request, e.g. on a worker thread, with its own write stickiness:
+    it starts reading from the replica, and its writes do not outlive it.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _written.set(False)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _written.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Database router sending `read_only` query functions to the replica and everything else to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        if _read_only.get():
+            return _read_alias()
+        # objects loaded from the replica must not keep reading from it after a write.
+        if _written.get():
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        _written.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DATABASE_ALIAS
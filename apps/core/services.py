@@ -0,0 +1,17 @@
+from apps.accounts.decorators import manager_role_required
+from apps.accounts.models import CustomUser
+from .metrics import render_metrics
+
+
+@manager_role_required
+def get_metrics(*, manager: CustomUser) -> str:
+    """
+    Render the request and service timings recorded by the profiling, for a manager.
+
+    Args:
+        manager (CustomUser): The manager requesting the metrics.
+
+    Returns:
+        str: The histograms in the Prometheus text format.
+    """
+    return render_metrics()
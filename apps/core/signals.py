@@ -0,0 +1,75 @@
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.locations import invalidate_locations
+from apps.accounts.models import CustomUser, Location, StaffManager, StaffMember
+from apps.attendance.models import Shift, ShiftInterchangeRequest
+from apps.attendance.roster import invalidate_team_roster
+from apps.attendance.staff_cache import invalidate_staff_member
+from authentication.tokens import invalidate_user
+
+from .error_catalog import flush_error_counts, invalidate_error_catalog
+from .models import CustomErrors
+from .routers import reset_stickiness
+from .sqlite import configure_connection
+
+
+@receiver(post_save, sender=CustomErrors)
+@receiver(post_delete, sender=CustomErrors)
+def _invalidate_error_catalog(sender, **kwargs):
+    invalidate_error_catalog()
+
+
+@receiver(post_save, sender=StaffMember)
+@receiver(post_delete, sender=StaffMember)
+def _invalidate_staff_member(sender, instance, **kwargs):
+    invalidate_staff_member(instance.user_id)
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=StaffManager)
+@receiver(post_delete, sender=StaffManager)
+def _invalidate_locations(sender, **kwargs):
+    invalidate_locations()
+
+
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+@receiver(post_save, sender=StaffMember)
+@receiver(post_delete, sender=StaffMember)
+@receiver(post_save, sender=ShiftInterchangeRequest)
+@receiver(post_delete, sender=ShiftInterchangeRequest)
+def _invalidate_team_roster(sender, **kwargs):
+    invalidate_team_roster()
+
+
+@receiver(post_save, sender=CustomUser)
+def _invalidate_team_roster_on_user_change(sender, instance, update_fields=None, **kwargs):
+    # the roster shows the names of the staff, logins only touch last_login.
+    if instance.role == "staff" and update_fields != frozenset(["last_login"]):
+        invalidate_team_roster()
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def _invalidate_user(sender, instance, **kwargs):
+    # deactivations and role changes must reach the next request, not the next expiry.
+    invalidate_user(instance.pk)
+
+
+@receiver(request_finished)
+def _flush_error_counts(sender, **kwargs):
+    flush_error_counts()
+
+
+@receiver(request_started)
+def _reset_replica_stickiness(sender, **kwargs):
+    reset_stickiness()
+
+
+@receiver(connection_created)
+def _configure_sqlite_connection(sender, connection, **kwargs):
+    configure_connection(connection)
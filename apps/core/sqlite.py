@@ -0,0 +1,102 @@
+"""
+sqlite.py
+
+This module tunes SQLite for many concurrent writers on a single node.
+
+Every new SQLite connection is configured with `SQLITE_PRAGMAS`: WAL journaling lets
+readers run alongside the writer, `synchronous=NORMAL` only syncs at checkpoints, and
+`busy_timeout` makes a writer wait for the lock instead of failing right away. Writes
+that still hit "database is locked" (e.g. when a read transaction is upgraded to a write
+one) are retried by `retry_on_database_locked` with exponential backoff.
+
+Functions:
+
+- configure_connection(connection) -> None:
+    Apply `SQLITE_PRAGMAS` to a new SQLite connection.
+
+- retry_on_database_locked(func):
+    Decorator retrying a write path when SQLite reports the database as locked.
+"""
+
+import asyncio
+import inspect
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection as default_connection
+
+
+SQLITE_PRAGMAS = getattr(settings, "SQLITE_PRAGMAS", {})
+SQLITE_LOCK_RETRIES = getattr(settings, "SQLITE_LOCK_RETRIES", 5)
+SQLITE_LOCK_RETRY_BACKOFF = getattr(settings, "SQLITE_LOCK_RETRY_BACKOFF", 0.05)
+
+
+def configure_connection(connection) -> None:
+    """
+    Apply `SQLITE_PRAGMAS` to a new SQLite connection, other databases are left untouched.
+
+    Args:
+        connection (BaseDatabaseWrapper): The connection that was just opened.
+    """
+    if connection.vendor != "sqlite" or not SQLITE_PRAGMAS:
+        return
+
+    with connection.cursor() as cursor:
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+def _is_database_locked(exception: OperationalError) -> bool:
+    return "database is locked" in str(exception) or "database table is locked" in str(exception)
+
+
+def _should_retry(exception: OperationalError, attempt: int) -> bool:
+    return (
+        _is_database_locked(exception)
+        and attempt < SQLITE_LOCK_RETRIES
+        and not default_connection.in_atomic_block
+    )
+
+
+def _backoff(attempt: int) -> float:
+    return SQLITE_LOCK_RETRY_BACKOFF * 2 ** attempt * (1 + random.random())
+
+
+def retry_on_database_locked(func):
+    """
+    Retry a write path up to `SQLITE_LOCK_RETRIES` times when SQLite reports the database as locked.
+
+    The decorated function must be safe to run again from the start, and is not retried
+    inside an outer transaction, which the failure already broke. Coroutine functions wait
+    between attempts without blocking the event loop.
+    """
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            attempt = 0
+            while True:
+                try:
+                    return await func(*args, **kwargs)
+                except OperationalError as e:
+                    if not _should_retry(e, attempt):
+                        raise
+
+                    await asyncio.sleep(_backoff(attempt))
+                    attempt += 1
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if not _should_retry(e, attempt):
+                    raise
+
+                time.sleep(_backoff(attempt))
+                attempt += 1
+    return wrapper
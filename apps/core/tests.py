@@ -0,0 +1,245 @@
+import ast
+import threading
+import time
+from concurrent.futures import wait
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.models import CustomUser
+from apps.accounts.queries import get_staff_members
+from authentication.tokens import get_user_cached, invalidate_user, verify_id_token_cached
+from scripts.errors import create_errors, error_messages
+
+from . import notifications
+from .error_catalog import get_error
+from .models import CustomErrors, UnregisteredDeviceToken
+from .routers import REPLICA_DATABASE_ALIAS, reset_stickiness, unit_of_work
+
+
+# packages serving requests, where output goes through the module loggers (see apps.core.log).
+LOGGED_PACKAGES = ["apps", "authentication", "config", "exceptions", "helper"]
+
+
+class NoPrintTests(SimpleTestCase):
+    """
+    print() writes synchronously to stdout on the request path, e.g. on every punch.
+    """
+    def test_request_code_does_not_print(self):
+        calls = []
+        for package in LOGGED_PACKAGES:
+            for path in sorted(Path(settings.BASE_DIR, package).rglob("*.py")):
+                for node in ast.walk(ast.parse(path.read_text(), filename=str(path))):
+                    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "print":
+                        calls.append(f"{path.relative_to(settings.BASE_DIR)}:{node.lineno}")
+
+        self.assertEqual(calls, [], "use a module logger instead of print()")
+
+
+class CachedUserTests(TestCase):
+    """
+    Users cached for the authentication are shared between threads and must follow the database.
+    """
+    def setUp(self):
+        self.user = CustomUser.objects.create(email="staff@example.com", username="staff", role="staff")
+        self.addCleanup(invalidate_user, self.user.pk)
+
+    def get_user(self):
+        return get_user_cached("uid-staff", lambda uid: CustomUser.objects.get(pk=self.user.pk))
+
+    def test_requests_get_their_own_copy(self):
+        self.get_user().role = "manager"
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_user().role, "staff")
+
+    def test_saving_the_user_drops_it(self):
+        self.get_user()
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertFalse(self.get_user().is_active)
+
+    def test_deleting_the_user_drops_it(self):
+        self.get_user()
+        self.user.delete()
+
+        with self.assertRaises(CustomUser.DoesNotExist):
+            self.get_user()
+
+
+class CachedTokenTests(SimpleTestCase):
+    def test_requests_get_their_own_claims(self):
+        claims = {"uid": "uid-staff", "exp": time.time() + 3600}
+        verify = mock.Mock(return_value=claims)
+
+        verify_id_token_cached("id-token-of-staff", verify)["uid"] = "uid-manager"
+
+        self.assertEqual(verify_id_token_cached("id-token-of-staff", verify), claims)
+        verify.assert_called_once_with("id-token-of-staff")
+
+
+class StandInTransport:
+    """
+    A local transport whose outcome for each token is given by its prefix: `dead-` tokens
+    are unregistered, `bad-` tokens invalid, `broken-` tokens fail for good, `flaky-` tokens
+    fail transiently on their first attempt and `down-` tokens on every attempt.
+    """
+    def __init__(self, raise_first: bool = False):
+        self.raise_first = raise_first
+        self.sends = []
+        self._lock = threading.Lock()
+
+    def send(self, *, title, body, data, tokens):
+        with self._lock:
+            attempts = [token for sent in self.sends for token in sent]
+            self.sends.append(list(tokens))
+            if self.raise_first and len(self.sends) == 1:
+                raise ConnectionError("stand-in transport down")
+
+        outcomes = []
+        for token in tokens:
+            if token.startswith("dead-"):
+                outcomes.append(notifications.UNREGISTERED)
+            elif token.startswith("bad-"):
+                outcomes.append(notifications.INVALID)
+            elif token.startswith("broken-"):
+                outcomes.append(notifications.FAILED)
+            elif token.startswith("down-") or (token.startswith("flaky-") and token not in attempts):
+                outcomes.append(notifications.TRANSIENT)
+            else:
+                outcomes.append(None)
+        return outcomes
+
+
+@mock.patch.object(notifications, "NOTIFICATION_RETRY_BACKOFF", 0)
+class SendNotificationTests(TransactionTestCase):
+    """
+    The chunks are sent by worker threads with their own connections, hence the transactions.
+    """
+    def use_transport(self, transport: StandInTransport) -> StandInTransport:
+        notifications.set_transport(transport)
+        self.addCleanup(notifications.set_transport, notifications.FirebaseTransport())
+        return transport
+
+    def send(self, tokens):
+        futures = notifications.send_notification(title="Shift", body="Your shift starts soon", data={}, tokens=tokens)
+        wait(futures)
+        results = [future.result() for future in futures]
+        return {outcome: [token for result in results for token in result[outcome]] for outcome in ("sent", "pruned", "failed")}
+
+    def test_tokens_are_sent_in_chunks_of_the_multicast_limit(self):
+        transport = self.use_transport(StandInTransport())
+        tokens = [f"token-{number}" for number in range(1201)]
+
+        result = self.send(tokens + tokens[:10])
+
+        self.assertEqual(sorted(len(sent) for sent in transport.sends), [201, 500, 500])
+        self.assertEqual(sorted(result["sent"]), sorted(tokens))
+
+    def test_transient_failures_are_retried(self):
+        transport = self.use_transport(StandInTransport())
+
+        result = self.send(["token-1", "flaky-1", "down-1", "broken-1"])
+
+        self.assertEqual(sorted(result["sent"]), ["flaky-1", "token-1"])
+        self.assertEqual(sorted(result["failed"]), ["broken-1", "down-1"])
+        self.assertEqual(len(transport.sends), notifications.NOTIFICATION_MAX_RETRIES + 1)
+        # only the tokens that failed transiently are sent again.
+        self.assertEqual(transport.sends[1], ["flaky-1", "down-1"])
+
+    def test_failed_requests_are_retried(self):
+        transport = self.use_transport(StandInTransport(raise_first=True))
+
+        with self.assertLogs(notifications.logger, "WARNING") as logs:
+            result = self.send(["token-1", "token-2"])
+
+        self.assertIn("stand-in transport down", logs.output[0])
+
+        self.assertEqual(result["sent"], ["token-1", "token-2"])
+        self.assertEqual(transport.sends, [["token-1", "token-2"], ["token-1", "token-2"]])
+
+    def test_dead_tokens_are_pruned(self):
+        transport = self.use_transport(StandInTransport())
+
+        result = self.send(["token-1", "dead-1", "bad-1"])
+
+        self.assertEqual(sorted(result["pruned"]), ["bad-1", "dead-1"])
+        self.assertEqual(
+            dict(UnregisteredDeviceToken.objects.values_list("token", "reason")),
+            {"dead-1": notifications.UNREGISTERED, "bad-1": notifications.INVALID},
+        )
+
+        transport.sends.clear()
+        self.send(["token-1", "dead-1", "bad-1"])
+        self.assertEqual(transport.sends, [["token-1"]])
+
+
+class CreateErrorsTests(TestCase):
+    def test_seeding_again_updates_the_existing_codes(self):
+        CustomErrors.objects.create(code="OutOfAttendanceWindow", status_code=400, count=7,
+                                    detail="Attendance can only be marked within 1 hour of your shift end time")
+
+        with self.assertLogs("scripts.errors", "INFO"):
+            create_errors()
+            create_errors()
+
+        self.assertEqual(CustomErrors.objects.count(), len(error_messages))
+        error = CustomErrors.objects.get(code="OutOfAttendanceWindow")
+        self.assertEqual(error.detail, "Attendance can only be marked within the attendance window after your shift start time")
+        self.assertEqual(error.count, 7)
+        self.assertIsNotNone(get_error("CapturedAtOutOfRange"))
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    The tests run with a replica alias mirroring the test database (see `config.settings.dev`).
+    Outside of a transaction, `read_only` query functions read from it until something is written.
+    """
+    databases = {DEFAULT_DB_ALIAS, REPLICA_DATABASE_ALIAS}
+
+    def setUp(self):
+        reset_stickiness()
+        self.addCleanup(reset_stickiness)
+
+    def assertReadsFrom(self, alias: str):
+        staff_members = get_staff_members()
+        self.assertEqual(staff_members.db, alias)
+
+        with CaptureQueriesContext(connections[alias]) as queries:
+            list(staff_members)
+        self.assertEqual(len(queries), 1)
+
+    def write(self):
+        CustomUser.objects.create(email="staff@example.com", username="staff", role="staff")
+
+    def test_read_only_queries_go_to_the_replica(self):
+        self.assertReadsFrom(REPLICA_DATABASE_ALIAS)
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        self.write()
+
+        self.assertReadsFrom(DEFAULT_DB_ALIAS)
+
+    def test_stickiness_clears_when_a_request_starts(self):
+        self.write()
+        request_started.send(sender=self.__class__)
+
+        self.assertReadsFrom(REPLICA_DATABASE_ALIAS)
+
+    def test_units_of_work_have_their_own_stickiness(self):
+        @unit_of_work
+        def task(write: bool):
+            self.assertReadsFrom(REPLICA_DATABASE_ALIAS)
+            if write:
+                self.write()
+                self.assertReadsFrom(DEFAULT_DB_ALIAS)
+
+        task(write=True)
+        task(write=False)
+        self.assertReadsFrom(REPLICA_DATABASE_ALIAS)
@@ -0,0 +1,118 @@
+"""
+client.py
+
+A lazily initialized facade over the Firebase Admin SDK.
+
+Importing this module neither imports `firebase_admin` nor reads the Firebase
+credentials: the app is initialized, once and thread-safely, the first time the client
+is actually used. Management commands, workers and scripts that never talk to Firebase
+therefore start without the SDK and without the `FIREBASE_*` environment variables.
+
+Everything that talks to Firebase goes through `get_firebase_client()`, which can be
+swapped with `set_firebase_client` for a local stand-in (tests, development, offline
+demos) implementing the same methods.
+
+Functions:
+
+- get_firebase_client() -> FirebaseClient:
+    The client used to talk to Firebase.
+
+- set_firebase_client(client) -> None:
+    Replace the client used to talk to Firebase.
+"""
+
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from decouple import config
+
+if TYPE_CHECKING:
+    from firebase_admin import App
+    from firebase_admin.auth import UserRecord
+    from firebase_admin.messaging import BatchResponse, MulticastMessage
+
+
+class FirebaseClient:
+    """
+    Talks to Firebase through the Admin SDK, initializing the app on first use.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._app: Optional["App"] = None
+
+    @property
+    def project_id(self) -> str:
+        return config('FIREBASE_PROJECT_ID')
+
+    @property
+    def app(self) -> "App":
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self._app = self._initialize_app()
+        return self._app
+
+    def _initialize_app(self) -> "App":
+        import firebase_admin
+        from firebase_admin import credentials
+
+        cred = credentials.Certificate({
+            "type": "service_account",
+            "project_id": self.project_id,
+            "private_key_id": config('FIREBASE_PRIVATE_KEY_ID'),
+            "private_key": config('FIREBASE_PRIVATE_KEY').replace("\\n", "\n"),
+            "client_email": config('FIREBASE_CLIENT_EMAIL'),
+            "client_id": config('FIREBASE_CLIENT_ID'),
+            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+            "token_uri": "https://oauth2.googleapis.com/token",
+            "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+            "client_x509_cert_url": config('FIREBASE_CLIENT_CERT_URL')
+        })
+
+        try:
+            return firebase_admin.initialize_app(cred)
+        except ValueError:
+            # the default app was already initialized, e.g. by a shell session.
+            return firebase_admin.get_app()
+
+    def verify_id_token(self, id_token: str) -> dict:
+        from firebase_admin import auth
+
+        return auth.verify_id_token(id_token, app=self.app)
+
+    def get_user(self, uid: str) -> "UserRecord":
+        from firebase_admin import auth
+
+        return auth.get_user(uid, app=self.app)
+
+    def get_user_by_phone_number(self, phone_number: str) -> "UserRecord":
+        from firebase_admin import auth
+
+        return auth.get_user_by_phone_number(phone_number, app=self.app)
+
+    def send_each_for_multicast(self, message: "MulticastMessage") -> "BatchResponse":
+        from firebase_admin import messaging
+
+        return messaging.send_each_for_multicast(message, app=self.app)
+
+
+_client = FirebaseClient()
+
+
+def get_firebase_client() -> FirebaseClient:
+    """
+    The client used to talk to Firebase, `FirebaseClient` unless replaced.
+    """
+    return _client
+
+
+def set_firebase_client(client) -> None:
+    """
+    Replace the client used to talk to Firebase, e.g. with an offline stand-in.
+
+    Args:
+        client: An object with the methods of `FirebaseClient`.
+    """
+    global _client
+
+    _client = client
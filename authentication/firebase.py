@@ -1,29 +1,52 @@
-import firebase_admin
 from django.conf import settings
 from apps.accounts.models import CustomUser
 from django.utils import timezone
-from firebase_admin import auth, messaging, credentials
 from rest_framework import authentication
 from exceptions.firebase import *
-from decouple import config
-import phonenumbers
-from firebase_admin.auth import UserRecord
+import logging
+from typing import TYPE_CHECKING
+from authentication.client import get_firebase_client
+from authentication.tokens import (
+    FIREBASE_SIGNING_KEYS_FILE,
+    get_firebase_user_cached,
+    get_user_cached,
+    verify_id_token_cached,
+    verify_id_token_offline,
+)
 
+if TYPE_CHECKING:
+    from firebase_admin.auth import UserRecord
 
-cred = credentials.Certificate({
-        "type": "service_account",
-        "project_id": config('FIREBASE_PROJECT_ID'),
-        "private_key_id": config('FIREBASE_PRIVATE_KEY_ID'),
-        "private_key": config('FIREBASE_PRIVATE_KEY').replace("\\n", "\n"),
-        "client_email": config('FIREBASE_CLIENT_EMAIL'),
-        "client_id": config('FIREBASE_CLIENT_ID'),
-        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-        "token_uri": "https://oauth2.googleapis.com/token",
-        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-        "client_x509_cert_url": config('FIREBASE_CLIENT_CERT_URL')
-    })
 
-default_app = firebase_admin.initialize_app(cred)
+logger = logging.getLogger(__name__)
+
+
+def _verify_id_token(id_token: str) -> dict:
+    client = get_firebase_client()
+    if FIREBASE_SIGNING_KEYS_FILE:
+        return verify_id_token_offline(id_token, project_id=client.project_id)
+    return client.verify_id_token(id_token)
+
+
+def verify_id_token(id_token: str) -> dict:
+    """
+    Verify a Firebase ID token, skipping the verification for tokens verified before.
+    """
+    return verify_id_token_cached(id_token, _verify_id_token)
+
+
+def get_user_by_uid(uid: str) -> CustomUser:
+    """
+    Retrieve the user of a Firebase uid, cached for a short while.
+    """
+    return get_user_cached(uid, lambda uid: CustomUser.objects.get(uid=uid))
+
+
+def get_firebase_user_by_uid(uid: str) -> "UserRecord":
+    """
+    Retrieve the Firebase user record of a uid, cached for a short while to avoid the remote call.
+    """
+    return get_firebase_user_cached(uid, lambda uid: get_firebase_client().get_user(uid))
 
 
 class FirebaseAuthentication(authentication.BaseAuthentication):
@@ -34,7 +57,7 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         if is_testing:
             uid = "DLxv8hBWgtUopvaowPyA6ep7rOR2" # user for devl
             try:
-                user = CustomUser.objects.get(uid=uid)
+                user = get_user_by_uid(uid)
                 user.last_login = timezone.localtime()
                 
             except Exception:
@@ -49,7 +72,7 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         decoded_token = None
 
         try:
-            decoded_token = auth.verify_id_token(id_token)            
+            decoded_token = verify_id_token(id_token)            
         except Exception:
             raise InvalidAuthToken("Invalid/expired auth token")
 
@@ -62,7 +85,7 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
             raise FirebaseError()
         
         try:
-            user = CustomUser.objects.get(uid=uid)
+            user = get_user_by_uid(uid)
             user.last_login = timezone.localtime()
         except Exception:
             raise InvalidAuthToken("Please register this token first @ /api/v1/accounts/user/register/")
@@ -73,17 +96,17 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
     def get_uid_from_token(self, request):
         auth_header = request.META.get("HTTP_AUTHORIZATION")
         uid = auth_header.split(" ").pop()
-        decoded_token = auth.verify_id_token(uid)
+        decoded_token = verify_id_token(uid)
         uid = decoded_token.get('uid')
         return uid  
      
     def get_user_from_token(self, request):
         auth_header = request.META.get("HTTP_AUTHORIZATION")
         uid = auth_header.split(" ").pop()
-        decoded_token = auth.verify_id_token(uid)
+        decoded_token = verify_id_token(uid)
         uid = decoded_token.get('uid')
         try:
-            user = CustomUser.objects.get(uid=uid)
+            user = get_user_by_uid(uid)
         except:
             raise InvalidAuthToken("Please register this token first @ /api/v1/accounts/user/register/")
 
@@ -91,12 +114,12 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
       
     def get_user_from_auth_token(self, auth_token):
         uid = auth_token.split(" ").pop()
-        decoded_token = auth.verify_id_token(uid)
+        decoded_token = verify_id_token(uid)
         uid = decoded_token.get('uid')
-        print(uid)
+        logger.debug("Authenticating Firebase uid %s", uid)
         # uid = "3O7tSphxWRVUpwIjgC8hhWZnPXD3"
         try:
-            user = CustomUser.objects.get(uid=uid)
+            user = get_user_by_uid(uid)
         except:
             raise InvalidAuthToken("Please register this token first @ /api/v1/accounts/user/register/")
 
@@ -107,10 +130,10 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         auth_header = request.META.get("HTTP_AUTHORIZATION") 
         # testing purpose
         if request.GET.get("is_testing", False):
-            return auth.get_user(uid="DLxv8hBWgtUopvaowPyA6ep7rOR2") 
+            return get_firebase_user_by_uid("DLxv8hBWgtUopvaowPyA6ep7rOR2") 
         
         if request.GET.get("is_dev_testing", False):
-            return auth.get_user(uid="pLXoDZ1lFqNAtPwQK8aXMeWUbCT2") 
+            return get_firebase_user_by_uid("pLXoDZ1lFqNAtPwQK8aXMeWUbCT2") 
 
         if not auth_header:
             raise NoAuthToken("No auth token provided")
@@ -119,7 +142,7 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         decoded_token = None
 
         try:
-            decoded_token = auth.verify_id_token(id_token)            
+            decoded_token = verify_id_token(id_token)            
         except Exception:
             raise InvalidAuthToken("Invalid/expired auth token")
 
@@ -128,41 +151,22 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         except Exception:
             raise FirebaseError()
        
-        return auth.get_user(uid=uid) 
+        return get_firebase_user_by_uid(uid) 
+
+def get_user_by_phone_number( phone_number: str ) -> "UserRecord":
+    import phonenumbers
 
-def get_user_by_phone_number( phone_number: str ) -> UserRecord:
     my_number = phonenumbers.parse(f"+{phone_number}")
     clean_phone = phonenumbers.format_number(my_number, phonenumbers.PhoneNumberFormat.E164)
-    user = firebase_admin.auth.get_user_by_phone_number(clean_phone)
+    user = get_firebase_client().get_user_by_phone_number(clean_phone)
     return user
     
 
 def send_notification_to_multiple(title: str, body: str, data, tokens):
-   
-    alert = messaging.ApsAlert(title = title, body = body)
-    aps = messaging.Aps(custom_data=data, alert=alert)
-    payload = messaging.APNSPayload(aps)
-    print("payload", payload)
-    # notification = messaging.Notification(title="hello", body="hi")
-    message = messaging.MulticastMessage(
-                        data=data,
-                        apns=messaging.APNSConfig(payload=payload),
-                        tokens=tokens 
-                        )
-    
-    response = messaging.send_multicast(message)
-    print(response)
-    if response.failure_count > 0:
-        responses = response.responses
-        print(responses)
-        print(responses)
-        failed_tokens = []
-        for idx, resp in enumerate(responses):
-            print(resp.__dict__)
-            if not resp.success:
-                # The order of responses corresponds to the order of the registration tokens.
-                failed_tokens.append(tokens[idx])
-        print('List of tokens that caused failures: {0}'.format(failed_tokens))
-        
-    return response
+    """
+    Queue a notification for many devices, see `apps.core.notifications.send_notification`.
+    """
+    from apps.core.notifications import send_notification
+
+    return send_notification(title=title, body=body, data=data, tokens=tokens)
 
@@ -0,0 +1,176 @@
+"""
+tokens.py
+
+Caches used by `FirebaseAuthentication` so that repeated requests with the same ID token
+skip the cryptographic verification and the user lookups.
+
+- Verified tokens are kept in an LRU cache keyed by the SHA-256 of the token, each entry
+  expiring at the token's own `exp` claim (or earlier, after `FIREBASE_TOKEN_CACHE_TTL`).
+- Users and Firebase user records are kept in LRU caches keyed by uid, for
+  `FIREBASE_USER_CACHE_TTL` seconds. A cached user is handed out as a copy, so that
+  requests setting e.g. `last_login` do not alter the instance other threads read, and
+  is dropped by `invalidate_user` whenever the user is saved or deleted (see
+  `apps.core.signals`).
+
+When `FIREBASE_SIGNING_KEYS_FILE` points to a JSON file of {key id: PEM certificate},
+tokens are verified fully offline against those keys instead of through the Firebase
+Admin SDK, e.g. with a local stand-in issuer.
+"""
+
+import copy
+import json
+import threading
+import time
+from hashlib import sha256
+from typing import Callable, Dict, Optional
+
+from cachetools import TLRUCache
+from django.conf import settings
+
+
+FIREBASE_TOKEN_CACHE_SIZE = getattr(settings, "FIREBASE_TOKEN_CACHE_SIZE", 10000)
+FIREBASE_TOKEN_CACHE_TTL = getattr(settings, "FIREBASE_TOKEN_CACHE_TTL", 3600)
+FIREBASE_USER_CACHE_SIZE = getattr(settings, "FIREBASE_USER_CACHE_SIZE", 10000)
+FIREBASE_USER_CACHE_TTL = getattr(settings, "FIREBASE_USER_CACHE_TTL", 60)
+FIREBASE_SIGNING_KEYS_FILE = getattr(settings, "FIREBASE_SIGNING_KEYS_FILE", None)
+
+
+def _token_expiry(key, decoded_token, current):
+    return min(decoded_token.get("exp", 0), current + FIREBASE_TOKEN_CACHE_TTL)
+
+
+def _user_expiry(key, user, current):
+    return current + FIREBASE_USER_CACHE_TTL
+
+
+_lock = threading.Lock()
+# entries expire against the wall clock, since `exp` is a unix timestamp.
+_verified_tokens = TLRUCache(maxsize=FIREBASE_TOKEN_CACHE_SIZE, ttu=_token_expiry, timer=time.time)
+_users = TLRUCache(maxsize=FIREBASE_USER_CACHE_SIZE, ttu=_user_expiry, timer=time.time)
+_firebase_users = TLRUCache(maxsize=FIREBASE_USER_CACHE_SIZE, ttu=_user_expiry, timer=time.time)
+# bumped by every invalidation, so that a user loaded before it is not cached after it.
+_users_generation = 0
+
+_signing_keys: Optional[Dict[str, object]] = None
+
+
+def _get_signing_keys() -> Dict[str, object]:
+    global _signing_keys
+
+    if _signing_keys is None:
+        from cryptography.x509 import load_pem_x509_certificate
+
+        with open(FIREBASE_SIGNING_KEYS_FILE) as keys_file:
+            certificates = json.load(keys_file)
+
+        _signing_keys = {
+            key_id: load_pem_x509_certificate(certificate.encode()).public_key()
+            for key_id, certificate in certificates.items()
+        }
+    return _signing_keys
+
+
+def verify_id_token_offline(id_token: str, project_id: str) -> dict:
+    """
+    Verify a Firebase ID token against the locally cached signing keys, without any network call.
+
+    Args:
+        id_token (str): The ID token to verify.
+        project_id (str): The Firebase project the token must be issued for.
+
+    Returns:
+        dict: The decoded claims, with `uid` set like the Firebase Admin SDK does.
+
+    Raises:
+        jwt.InvalidTokenError: If the token is malformed, expired, or not signed by a known key.
+    """
+    import jwt
+
+    key_id = jwt.get_unverified_header(id_token).get("kid")
+    key = _get_signing_keys().get(key_id)
+    if key is None:
+        raise jwt.InvalidTokenError(f"Unknown signing key {key_id}")
+
+    decoded_token = jwt.decode(
+        id_token,
+        key,
+        algorithms=["RS256"],
+        audience=project_id,
+        issuer=f"https://securetoken.google.com/{project_id}",
+        options={"require": ["exp", "iat", "sub"]},
+    )
+    decoded_token["uid"] = decoded_token["sub"]
+    return decoded_token
+
+
+def verify_id_token_cached(id_token: str, verify: Callable[[str], dict]) -> dict:
+    """
+    Verify an ID token, reusing the result of an earlier verification of the same token.
+
+    Args:
+        id_token (str): The ID token to verify.
+        verify (Callable[[str], dict]): Verifies the token and returns its claims, called on cache misses.
+
+    Returns:
+        dict: A copy of the decoded claims of the token.
+    """
+    key = sha256(id_token.encode()).hexdigest()
+
+    with _lock:
+        decoded_token = _verified_tokens.get(key)
+    if decoded_token is None:
+        decoded_token = verify(id_token)
+        with _lock:
+            _verified_tokens[key] = decoded_token
+
+    # the cached claims are shared by every request with the token, each gets its own copy.
+    return dict(decoded_token)
+
+
+def _get_cached(cache: TLRUCache, uid: str, load: Callable[[str], object]):
+    with _lock:
+        value = cache.get(uid)
+    if value is not None:
+        return value
+
+    value = load(uid)
+    with _lock:
+        cache[uid] = value
+    return value
+
+
+def get_user_cached(uid: str, load: Callable[[str], object]):
+    """
+    Retrieve a copy of the user of a uid, loading it with `load` on cache misses.
+    """
+    with _lock:
+        user = _users.get(uid)
+        generation = _users_generation
+
+    if user is None:
+        user = load(uid)
+        with _lock:
+            if generation == _users_generation:
+                _users[uid] = user
+    return copy.copy(user)
+
+
+def invalidate_user(pk):
+    """
+    Drop the cached user with the given primary key, under whatever uid it was cached.
+    """
+    global _users_generation
+
+    with _lock:
+        _users_generation += 1
+        # the uid of the user may have changed, look the entries up by primary key.
+        for uid in [uid for uid, user in _users.items() if user.pk == pk]:
+            del _users[uid]
+
+
+def get_firebase_user_cached(uid: str, load: Callable[[str], object]):
+    """
+    Retrieve the Firebase user record of a uid, loading it with `load` on cache misses.
+    """
+    return _get_cached(_firebase_users, uid, load)
+
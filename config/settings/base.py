@@ -15,7 +15,6 @@ from pathlib import Path
 import os
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
-print(BASE_DIR)
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
@@ -44,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # no-op unless PROFILING_ENABLED, records request timings served at api/v1/core/metrics/
+    'apps.core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +56,9 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'config.urls'
 
+# Record per endpoint timings and query counts, see apps.core.metrics
+PROFILING_ENABLED = False
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -76,6 +80,24 @@ TEMPLATES = [
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Read-only query functions are sent to the 'replica' database when it is configured
+DATABASE_ROUTERS = ['apps.core.routers.ReplicaRouter']
+REPLICA_DATABASE_ALIAS = 'replica'
+
+# Applied to every new SQLite connection, see apps.core.sqlite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 268435456,
+    'cache_size': -65536,
+    'temp_store': 'MEMORY',
+}
+
+# Writes failing with "database is locked" are retried this many times
+SQLITE_LOCK_RETRIES = 5
+SQLITE_LOCK_RETRY_BACKOFF = 0.05
+
 
 
 # Password validation
@@ -105,6 +127,15 @@ REST_FRAMEWORK = {
 }
 
 
+# Gate kiosks replay queued punches (one image each) in a single batch request.
+ATTENDANCE_BATCH_MAX_SIZE = 500
+DATA_UPLOAD_MAX_NUMBER_FILES = ATTENDANCE_BATCH_MAX_SIZE
+# punches captured later than now plus this clock skew, or longer ago than the replay
+# horizon, are rejected.
+ATTENDANCE_BATCH_MAX_CLOCK_SKEW_SECONDS = 300
+ATTENDANCE_BATCH_REPLAY_HORIZON_HOURS = 72
+
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -119,7 +150,6 @@ SIMPLE_JWT = {
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE =  'Asia/Kolkata'
-TIMEZONE =  'Asia/Kolkata'
 
 USE_I18N = True
 
@@ -133,6 +163,56 @@ MEDIA_URL = '/media/'
 # Path where media is stored
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
+# Raw attendance uploads wait here until the image pipeline has processed them
+ATTENDANCE_IMAGE_STAGING_ROOT = os.path.join(BASE_DIR, 'media_staging/')
+ATTENDANCE_IMAGE_MAX_SIZE = 1280
+ATTENDANCE_IMAGE_QUALITY = 80
+ATTENDANCE_THUMBNAIL_SIZE = 256
+ATTENDANCE_IMAGE_WORKERS = 2
+# staged uploads older than this (seconds) are retried by `process_pending_attendance_images`
+ATTENDANCE_IMAGE_RETRY_AFTER = 300
+
+# Largest roster (one shift per employee and day) accepted in one upload
+ROSTER_UPLOAD_MAX_SIZE = 5000
+
+# A punch is reported late when it is this many minutes after the shift start
+ATTENDANCE_LATE_AFTER_MINUTES = 15
+
+# Push notifications are sent in chunks by this many threads, transient failures retried
+NOTIFICATION_WORKERS = 4
+NOTIFICATION_MAX_RETRIES = 3
+NOTIFICATION_RETRY_BACKOFF = 0.5
+
+
+# Logging
+# Modules log through logging.getLogger(__name__), records are written as JSON lines by a
+# background thread. LOG_LEVEL=DEBUG brings back the debugging output of the services.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'apps.core.log.JSONFormatter',
+        },
+    },
+    'handlers': {
+        'queue': {
+            'class': 'apps.core.log.QueueStreamHandler',
+            'formatter': 'json',
+        },
+    },
+    'root': {
+        'handlers': ['queue'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        logger: {'level': LOG_LEVEL}
+        for logger in ('apps', 'authentication', 'exceptions', 'helper', 'scripts')
+    },
+}
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
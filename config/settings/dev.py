@@ -8,4 +8,17 @@ DATABASES = {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
-}
\ No newline at end of file
+}
+
+# DB_REPLICA=True adds a replica alias on the same file, to exercise the replica routing locally.
+# The tests always run with it, as a mirror of the test database.
+import sys
+
+from decouple import config
+
+if config('DB_REPLICA', default=len(sys.argv) > 1 and sys.argv[1] == 'test', cast=bool):
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
@@ -1,10 +1,44 @@
 from .base import *
+from decouple import config
 
 WSGI_APPLICATION = 'config.wsgi.prod.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Without DB_NAME the project keeps running on the local SQLite file
+if config('DB_NAME', default=''):
+    # Connections are kept open between requests for DB_CONN_MAX_AGE seconds and checked
+    # before being reused. Behind a transaction pooler (e.g. PgBouncer), set DB_POOLER so
+    # that server side cursors, which do not survive a transaction switch, are disabled.
+    _server_database = {
+        'ENGINE': config('DB_ENGINE', default='django.db.backends.postgresql'),
+        'NAME': config('DB_NAME'),
+        'USER': config('DB_USER', default=''),
+        'PASSWORD': config('DB_PASSWORD', default=''),
+        'HOST': config('DB_HOST', default='localhost'),
+        'PORT': config('DB_PORT', default=''),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_POOLER', default=False, cast=bool),
+        'OPTIONS': {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+        },
+    }
+
+    DATABASES = {
+        'default': _server_database,
+    }
+
+    # Read-only query functions are sent to the replica, see apps.core.routers
+    if config('DB_REPLICA_HOST', default=''):
+        DATABASES[REPLICA_DATABASE_ALIAS] = {
+            **_server_database,
+            'HOST': config('DB_REPLICA_HOST'),
+            'PORT': config('DB_REPLICA_PORT', default=_server_database['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
-}
\ No newline at end of file
@@ -1,23 +1,20 @@
 from rest_framework import status
 from rest_framework.exceptions import APIException
-from apps.core.models import CustomErrors
-from rest_framework import serializers
+from apps.core.error_catalog import get_error
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
+import logging
 
 
-class ErrorSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = CustomErrors
-        fields = "__all__"
+logger = logging.getLogger(__name__)
+
 
 def custom_exception_handler(exc, context):
     # Call the default exception handler first  
     response = exception_handler(exc, context)
-    print("error response", response)
+    logger.debug("Error response %s for %r", response, exc)
     if response is not None:
         error_field = exc.__dict__.get("error")
-        print(exc.__dict__)
         if error_field:
             if not exc.detail:
                 response.data = exc.error
@@ -35,21 +32,18 @@ class CustomAPIException(APIException):
 
     def __init__(self, detail=None, code=None, error_code=None):
         super().__init__(detail, code)
+        self.detail = detail
+
         try:
-            self.detail = detail
-            print("detail", detail)
-            error = CustomErrors.objects.get(code=error_code)
-            print(error)
-            self.status_code = error.status_code
-            serializer = ErrorSerializer(error)
-            print(serializer.data)
-            self.error = serializer.data
-
-            
-        except Exception as e:
-            print("exception ", e)
+            # served from the in-process error catalog, no database query here.
+            self.error = get_error(error_code)
+        except Exception:
+            logger.exception("Could not load the error %s from the error catalog", error_code)
             self.error = None
 
+        if self.error is not None:
+            self.status_code = self.error["status_code"]
+
 
 
 
@@ -0,0 +1,47 @@
+from hashlib import md5
+
+from django.http import HttpResponse
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+def _content_etag(content: bytes) -> str:
+    return quote_etag(md5(content, usedforsecurity=False).hexdigest())
+
+
+def _is_not_modified(request, etag: str) -> bool:
+    if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+    return etag in if_none_match or "*" in if_none_match
+
+
+def etag_response(request, data) -> Response:
+    """
+    Build the response of `data` with an ETag of its content. When the client already
+    holds this content (If-None-Match), an empty 304 response is returned instead.
+    """
+    etag = _content_etag(JSONRenderer().render(data))
+
+    if _is_not_modified(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+
+    response["ETag"] = etag
+    return response
+
+
+def rendered_etag_response(request, content: bytes) -> HttpResponse:
+    """
+    Like `etag_response`, for JSON that is already rendered, e.g. kept in a cache.
+    """
+    etag = _content_etag(content)
+
+    if _is_not_modified(request, etag):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = HttpResponse(content, content_type="application/json")
+
+    response["ETag"] = etag
+    return response
@@ -1,5 +1,15 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.exceptions import ValidationError
+
 from exceptions.base import InvalidWeeklyOffList
 
 def validate_weekly_off_list(weekly_off):
     if len(weekly_off) > 2:
-        raise InvalidWeeklyOffList("Weeklyoff list can only contain 1 or 2 days.")
\ No newline at end of file
+        raise InvalidWeeklyOffList("Weeklyoff list can only contain 1 or 2 days.")
+
+def validate_timezone_name(name):
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"{name} is not a known time zone.")
@@ -0,0 +1,63 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.core.error_catalog import aload_error_catalog
+from exceptions.restapi import custom_exception_handler
+
+
+class AsyncAPIView(View):
+    """
+    A minimal async counterpart of DRF's `APIView` (which cannot serve coroutine handlers)
+    for the endpoints worth running on the event loop under ASGI.
+
+    The request is authenticated with `authentication_classes` and must be authenticated.
+    Handlers are coroutines returning the data of the response (`self.response`); an
+    `APIException` they raise goes through `custom_exception_handler`, so the error bodies
+    are the same as the ones of the other APIs. Only JSON is rendered, and the body of the
+    request is taken as is from `request.POST` / `request.FILES` / `request.GET`.
+    """
+    authentication_classes = [JWTAuthentication]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # like APIView, authentication is token based, so CSRF does not apply.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def authenticate(self, request):
+        for authenticator in self.authentication_classes:
+            # the token is checked against the user table, so this runs off the event loop.
+            user_auth_tuple = await sync_to_async(authenticator().authenticate)(request)
+            if user_auth_tuple is not None:
+                request.user, request.auth = user_auth_tuple
+                return
+
+        raise exceptions.NotAuthenticated()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            # `CustomAPIException` reads the error catalog, which cannot be loaded from here.
+            await aload_error_catalog()
+            await self.authenticate(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(request, exc)
+
+    def handle_exception(self, request, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authentication_classes[0]().authenticate_header(request)
+
+        response = custom_exception_handler(exc, {"view": self, "request": request})
+        http_response = self.response(response.data, status=response.status_code)
+        # e.g. WWW-Authenticate or Retry-After, set by the exception handler.
+        for header, value in response.items():
+            if header.lower() != "content-type":
+                http_response[header] = value
+        return http_response
+
+    def response(self, data, status=status.HTTP_200_OK) -> HttpResponse:
+        return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
@@ -0,0 +1,425 @@
+"""
+benchmark_api.py
+
+Seeds a throwaway SQLite database with managers, staff members, shifts, an attendance
+history and shift interchange requests, then drives every URL of `apps/accounts/api/urls.py`
+and `apps/attendance/api/urls.py` through the Django test client and reports, per endpoint,
+the throughput, the latency percentiles and the number of queries per request.
+
+Usage:
+    DJANGO_SETTINGS_MODULE=config.settings.dev python scripts/benchmark_api.py --output bench.json
+    DJANGO_SETTINGS_MODULE=config.settings.dev python scripts/benchmark_api.py --baseline bench.json --threshold 0.2
+
+With --baseline, the run fails (exit status 1) when the median latency of an endpoint grew
+by more than --threshold, or when it runs more queries per request than in the baseline.
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+PASSWORD = "benchmark-password"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--managers", type=int, default=5, help="Number of managers to seed.")
+    parser.add_argument("--staff", type=int, default=2000, help="Number of staff members to seed.")
+    parser.add_argument("--days", type=int, default=30, help="Days of attendance history per staff member.")
+    parser.add_argument("--interchanges", type=int, default=5000, help="Number of interchange requests to seed.")
+    parser.add_argument("--requests", type=int, default=50, help="Measured requests per endpoint.")
+    parser.add_argument("--batch-size", type=int, default=10, help="Punches per batch attendance request.")
+    parser.add_argument("--only", action="append", help="Only benchmark the endpoints containing this text.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against the results of an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative growth of the median latency.")
+    return parser.parse_args()
+
+
+def setup_django(directory: str):
+    from django.conf import settings
+
+    settings.DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(directory, "api.sqlite3")}}
+    settings.MEDIA_ROOT = os.path.join(directory, "media/")
+    settings.ATTENDANCE_IMAGE_STAGING_ROOT = os.path.join(directory, "staging/")
+    settings.ALLOWED_HOSTS = ["*"]
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", run_syncdb=True, skip_checks=True, verbosity=0)
+
+
+class Seed:
+    """
+    The seeded data, and a supply of staff members not used by any earlier request.
+    """
+    def __init__(self, managers, staff_members, shifts, pending_requests):
+        self.managers = managers
+        self.staff_members = staff_members
+        self.shifts = shifts
+        self.pending_requests = pending_requests
+        self._next = 0
+
+    def fresh_staff_member(self):
+        if self._next >= len(self.staff_members):
+            raise SystemExit("Not enough staff members seeded for this many requests, raise --staff.")
+        staff_member = self.staff_members[self._next]
+        self._next += 1
+        return staff_member
+
+
+def seed(args) -> Seed:
+    """
+    Insert the managers, staff members (whose shift started a few minutes ago, every day),
+    attendance history and interchange requests, half of the requests still pending.
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+    from django.utils.timezone import localtime, make_aware
+    from apps.accounts.models import CustomUser, StaffManager, StaffMember
+    from apps.attendance.models import Attendance, Shift, ShiftInterchangeRequest
+    from apps.attendance.occurrences import generate_shift_occurrences
+    from scripts.errors import create_errors
+
+    create_errors()
+
+    password = make_password(PASSWORD)
+    shift_start = (localtime() - timedelta(minutes=5)).time().replace(second=0, microsecond=0)
+    if shift_start > localtime().time():
+        # just after midnight, the shift starts at midnight.
+        shift_start = dt_time(0)
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f"manager{i}", email=f"manager{i}@example.com", password=password,
+                        first_name="Manager", role="manager") for i in range(args.managers)]
+            + [CustomUser(username=f"staff{i}", email=f"staff{i}@example.com", password=password,
+                          first_name="Staff", role="staff") for i in range(args.staff)],
+            batch_size=5000,
+        )
+        managers = list(CustomUser.objects.filter(role="manager").order_by("username"))
+        StaffManager.objects.bulk_create([StaffManager(user=manager) for manager in managers])
+
+        users = CustomUser.objects.filter(role="staff").order_by("username").values_list("pk", flat=True)
+        StaffMember.objects.bulk_create(
+            [StaffMember(employee_id=f"EMP{i:06d}", user_id=user_id, weekly_off=[]) for i, user_id in enumerate(users)],
+            batch_size=5000,
+        )
+        staff_members = list(StaffMember.objects.select_related("user").order_by("employee_id"))
+
+        Shift.objects.bulk_create(
+            [Shift(staff_member=staff_member, day=day, shift_start=shift_start, shift_end=dt_time(23, 59))
+             for staff_member in staff_members for day in DAYS],
+            batch_size=5000,
+        )
+        shifts = {(shift.staff_member_id, shift.day): shift.id for shift in Shift.objects.all()}
+        generate_shift_occurrences()
+
+        # the history ends yesterday, so that every staff member can still punch today.
+        today = date.today()
+        Attendance.objects.bulk_create(
+            (Attendance(staff_member=staff_member,
+                        date=today - timedelta(days=offset),
+                        timestamp=make_aware(datetime.combine(today - timedelta(days=offset), dt_time(9, offset % 30))))
+             for offset in range(1, args.days + 1) for staff_member in staff_members),
+            batch_size=5000,
+        )
+
+        # the interchange requests are received by the last staff members, the others stay fresh.
+        targets = staff_members[-max(1, args.staff // 10):]
+        interchanges = []
+        for index in range(args.interchanges):
+            requester = staff_members[index % len(staff_members)]
+            target = targets[index % len(targets)]
+            if requester == target:
+                continue
+            interchanges.append(ShiftInterchangeRequest(
+                requester=requester,
+                target=target,
+                requester_shift_id=shifts[(requester.id, "monday")],
+                target_shift_id=shifts[(target.id, "monday")],
+                status="pending" if index % 2 else "rejected",
+            ))
+        ShiftInterchangeRequest.objects.bulk_create(interchanges, batch_size=5000)
+
+        pending_requests = list(
+            ShiftInterchangeRequest.objects.filter(status="pending").select_related("target__user").order_by("id")
+        )
+        # staff members receiving requests keep their shifts, the others are handed out by `fresh_staff_member`.
+        staff_members = staff_members[:-len(targets)]
+
+    return Seed(managers, staff_members, shifts, pending_requests)
+
+
+def jpeg() -> bytes:
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def endpoints(data: Seed, args):
+    """
+    Every URL of the accounts and attendance APIs, with a function building one request.
+
+    Each builder returns the user to authenticate as (or None), the client method and its
+    arguments. Requests that create something use fresh data every time.
+    """
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.utils.timezone import now
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    accounts = "/api/v1/accounts/"
+    master = "/api/v1/master/"
+    manager = data.managers[0]
+    image = jpeg()
+    counter = iter(range(10 ** 9))
+    today = date.today()
+
+    def register():
+        return None, "post", f"{accounts}user/register/", {
+            "data": {"first_name": "New", "email": f"new{next(counter)}@example.com", "password": PASSWORD},
+        }
+
+    def staff_add():
+        return manager, "post", f"{accounts}staff/add/", {
+            "data": {"first_name": "New", "email": f"added{next(counter)}@example.com", "password": PASSWORD},
+        }
+
+    def staff_update():
+        staff_member = data.fresh_staff_member()
+        return manager, "patch", f"{accounts}staff/update/", {
+            "data": json.dumps({"employee_id": staff_member.employee_id, "first_name": "Renamed"}),
+            "content_type": "application/json",
+        }
+
+    def shift_schedule():
+        staff_member = data.fresh_staff_member()
+        return manager, "post", f"{master}staff/shift/schedule/", {
+            "data": {"employee_id": staff_member.employee_id,
+                     "shift": {"day": "monday", "shift_start": "09:00", "shift_end": "17:00"}},
+            "format": "json",
+        }
+
+    def roster_upload():
+        staff_members = [data.fresh_staff_member() for _ in range(5)]
+        return manager, "post", f"{master}staff/shift/roster/upload/", {
+            "data": {"shifts": [{"employee_id": staff_member.employee_id, "day": day,
+                                 "shift_start": "09:00", "shift_end": "17:00"}
+                                for staff_member in staff_members for day in DAYS[:5]]},
+            "format": "json",
+        }
+
+    def weekly_off():
+        staff_member = data.fresh_staff_member()
+        return manager, "post", f"{master}staff/weekly-off/assign/", {
+            "data": {"employee_id": staff_member.employee_id, "weekly_off": ["saturday", "sunday"]},
+            "format": "json",
+        }
+
+    def mark():
+        staff_member = data.fresh_staff_member()
+        return staff_member.user, "post", f"{master}staff/attendance/mark/", {
+            "data": {"image": SimpleUploadedFile("punch.jpg", image, content_type="image/jpeg")},
+            "format": "multipart",
+        }
+
+    def mark_batch():
+        staff_members = [data.fresh_staff_member() for _ in range(args.batch_size)]
+        entries = [{"employee_id": staff_member.employee_id, "captured_at": now().isoformat(), "image": f"image{index}"}
+                   for index, staff_member in enumerate(staff_members)]
+        files = {f"image{index}": SimpleUploadedFile(f"punch{index}.jpg", image, content_type="image/jpeg")
+                 for index in range(len(entries))}
+        return manager, "post", f"{master}staff/attendance/mark/batch/", {
+            "data": {"entries": json.dumps(entries), **files},
+            "format": "multipart",
+        }
+
+    def interchange_request():
+        requester, target = data.fresh_staff_member(), data.fresh_staff_member()
+        return requester.user, "post", f"{master}staff/shift/interchange/request/", {
+            "data": {"target_email": target.user.email,
+                     "requester_shift_id": data.shifts[(requester.id, "monday")],
+                     "target_shift_id": data.shifts[(target.id, "monday")]},
+            "format": "json",
+        }
+
+    def interchange_status_update():
+        if not data.pending_requests:
+            raise SystemExit("Not enough pending interchange requests seeded, raise --interchanges.")
+        request = data.pending_requests.pop()
+        return request.target.user, "post", f"{master}staff/shift/interchange/request/status/update/", {
+            "data": {"request_id": request.id, "status": "rejected" if request.id % 2 else "approved"},
+            "format": "json",
+        }
+
+    refresh = str(RefreshToken.for_user(manager))
+    staff_user = data.staff_members[0].user
+    target_user = data.pending_requests[0].target.user
+    date_range = f"start_date={today - timedelta(days=args.days)}&end_date={today}"
+
+    return [
+        ("accounts:user/register/", register),
+        ("accounts:user/update/", lambda: (manager, "patch", f"{accounts}user/update/", {
+            "data": json.dumps({"first_name": "Manager"}), "content_type": "application/json"})),
+        ("accounts:user/profile/", lambda: (manager, "get", f"{accounts}user/profile/", {})),
+        ("accounts:user/token/", lambda: (None, "post", f"{accounts}user/token/", {
+            "data": {"email": manager.email, "password": PASSWORD}})),
+        ("accounts:user/token/refresh/", lambda: (None, "post", f"{accounts}user/token/refresh/", {
+            "data": {"refresh": refresh}})),
+        ("accounts:staff/add/", staff_add),
+        ("accounts:staff/list/", lambda: (manager, "get", f"{accounts}staff/list/?limit=100", {})),
+        ("accounts:staff/update/", staff_update),
+        ("master:staff/shift/schedule/", shift_schedule),
+        ("master:staff/shift/roster/upload/", roster_upload),
+        ("master:staff/weekly-off/assign/", weekly_off),
+        ("master:staff/roster/", lambda: (manager, "get", f"{master}staff/roster/", {})),
+        ("master:staff/assigned/shifts/", lambda: (staff_user, "get", f"{master}staff/assigned/shifts/", {})),
+        ("master:staff/attendance/mark/", mark),
+        ("master:staff/attendance/mark/batch/", mark_batch),
+        ("master:staff/attendance/report/", lambda: (manager, "get", f"{master}staff/attendance/report/?{date_range}&limit=100", {})),
+        ("master:staff/attendance/export/", lambda: (manager, "get", f"{master}staff/attendance/export/?start_date={today - timedelta(days=1)}&end_date={today}", {})),
+        ("master:staff/shift/interchange/request/", interchange_request),
+        ("master:staff/shift/interchange/request/list/", lambda: (target_user, "get", f"{master}staff/shift/interchange/request/list/", {})),
+        ("master:staff/shift/interchange/request/status/update/", interchange_status_update),
+    ]
+
+
+def measure(name, build, requests: int):
+    """
+    Send `requests` requests built by `build` (plus one warm-up request), one at a time.
+    """
+    from django.db import connections
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    clients = {}
+    query_counts = []
+    latencies = []
+    failures = []
+
+    def count_query(execute, sql, params, many, context):
+        query_counts[-1] += 1
+        return execute(sql, params, many, context)
+
+    for iteration in range(requests + 1):
+        user, method, path, kwargs = build()
+
+        client = clients.get(user)
+        if client is None:
+            client = clients[user] = APIClient()
+            if user is not None:
+                client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+
+        query_counts.append(0)
+        with connections["default"].execute_wrapper(count_query):
+            started = time.perf_counter()
+            response = getattr(client, method)(path, **kwargs)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+
+        if iteration == 0:
+            query_counts.pop()
+            continue
+        latencies.append(elapsed * 1000)
+        if response.status_code >= 400:
+            failures.append(response.status_code)
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "failures": len(failures),
+        "failure_statuses": sorted(set(failures)),
+        "throughput_rps": round(requests / (sum(latencies) / 1000), 1),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p90_ms": round(latencies[max(0, int(len(latencies) * 0.9) - 1)], 3),
+        "p99_ms": round(latencies[max(0, int(len(latencies) * 0.99) - 1)], 3),
+        "queries_per_request": round(statistics.fmean(query_counts), 2),
+    }
+
+
+def compare(results, baseline, threshold: float):
+    """
+    Returns:
+        List[str]: A description of every regression against the baseline.
+    """
+    regressions = []
+    for name, result in results["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if not before:
+            continue
+        if result["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            regressions.append(f"{name}: median {before['p50_ms']} ms -> {result['p50_ms']} ms")
+        if result["queries_per_request"] > before["queries_per_request"]:
+            regressions.append(f"{name}: queries per request {before['queries_per_request']} -> {result['queries_per_request']}")
+    return regressions
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+
+    setup_django(tempfile.mkdtemp())
+
+    started = time.perf_counter()
+    data = seed(args)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    results = {
+        "commit": current_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "volumes": {"managers": args.managers, "staff": args.staff, "days": args.days,
+                    "interchanges": args.interchanges, "requests": args.requests},
+        "endpoints": {},
+    }
+
+    for name, build in endpoints(data, args):
+        if args.only and not any(text in name for text in args.only):
+            continue
+
+        result = results["endpoints"][name] = measure(name, build, args.requests)
+        print(
+            f"{name:<58} {result['throughput_rps']:>8} req/s  p50 {result['p50_ms']:>8} ms  "
+            f"p90 {result['p90_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+            f"{result['queries_per_request']:>6} queries"
+            + (f"  {result['failures']} failed {result['failure_statuses']}" if result["failures"] else "")
+        )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+benchmark_attendance_window.py
+
+Micro-benchmark of the attendance window engine (`apps/attendance/windows.py`). For
+growing numbers of shift intervals per staff member (a mix of day, overnight and
+overlapping shifts), it measures the conversion of the shifts into intervals and the
+lookup of random punches with `AttendanceWindows.match`, next to a linear scan over the
+same intervals. The results of both are compared on every punch, so a run also fails
+when the engine disagrees with the scan.
+
+Usage:
+    python scripts/benchmark_attendance_window.py --output windows.json
+    python scripts/benchmark_attendance_window.py --baseline windows.json --threshold 0.2
+
+With --baseline, the run fails (exit status 1) when the lookup time at some size grew by
+more than --threshold.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 14, 100, 1000, 10000], help="Intervals per staff member.")
+    parser.add_argument("--punches", type=int, default=20000, help="Punches looked up per size.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random shifts and punches.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against the results of an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative growth of the lookup time.")
+    return parser.parse_args()
+
+
+def random_shifts(rng: random.Random, size: int):
+    """
+    One shift a day, every third one overnight, and every fifth day a second shift
+    overlapping the first.
+    """
+    shifts = []
+    day = date(2024, 1, 1)
+    while len(shifts) < size:
+        start = dt_time(rng.randrange(24), rng.choice([0, 15, 30, 45]))
+        end = dt_time((start.hour + (rng.randrange(8, 11) if len(shifts) % 3 else rng.randrange(10, 14))) % 24, start.minute)
+        shifts.append((start, end, day))
+        if len(shifts) % 5 == 0 and len(shifts) < size:
+            shifts.append((dt_time((start.hour + 2) % 24, start.minute), end, day))
+        day += timedelta(days=1)
+    return shifts
+
+
+def linear_match(intervals, punch):
+    matched = None
+    for interval in intervals:
+        if interval[0] <= punch <= interval[1] and punch < interval[2]:
+            if matched is None or interval[0] > matched[0]:
+                matched = interval
+    return matched
+
+
+def run(size: int, args):
+    from apps.attendance.windows import AttendanceWindows, build_shift_interval, get_shift_bounds
+
+    rng = random.Random(args.seed + size)
+    shifts = random_shifts(rng, size)
+
+    started = time.perf_counter()
+    intervals = [build_shift_interval(*get_shift_bounds(start, end, day), day) for start, end, day in shifts]
+    windows = AttendanceWindows(intervals)
+    build_seconds = time.perf_counter() - started
+
+    first, last = windows.intervals[0][0], windows.intervals[-1][1]
+    span = (last - first).total_seconds()
+    # half of the punches fall in an attendance window, the others anywhere.
+    punches = [
+        rng.choice(intervals)[0] + timedelta(minutes=rng.randrange(75)) if index % 2
+        else first + timedelta(seconds=rng.uniform(0, span))
+        for index in range(args.punches)
+    ]
+
+    started = time.perf_counter()
+    matches = [windows.match(punch) for punch in punches]
+    match_seconds = time.perf_counter() - started
+
+    # the scan is quadratic overall, it is timed on fewer punches at large sizes.
+    scanned = punches[:max(100, args.punches * 100 // max(size, 100))]
+    started = time.perf_counter()
+    expected = [linear_match(intervals, punch) for punch in scanned]
+    scan_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for got, want in zip(matches, expected) if got is not want)
+
+    return {
+        "intervals": len(intervals),
+        "build_us_per_interval": round(build_seconds / len(intervals) * 1e6, 3),
+        "match_us": round(match_seconds / len(punches) * 1e6, 3),
+        "scan_us": round(scan_seconds / len(scanned) * 1e6, 3),
+        "matched": sum(1 for matched in matches if matched),
+        "mismatches": mismatches,
+    }
+
+
+def compare(results, baseline, threshold: float):
+    """
+    Returns:
+        List[str]: A description of every regression against the baseline.
+    """
+    regressions = []
+    for size, result in results["sizes"].items():
+        before = baseline["sizes"].get(size)
+        if before and result["match_us"] > before["match_us"] * (1 + threshold):
+            regressions.append(f"{size} intervals: match_us {before['match_us']} -> {result['match_us']}")
+    return regressions
+
+
+def current_commit():
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+
+    import django
+    django.setup()
+
+    results = {
+        "commit": current_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "punches": args.punches,
+        "sizes": {},
+    }
+
+    failed = False
+    for size in args.sizes:
+        result = results["sizes"][str(size)] = run(size, args)
+        print(
+            f"{result['intervals']:>7} intervals  build {result['build_us_per_interval']:>7} us/interval"
+            f"  match {result['match_us']:>7} us  scan {result['scan_us']:>9} us"
+            f"  matched {result['matched']}/{args.punches}"
+            + (f"  MISMATCHES {result['mismatches']}" if result["mismatches"] else "")
+        )
+        failed = failed or bool(result["mismatches"])
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        failed = failed or bool(regressions)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
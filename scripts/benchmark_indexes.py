@@ -0,0 +1,259 @@
+"""
+benchmark_indexes.py
+
+Seeds a throwaway SQLite database with a large attendance history and reports, for each
+hot query, its query plan and latency without and then with the indexes declared in the
+models' `Meta.indexes`.
+
+Usage:
+    DJANGO_SETTINGS_MODULE=config.settings.dev python scripts/benchmark_indexes.py --attendance 1000000
+
+The database given with --database (a temporary file by default) is overwritten.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attendance", type=int, default=1000000, help="Number of attendance rows to seed.")
+    parser.add_argument("--staff", type=int, default=2000, help="Number of staff members to seed.")
+    parser.add_argument("--repeat", type=int, default=200, help="Runs of each query per measurement.")
+    parser.add_argument("--database", help="SQLite file to use, a temporary file when omitted.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    return parser.parse_args()
+
+
+def setup_django(database: str):
+    from django.conf import settings
+
+    settings.DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": database}}
+
+    import django
+    django.setup()
+
+
+def create_schema():
+    from django.core.management import call_command
+
+    call_command("migrate", run_syncdb=True, skip_checks=True, verbosity=0)
+
+
+def declared_indexes():
+    from apps.attendance.models import Attendance, Shift, ShiftInterchangeRequest
+
+    return [(model, index) for model in (Shift, Attendance, ShiftInterchangeRequest) for index in model._meta.indexes]
+
+
+def drop_indexes():
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for model, index in declared_indexes():
+            editor.remove_index(model, index)
+
+
+def create_indexes():
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for model, index in declared_indexes():
+            editor.add_index(model, index)
+
+
+def analyze():
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def seed(staff_count: int, attendance_count: int):
+    """
+    Insert users, staff members, their shifts, interchange requests and the attendance history.
+
+    The history ends today and spans as many days as needed to reach `attendance_count` rows.
+    """
+    from django.db import connection, transaction
+    from apps.accounts.models import CustomUser, StaffMember
+    from apps.attendance.models import Attendance, Shift, ShiftInterchangeRequest
+
+    random.seed(0)
+    days = max(1, attendance_count // staff_count)
+    today = date.today()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f"staff{i}", email=f"staff{i}@example.com", first_name="Staff", last_name=str(i))
+             for i in range(staff_count)],
+            batch_size=5000,
+        )
+        users = CustomUser.objects.order_by("username").values_list("pk", flat=True)
+        StaffMember.objects.bulk_create(
+            [StaffMember(employee_id=f"EMP{i:06d}", user_id=user_id) for i, user_id in enumerate(users)],
+            batch_size=5000,
+        )
+        staff_ids = list(StaffMember.objects.order_by("id").values_list("id", flat=True))
+
+        Shift.objects.bulk_create(
+            [Shift(staff_member_id=staff_id, day=day, shift_start=dt_time(9), shift_end=dt_time(17))
+             for staff_id in staff_ids for day in DAYS[:5]],
+            batch_size=5000,
+        )
+        shift_ids = dict(Shift.objects.filter(day="monday").values_list("staff_member_id", "id"))
+
+        interchanges = []
+        for _ in range(staff_count * 10):
+            requester, target = random.sample(staff_ids, 2)
+            interchanges.append(ShiftInterchangeRequest(
+                requester_id=requester,
+                target_id=target,
+                requester_shift_id=shift_ids[requester],
+                target_shift_id=shift_ids[target],
+                status="pending" if random.random() < 0.05 else "approved",
+            ))
+        ShiftInterchangeRequest.objects.bulk_create(interchanges, batch_size=5000)
+
+        # the ORM is too slow for a million rows, insert them directly.
+        table = Attendance._meta.db_table
+        rows = []
+        for offset in range(days):
+            day = today - timedelta(days=offset)
+            punch = datetime.combine(day, dt_time(3, 30), tzinfo=timezone.utc)
+            for staff_id in staff_ids:
+                timestamp = punch + timedelta(minutes=random.randint(0, 90))
+                rows.append((staff_id, day.isoformat(), timestamp.isoformat(" "), "", "", "", ""))
+
+            if len(rows) >= 50000:
+                cursor.executemany(
+                    f"INSERT INTO {table} (staff_member_id, date, timestamp, image, thumbnail, image_hash, staged_image) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    rows,
+                )
+                rows = []
+        if rows:
+            cursor.executemany(
+                f"INSERT INTO {table} (staff_member_id, date, timestamp, image, thumbnail, image_hash, staged_image) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+
+    return staff_ids, days
+
+
+def hot_queries(staff_ids, days):
+    """
+    The queries behind marking attendance, the shift lookups, the interchange requests and the report.
+
+    Returns:
+        List[Tuple[str, Callable[[], QuerySet], Callable[[QuerySet], object]]]: The name of each query,
+        a function building a queryset with random parameters, and how the view evaluates it.
+    """
+    from apps.attendance.models import Attendance, Shift, ShiftInterchangeRequest
+    from apps.accounts.models import StaffMember
+
+    today = date.today()
+
+    def report_queryset():
+        # the attendance half of the report, one page of staff members over a month.
+        start = random.randrange(0, max(1, len(staff_ids) - 100))
+        return Attendance.objects.filter(
+            staff_member_id__in=staff_ids[start:start + 100],
+            date__range=(today - timedelta(days=min(days, 30)), today),
+        ).values_list("staff_member_id", "timestamp")
+
+    return [
+        ("attendance_marked_today",
+         lambda: Attendance.objects.filter(staff_member_id=random.choice(staff_ids), date=today),
+         lambda queryset: queryset.exists()),
+        ("shift_of_day",
+         lambda: Shift.objects.filter(staff_member_id=random.choice(staff_ids), day=random.choice(DAYS[:5])),
+         lambda queryset: queryset.get()),
+        ("pending_interchange_requests",
+         lambda: ShiftInterchangeRequest.objects.filter(target_id=random.choice(staff_ids), status="pending"),
+         lambda queryset: list(queryset)),
+        ("staff_member_by_email",
+         lambda: StaffMember.objects.filter(user__email=f"staff{random.randrange(len(staff_ids))}@example.com"),
+         lambda queryset: queryset.get()),
+        ("report_page_attendance",
+         report_queryset,
+         lambda queryset: list(queryset)),
+        ("export_day",
+         lambda: Attendance.objects.filter(date=today - timedelta(days=random.randrange(days))).values_list("staff_member_id", "timestamp"),
+         lambda queryset: list(queryset)),
+    ]
+
+
+def measure(queries, repeat: int):
+    results = {}
+    for name, build, evaluate in queries:
+        plan = build().explain()
+
+        timings = []
+        for _ in range(repeat):
+            queryset = build()
+            started = time.perf_counter()
+            evaluate(queryset)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        results[name] = {
+            "plan": plan,
+            "median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        }
+    return results
+
+
+def main():
+    args = parse_args()
+
+    database = args.database or os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")
+    if os.path.exists(database):
+        os.remove(database)
+
+    setup_django(database)
+    create_schema()
+    drop_indexes()
+
+    started = time.perf_counter()
+    staff_ids, days = seed(args.staff, args.attendance)
+    print(f"Seeded {len(staff_ids) * days} attendance rows in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    queries = hot_queries(staff_ids, days)
+
+    analyze()
+    before = measure(queries, args.repeat)
+
+    create_indexes()
+    analyze()
+    after = measure(queries, args.repeat)
+
+    if args.json:
+        print(json.dumps({"before": before, "after": after}, indent=2))
+        return
+
+    for name, _, _ in queries:
+        print(f"{name}")
+        print(f"  before: median {before[name]['median_ms']:.3f} ms, p95 {before[name]['p95_ms']:.3f} ms")
+        print(f"          {before[name]['plan']}".replace("\n", "\n          "))
+        print(f"  after:  median {after[name]['median_ms']:.3f} ms, p95 {after[name]['p95_ms']:.3f} ms")
+        print(f"          {after[name]['plan']}".replace("\n", "\n          "))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+benchmark_startup.py
+
+Measures the cold start of the project: `manage-prod.py check` and the boot of a WSGI
+worker (`config.wsgi.prod` plus the URLconf, i.e. ready for its first request). Each one
+runs several times in a fresh interpreter under `python -X importtime` and the script
+reports the median wall time, the total import time and the modules that took longest to
+import, so that heavy imports creeping into the startup path are caught.
+
+Usage:
+    python scripts/benchmark_startup.py --output startup.json
+    python scripts/benchmark_startup.py --baseline startup.json --threshold 0.2
+
+With --baseline, the run fails (exit status 1) when the median wall time or the median
+import time of a target grew by more than --threshold.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WSGI_BOOT = (
+    "import config.wsgi.prod\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+TARGETS = {
+    "check": ["manage-prod.py", "check"],
+    "wsgi": ["-c", WSGI_BOOT],
+}
+
+# imports that must stay out of the startup path, they are loaded on first use.
+LAZY_MODULES = ["firebase_admin"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Measured runs per target.")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to report.")
+    parser.add_argument("--settings", default="config.settings.prod", help="DJANGO_SETTINGS_MODULE of the runs.")
+    parser.add_argument("--only", action="append", choices=list(TARGETS), help="Only benchmark this target.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against the results of an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative growth of the median times.")
+    return parser.parse_args()
+
+
+def parse_importtime(stderr: str):
+    """
+    Returns:
+        Tuple[int, Dict[str, int]]: The summed self import time in microseconds, and the
+                                    cumulative import time of every module.
+    """
+    total = 0
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        total += int(self_us)
+        cumulative[module.strip()] = int(cumulative_us)
+    return total, cumulative
+
+
+def run(name: str, args):
+    """
+    Run a target `args.runs` times, each in a fresh interpreter, and summarize the runs.
+    """
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": args.settings, "PYTHONDONTWRITEBYTECODE": "1"}
+    command = [sys.executable, "-X", "importtime", *TARGETS[name]]
+
+    wall_times = []
+    import_times = []
+    module_times = defaultdict(list)
+    statuses = set()
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+        wall_times.append(time.perf_counter() - started)
+        statuses.add(completed.returncode)
+
+        total, cumulative = parse_importtime(completed.stderr)
+        import_times.append(total)
+        for module, microseconds in cumulative.items():
+            module_times[module].append(microseconds)
+
+    slowest = sorted(
+        ((module, statistics.median(times)) for module, times in module_times.items() if "." not in module),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:args.top]
+
+    return {
+        "wall_ms": round(statistics.median(wall_times) * 1000, 1),
+        "import_ms": round(statistics.median(import_times) / 1000, 1),
+        "exit_statuses": sorted(statuses),
+        "lazy_modules_imported": [module for module in LAZY_MODULES if module in module_times],
+        "slowest_imports_ms": {module: round(microseconds / 1000, 1) for module, microseconds in slowest},
+    }
+
+
+def compare(results, baseline, threshold: float):
+    """
+    Returns:
+        List[str]: A description of every regression against the baseline.
+    """
+    regressions = []
+    for name, result in results["targets"].items():
+        before = baseline["targets"].get(name)
+        if not before:
+            continue
+        for key in ("wall_ms", "import_ms"):
+            if result[key] > before[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {before[key]} -> {result[key]}")
+        for module in set(result["lazy_modules_imported"]) - set(before["lazy_modules_imported"]):
+            regressions.append(f"{name}: {module} is imported at startup")
+    return regressions
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+
+    results = {
+        "commit": current_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "settings": args.settings,
+        "runs": args.runs,
+        "targets": {},
+    }
+
+    for name in TARGETS:
+        if args.only and name not in args.only:
+            continue
+
+        result = results["targets"][name] = run(name, args)
+        print(
+            f"{name:<8} wall {result['wall_ms']:>8} ms  imports {result['import_ms']:>8} ms"
+            + (f"  exit status {result['exit_statuses']}" if result["exit_statuses"] != [0] else "")
+            + (f"  imports {', '.join(result['lazy_modules_imported'])}" if result["lazy_modules_imported"] else "")
+        )
+        for module, milliseconds in result["slowest_imports_ms"].items():
+            print(f"    {module:<40} {milliseconds:>8} ms")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
+import logging
+
 from apps.core.models import CustomErrors
+from apps.core.error_catalog import invalidate_error_catalog
+
+
+logger = logging.getLogger(__name__)
 
 error_messages = [
     {"code": "InterchangeRequestNotFound", "message": "Interchange request not found", "status": 400},
@@ -8,7 +14,7 @@ error_messages = [
     {"code": "RequesterShiftNotFound", "message": "Requester shift not found error", "status": 400},
     {"code": "StaffUserNotFound", "message": "Staff User not found with provided email", "status": 400},
     {"code": "AttendanceAlreadyMarked", "message": "User already marked their attendance", "status": 400},
-    {"code": "OutOfAttendanceWindow", "message": "Attendance can only be marked within 1 hour of your shift end time", "status": 400},
+    {"code": "OutOfAttendanceWindow", "message": "Attendance can only be marked within the attendance window after your shift start time", "status": 400},
     {"code": "CannotAssignWeekOffShift", "message": "Manager can only assign shift on weekdays not for weekends", "status": 400},
     {"code": "WeeklyOffToday", "message": "Weekly off today", "status": 400},
     {"code": "NoShiftForToday", "message": "No shift for today", "status": 400},
@@ -16,19 +22,28 @@ error_messages = [
     {"code": "WrongEmployeeId", "message": "Employee ID is not correct, please check", "status": 400},
     {"code": "PermissionError", "message": "User does not have required permissions to perform this task", "status": 401},
     {"code": "MissingFieldError", "message": "These required fields must be present", "status": 400},
-    {"code": "EmailAlreadyExist", "message": "This email already exists in the database", "status": 403}
+    {"code": "EmailAlreadyExist", "message": "This email already exists in the database", "status": 403},
+    {"code": "DuplicateRosterEntry", "message": "The roster contains the same employee and day more than once", "status": 400},
+    {"code": "CapturedAtOutOfRange", "message": "The punch was captured in the future or too long ago to be replayed", "status": 400}
 ]
 
 
 def create_errors():
+    """
+    Store the predefined error codes, adding the new ones and updating the status and
+    message of the existing ones, so that it can be run again on a seeded database.
+    """
     custom_error_objs = []
     
     for error_message in error_messages:
         err = CustomErrors(code=error_message["code"], status_code=error_message["status"], detail=error_message["message"])
         custom_error_objs.append(err)
 
-    try:
-        CustomErrors.objects.bulk_create(custom_error_objs)
-        print("creation done.")
-    except Exception as e:
-        print(f"Custom Errors already created.. {e}")
+    # the hit counts of the existing codes are kept.
+    CustomErrors.objects.bulk_create(custom_error_objs,
+                                     update_conflicts=True,
+                                     unique_fields=["code"],
+                                     update_fields=["status_code", "detail"])
+    # bulk_create does not send post_save, drop the cached catalog ourselves.
+    invalidate_error_catalog()
+    logger.info("Stored %s error codes.", len(custom_error_objs))
@@ -0,0 +1,200 @@
+"""
+load_attendance_writes.py
+
+Runs many concurrent attendance writers against a throwaway SQLite database and reports
+the p50/p99 latency of marking attendance and the number of "database is locked" errors,
+once with Django's default SQLite setup and once with `SQLITE_PRAGMAS` and the lock retries.
+
+Usage:
+    DJANGO_SETTINGS_MODULE=config.settings.dev python scripts/load_attendance_writes.py --writers 32 --staff 2000
+
+Each run happens in its own process, on its own database file.
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import time as dt_time, timedelta
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=32, help="Number of concurrent writer threads.")
+    parser.add_argument("--staff", type=int, default=2000, help="Number of staff members, each marks attendance once.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    parser.add_argument("--run", choices=["default", "tuned"], help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def setup_django(directory: str, tuned: bool):
+    from django.conf import settings
+
+    settings.DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(directory, "load.sqlite3")}}
+    settings.MEDIA_ROOT = os.path.join(directory, "media/")
+    settings.ATTENDANCE_IMAGE_STAGING_ROOT = os.path.join(directory, "staging/")
+
+    import django
+    django.setup()
+
+    from apps.core import sqlite
+    if not tuned:
+        sqlite.SQLITE_PRAGMAS = {}
+        sqlite.SQLITE_LOCK_RETRIES = 0
+
+    from django.core.management import call_command
+    call_command("migrate", run_syncdb=True, skip_checks=True, verbosity=0)
+
+
+def seed(staff_count: int):
+    """
+    Create staff members whose shift, every day, started a few minutes ago.
+    """
+    from django.db import transaction
+    from django.utils.timezone import localtime
+    from apps.accounts.models import CustomUser, StaffMember
+    from apps.attendance.models import Shift
+
+    shift_start = (localtime() - timedelta(minutes=5)).time().replace(second=0, microsecond=0)
+    if shift_start > localtime().time():
+        # just after midnight, the shift starts at midnight.
+        shift_start = dt_time(0)
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f"staff{i}", email=f"staff{i}@example.com", role="staff") for i in range(staff_count)],
+            batch_size=5000,
+        )
+        users = CustomUser.objects.order_by("username").values_list("pk", flat=True)
+        StaffMember.objects.bulk_create(
+            [StaffMember(employee_id=f"EMP{i:06d}", user_id=user_id, weekly_off=[]) for i, user_id in enumerate(users)],
+            batch_size=5000,
+        )
+        staff_members = list(StaffMember.objects.all())
+        Shift.objects.bulk_create(
+            [Shift(staff_member=staff_member, day=day, shift_start=shift_start, shift_end=dt_time(23, 59))
+             for staff_member in staff_members for day in DAYS],
+            batch_size=5000,
+        )
+
+    return staff_members
+
+
+def jpeg() -> bytes:
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def run(args):
+    """
+    Mark the attendance of every staff member from `args.writers` threads, and write the results to `args.output`.
+    """
+    directory = tempfile.mkdtemp()
+    setup_django(directory, tuned=args.run == "tuned")
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.db import OperationalError, connections
+    from apps.attendance.services import _mark_staff_attendance
+
+    staff_members = seed(args.staff)
+    content = jpeg()
+
+    latencies = []
+    errors = {"locked": 0, "other": 0}
+    lock = threading.Lock()
+
+    def writer(chunk):
+        try:
+            for staff_member in chunk:
+                image = SimpleUploadedFile("attendance.jpg", content, content_type="image/jpeg")
+                started = time.perf_counter()
+                try:
+                    _mark_staff_attendance(staff_member=staff_member, image=image)
+                    error = None
+                except OperationalError as e:
+                    error = "locked" if "locked" in str(e) else "other"
+                except Exception:
+                    error = "other"
+                elapsed = (time.perf_counter() - started) * 1000
+
+                with lock:
+                    if error:
+                        errors[error] += 1
+                    else:
+                        latencies.append(elapsed)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=writer, args=(staff_members[index::args.writers],))
+        for index in range(args.writers)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "writes": len(latencies),
+        "locked_errors": errors["locked"],
+        "other_errors": errors["other"],
+        "writes_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 3) if latencies else None,
+        "p99_ms": round(latencies[max(0, int(len(latencies) * 0.99) - 1)], 3) if latencies else None,
+    }
+    with open(args.output, "w") as output:
+        json.dump(result, output)
+
+    # do not wait for the image pipeline, only the writes are measured.
+    os._exit(0)
+
+
+def main():
+    args = parse_args()
+    if args.run:
+        return run(args)
+
+    results = {}
+    for name in ("default", "tuned"):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run", name, "--output", output.name,
+                 "--writers", str(args.writers), "--staff", str(args.staff)],
+                check=True,
+            )
+            results[name] = json.load(open(output.name))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for name, result in results.items():
+        print(
+            f"{name:>8}: {result['writes']} writes ({result['writes_per_second']}/s), "
+            f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+            f"{result['locked_errors']} locked errors, {result['other_errors']} other errors"
+        )
+
+
+if __name__ == "__main__":
+    main()